@@ -0,0 +1,152 @@
+"""Benchmark tag-filtered /books listings and their facet counts.
+
+Seeds a scratch Postgres database with synthetic books (1M by default), each
+carrying ``--tags-per-book`` of ``--tags`` tags, then times
+BookService.get_all_books with facets, and get_tag_facets on its own, for a
+few filters and prints the plans of the statements behind the slowest
+filtered facets. Point it at a throwaway database, never at a real one:
+
+    python -m benchmarks.facet_benchmark --database-url postgresql+asyncpg://.../bench
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from source.books.services import BookService
+
+SEED_BOOKS = """
+INSERT INTO books (uid, title, author, publisher, published_date, page_count,
+                   language, created_at, update_at)
+SELECT gen_random_uuid(), 'Book ' || i, 'Author ' || (i % 50000), 'Publisher',
+       DATE '2000-01-01' + (i % 9000), 100 + i % 900, 'en',
+       now() - (i || ' seconds')::interval, now()
+FROM generate_series(1, :rows) AS i
+"""
+
+SEED_TAGS = """
+INSERT INTO tags (uid, name, created_at)
+SELECT gen_random_uuid(), 'tag' || i, now() FROM generate_series(1, :tags) AS i
+ON CONFLICT (name) DO NOTHING
+"""
+
+# tag popularity is skewed: low-numbered tags are on far more books
+SEED_LINKS = """
+INSERT INTO booktag (book_uid, tag_uid)
+SELECT DISTINCT b.uid, t.uid
+FROM (SELECT uid, row_number() OVER () AS n FROM books) AS b
+CROSS JOIN generate_series(1, :per_book) AS k
+JOIN tags AS t
+  ON t.name = 'tag' || (1 + floor(:tags * power(((b.n * 31 + k * 97) % 1000) / 1000.0, 2)))::int
+ON CONFLICT DO NOTHING
+"""
+
+COUNT_LINKS = """
+INSERT INTO tag_book_counts (tag_uid, book_count)
+SELECT tag_uid, count(*) FROM booktag GROUP BY tag_uid
+ON CONFLICT (tag_uid) DO UPDATE SET book_count = excluded.book_count
+"""
+
+FILTERS = [
+    ((), "all"),
+    (("tag1",), "all"),
+    (("tag1", "tag2"), "all"),
+    (("tag1", "tag2"), "any"),
+    (("tag40", "tag90"), "all"),
+    (("tag150", "tag190", "tag199"), "any"),
+]
+
+
+async def seed(engine, rows: int, tags: int, per_book: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+        existing = (await conn.execute(text("SELECT count(*) FROM books"))).scalar()
+        if existing < rows:
+            await conn.execute(text(SEED_BOOKS), {"rows": rows - existing})
+            await conn.execute(text(SEED_TAGS), {"tags": tags})
+            await conn.execute(text(SEED_LINKS), {"tags": tags, "per_book": per_book})
+            await conn.execute(text(COUNT_LINKS))
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE"))
+
+
+async def time_filter(Session, tags, match: str, repeat: int):
+    book_service = BookService()
+    pages, facets = [], []
+    async with Session() as session:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            await book_service.get_all_books(
+                session, limit=20, tags=tags, match=match, facets=True
+            )
+            pages.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            await book_service.get_tag_facets(session, tags, match)
+            facets.append((time.perf_counter() - start) * 1000)
+    return sorted(pages), sorted(facets)
+
+
+def percentiles(timings: list[float]) -> str:
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    return f"{statistics.median(timings):>10.2f}{p95:>10.2f}"
+
+
+async def explain_facets(engine, Session, tags, match: str):
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    async with Session() as session:
+        await BookService().get_tag_facets(session, tags, match)
+    event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+    async with engine.connect() as conn:
+        for statement, parameters in captured:
+            plan = await conn.exec_driver_sql(
+                f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters
+            )
+            print("\n".join(row[0] for row in plan))
+
+
+async def main(database_url: str, rows: int, tags: int, per_book: int, repeat: int):
+    engine = create_async_engine(database_url)
+    Session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    print(f"seeding up to {rows} books with {per_book} of {tags} tags each...")
+    await seed(engine, rows, tags, per_book)
+
+    print(f"{'filter':<30}{'page p50':>10}{'page p95':>10}{'facet p50':>10}{'facet p95':>10}")
+    for filter_tags, match in FILTERS:
+        pages, facets = await time_filter(Session, filter_tags, match, repeat)
+        label = f"{match}: {','.join(filter_tags) or '-'}"
+        print(f"{label:<30}{percentiles(pages)}{percentiles(facets)}")
+
+    # the most popular tags make the largest filtered sets
+    for filter_tags, match in [(("tag1", "tag2"), "all"), (("tag1", "tag2"), "any")]:
+        print(f"\n-- facets for {match}: {','.join(filter_tags)}")
+        await explain_facets(engine, Session, filter_tags, match)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--tags", type=int, default=200)
+    parser.add_argument("--tags-per-book", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.database_url, args.rows, args.tags, args.tags_per_book, args.repeat))
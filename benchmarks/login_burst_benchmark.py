@@ -0,0 +1,89 @@
+"""Benchmark GET /books latency while a burst of logins is hashing passwords.
+
+Runs against an already running server with one verified account:
+
+    python -m benchmarks.login_burst_benchmark --base-url http://localhost:8000 \
+        --email reader@example.com --password secret
+
+It first measures /books reads on their own, then again while ``--logins``
+concurrent logins are in flight, and prints p50/p99 for both phases. With
+bcrypt on the event loop the second p99 grows with the burst size; with the
+hashing pool it should stay close to the first.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def read_books(
+    client: httpx.AsyncClient, token: str, stop: asyncio.Event, samples: list
+):
+    headers = {"Authorization": f"Bearer {token}"}
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/books", headers=headers, params={"limit": 20})
+        response.raise_for_status()
+        samples.append((time.perf_counter() - started) * 1000)
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> str:
+    response = await client.post(
+        "/api/v1/auth/login", json={"email": email, "password": password}
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def measure(client, token, readers: int, duration: float) -> list:
+    samples = []
+    stop = asyncio.Event()
+    tasks = [
+        asyncio.create_task(read_books(client, token, stop, samples))
+        for _ in range(readers)
+    ]
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return samples
+
+
+def report(name: str, samples: list):
+    quantiles = statistics.quantiles(samples, n=100)
+    print(
+        f"{name:>14}: {len(samples):6d} reads  "
+        f"p50 {quantiles[49]:7.1f} ms  p99 {quantiles[98]:7.1f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--readers", type=int, default=10)
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.readers + args.logins)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        token = await login(client, args.email, args.password)
+
+        report("baseline", await measure(client, token, args.readers, args.duration))
+
+        async def burst():
+            logins = [login(client, args.email, args.password) for _ in range(args.logins)]
+            await asyncio.gather(*logins)
+
+        burst_task = asyncio.create_task(burst())
+        samples = await measure(client, token, args.readers, args.duration)
+        await burst_task
+        report("login burst", samples)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
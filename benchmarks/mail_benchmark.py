@@ -0,0 +1,83 @@
+"""Benchmark mail throughput against a local SMTP sink.
+
+Needs aiosmtpd, which is not a runtime dependency (``pip install aiosmtpd``):
+
+    python -m benchmarks.mail_benchmark --messages 2000 --pool-size 4
+
+Sends ``--messages`` rendered verification emails through the mailer's
+connection pool in batches and prints messages per second, then does the same
+opening one SMTP connection per message, the way the old Celery task did.
+"""
+
+import argparse
+import asyncio
+import time
+
+import aiosmtplib
+from aiosmtpd.controller import Controller
+
+from source.mail import create_message, precompile_templates
+from source.mailer import MailWorker, SMTPPool
+
+
+class Sink:
+    async def handle_DATA(self, server, session, envelope):
+        return "250 OK"
+
+
+def jobs(count: int) -> list:
+    return [
+        {
+            "recipients": [f"reader{i}@example.com"],
+            "subject": "Verify your email",
+            "template": "verify_email.html",
+            "context": {"link": f"http://localhost/verify/{i}"},
+            "attempts": 0,
+        }
+        for i in range(count)
+    ]
+
+
+async def pooled(args, port: int) -> float:
+    pool = SMTPPool(args.pool_size, hostname="127.0.0.1", port=port)
+    worker = MailWorker(pool, batch_size=args.batch_size)
+    pending = jobs(args.messages)
+    started = time.perf_counter()
+    for i in range(0, len(pending), args.batch_size):
+        await worker.deliver(pending[i : i + args.batch_size])
+    elapsed = time.perf_counter() - started
+    await pool.close()
+    return elapsed
+
+
+async def per_message(args, port: int) -> float:
+    started = time.perf_counter()
+    for job in jobs(args.messages):
+        message = create_message(
+            job["recipients"], job["subject"], job["template"], job["context"]
+        )
+        await aiosmtplib.send(message, hostname="127.0.0.1", port=port)
+    return time.perf_counter() - started
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args()
+
+    precompile_templates()
+    controller = Controller(Sink(), hostname="127.0.0.1", port=0)
+    controller.start()
+    port = controller.server.sockets[0].getsockname()[1]
+    try:
+        for name, run in (("pooled", pooled), ("per message", per_message)):
+            elapsed = await run(args, port)
+            print(f"{name:>12}: {args.messages / elapsed:8.1f} msgs/s")
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""Benchmark GET /books/search against a large seeded catalog.
+
+Seeds a scratch Postgres database with synthetic books (1M by default),
+then times BookService.search_books for a few query shapes and prints the
+plan of the slowest one. Point it at a throwaway database, never at a real
+one:
+
+    python -m benchmarks.search_benchmark --database-url postgresql+asyncpg://.../bench
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from source.books.services import BookService
+from source.db import models  # noqa: F401  registers the tables
+
+WORDS = [
+    "river", "shadow", "empire", "garden", "silent", "winter", "machine",
+    "ocean", "forgotten", "crown", "glass", "storm", "library", "night",
+    "iron", "dream", "city", "wolf", "star", "letter",
+]
+QUERIES = ["river", "silent empire", "\"glass crown\"", "storm -winter", "zzzunmatched"]
+
+SEED_SQL = """
+INSERT INTO books (uid, title, author, publisher, published_date, page_count,
+                   language, created_at, update_at)
+SELECT gen_random_uuid(),
+       w[1 + (i * 7) % :n] || ' ' || w[1 + (i * 13) % :n] || ' ' || w[1 + (i * 17) % :n],
+       'Author ' || (i % 50000),
+       'Publisher ' || (i % 500),
+       DATE '2000-01-01' + (i % 9000),
+       100 + i % 900,
+       'en',
+       now() - (i || ' seconds')::interval,
+       now()
+FROM generate_series(1, :rows) AS i, (SELECT :words ::text[] AS w) words
+"""
+
+
+async def seed(engine, rows: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+        existing = (await conn.execute(text("SELECT count(*) FROM books"))).scalar()
+        if existing < rows:
+            await conn.execute(
+                text(SEED_SQL),
+                {"rows": rows - existing, "n": len(WORDS), "words": WORDS},
+            )
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE books"))
+
+
+async def time_query(Session, query: str, repeat: int) -> list[float]:
+    book_service = BookService()
+    timings = []
+    async with Session() as session:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            await book_service.search_books(query, session, limit=20)
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+async def main(database_url: str, rows: int, repeat: int):
+    engine = create_async_engine(database_url)
+    Session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    print(f"seeding up to {rows} books...")
+    await seed(engine, rows)
+
+    print(f"{'query':<22}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for query in QUERIES:
+        timings = sorted(await time_query(Session, query, repeat))
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(f"{query:<22}{statistics.median(timings):>10.2f}{p95:>10.2f}{timings[-1]:>10.2f}")
+
+    async with engine.connect() as conn:
+        plan = await conn.execute(
+            text(
+                "EXPLAIN (ANALYZE, BUFFERS) SELECT uid FROM books "
+                "WHERE search_vector @@ websearch_to_tsquery('simple', :q) "
+                "ORDER BY ts_rank_cd(search_vector, websearch_to_tsquery('simple', :q)) DESC, uid DESC "
+                "LIMIT 21"
+            ),
+            {"q": QUERIES[1]},
+        )
+        print("\n".join(row[0] for row in plan))
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.database_url, args.rows, args.repeat))
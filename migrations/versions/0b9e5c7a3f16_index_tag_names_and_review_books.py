@@ -0,0 +1,42 @@
+"""index tag names, review books and tag links
+
+Revision ID: 0b9e5c7a3f16
+Revises: f1a8d4c62b07
+Create Date: 2026-10-18 17:46:31.218094
+
+Duplicate tag names must be merged before upgrading, otherwise building
+uq_tags_name fails. The other hot predicates are already covered:
+users.email by uq_users_email, books by the keyset indexes and
+reviews.user_uid by ix_reviews_user_uid_created_at_uid.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b9e5c7a3f16'
+down_revision: Union[str, Sequence[str], None] = 'f1a8d4c62b07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('uq_tags_name', 'tags', ['name'], unique=True, postgresql_concurrently=True)
+        op.create_index('ix_reviews_book_uid_created_at_uid', 'reviews', ['book_uid', 'created_at', 'uid'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_booktag_tag_uid', 'booktag', ['tag_uid'], unique=False, postgresql_concurrently=True)
+    # promoting the index takes only a brief lock, no second table scan
+    op.execute('ALTER TABLE tags ADD CONSTRAINT uq_tags_name UNIQUE USING INDEX uq_tags_name')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_tags_name', 'tags', type_='unique')
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_booktag_tag_uid', table_name='booktag', postgresql_concurrently=True)
+        op.drop_index('ix_reviews_book_uid_created_at_uid', table_name='reviews', postgresql_concurrently=True)
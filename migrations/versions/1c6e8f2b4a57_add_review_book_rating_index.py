@@ -0,0 +1,31 @@
+"""add review book rating index
+
+Revision ID: 1c6e8f2b4a57
+Revises: 0b9e5c7a3f16
+Create Date: 2026-10-18 19:02:41.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1c6e8f2b4a57'
+down_revision: Union[str, Sequence[str], None] = '0b9e5c7a3f16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_reviews_book_uid_rating_created_at_uid', 'reviews', ['book_uid', 'rating', 'created_at', 'uid'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_reviews_book_uid_rating_created_at_uid', table_name='reviews', postgresql_concurrently=True)
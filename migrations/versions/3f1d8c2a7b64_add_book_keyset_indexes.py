@@ -0,0 +1,31 @@
+"""add book keyset indexes
+
+Revision ID: 3f1d8c2a7b64
+Revises: b94786207abd
+Create Date: 2026-10-18 10:02:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1d8c2a7b64'
+down_revision: Union[str, Sequence[str], None] = 'b94786207abd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_books_created_at_uid', 'books', ['created_at', 'uid'], unique=False)
+    op.create_index('ix_books_user_uid_created_at_uid', 'books', ['user_uid', 'created_at', 'uid'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_books_user_uid_created_at_uid', table_name='books')
+    op.drop_index('ix_books_created_at_uid', table_name='books')
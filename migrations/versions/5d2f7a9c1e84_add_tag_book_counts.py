@@ -0,0 +1,44 @@
+"""add tag book counts and a covering tag link index
+
+Revision ID: 5d2f7a9c1e84
+Revises: 1c6e8f2b4a57
+Create Date: 2026-10-18 20:14:52.640117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2f7a9c1e84'
+down_revision: Union[str, Sequence[str], None] = '1c6e8f2b4a57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('tag_book_counts',
+    sa.Column('tag_uid', sa.Uuid(), nullable=False),
+    sa.Column('book_count', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['tag_uid'], ['tags.uid'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('tag_uid')
+    )
+    op.execute(
+        'INSERT INTO tag_book_counts (tag_uid, book_count) '
+        'SELECT tag_uid, count(*) FROM booktag GROUP BY tag_uid'
+    )
+    with op.get_context().autocommit_block():
+        op.create_index('ix_booktag_tag_uid_book_uid', 'booktag', ['tag_uid', 'book_uid'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_booktag_tag_uid', table_name='booktag', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_booktag_tag_uid', 'booktag', ['tag_uid'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_booktag_tag_uid_book_uid', table_name='booktag', postgresql_concurrently=True)
+    op.drop_table('tag_book_counts')
@@ -0,0 +1,46 @@
+"""unique user email and cascading foreign keys
+
+Revision ID: c5a7e9d31f08
+Revises: 8e4b0f6d2c91
+Create Date: 2026-10-18 14:21:53.804117
+
+Duplicate emails must be resolved before upgrading, otherwise creating
+uq_users_email fails.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a7e9d31f08'
+down_revision: Union[str, Sequence[str], None] = '8e4b0f6d2c91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_unique_constraint('uq_users_email', 'users', ['email'])
+
+    op.drop_constraint('booktag_book_uid_fkey', 'booktag', type_='foreignkey')
+    op.create_foreign_key('booktag_book_uid_fkey', 'booktag', 'books', ['book_uid'], ['uid'], ondelete='CASCADE')
+    op.drop_constraint('booktag_tag_uid_fkey', 'booktag', type_='foreignkey')
+    op.create_foreign_key('booktag_tag_uid_fkey', 'booktag', 'tags', ['tag_uid'], ['uid'], ondelete='CASCADE')
+    op.drop_constraint('reviews_book_uid_fkey', 'reviews', type_='foreignkey')
+    op.create_foreign_key('reviews_book_uid_fkey', 'reviews', 'books', ['book_uid'], ['uid'], ondelete='SET NULL')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('reviews_book_uid_fkey', 'reviews', type_='foreignkey')
+    op.create_foreign_key('reviews_book_uid_fkey', 'reviews', 'books', ['book_uid'], ['uid'])
+    op.drop_constraint('booktag_tag_uid_fkey', 'booktag', type_='foreignkey')
+    op.create_foreign_key('booktag_tag_uid_fkey', 'booktag', 'tags', ['tag_uid'], ['uid'])
+    op.drop_constraint('booktag_book_uid_fkey', 'booktag', type_='foreignkey')
+    op.create_foreign_key('booktag_book_uid_fkey', 'booktag', 'books', ['book_uid'], ['uid'])
+
+    op.drop_constraint('uq_users_email', 'users', type_='unique')
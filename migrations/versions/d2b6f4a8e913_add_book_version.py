@@ -0,0 +1,29 @@
+"""add book version
+
+Revision ID: d2b6f4a8e913
+Revises: c5a7e9d31f08
+Create Date: 2026-10-18 15:02:11.417530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2b6f4a8e913'
+down_revision: Union[str, Sequence[str], None] = 'c5a7e9d31f08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('version', sa.INTEGER(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('books', 'version')
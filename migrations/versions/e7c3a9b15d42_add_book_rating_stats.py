@@ -0,0 +1,62 @@
+"""add book rating stats
+
+Revision ID: e7c3a9b15d42
+Revises: d2b6f4a8e913
+Create Date: 2026-10-18 15:38:40.226915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7c3a9b15d42'
+down_revision: Union[str, Sequence[str], None] = 'd2b6f4a8e913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('review_count', sa.INTEGER(), server_default='0', nullable=False))
+    op.add_column('books', sa.Column('rating_sum', sa.INTEGER(), server_default='0', nullable=False))
+    op.add_column('books', sa.Column('rating_avg', postgresql.DOUBLE_PRECISION(), server_default='0', nullable=False))
+    op.add_column('books', sa.Column('rating_histogram', postgresql.JSONB(astext_type=sa.Text()), server_default=sa.text("'{}'::jsonb"), nullable=False))
+    op.execute(
+        """
+        UPDATE books
+        SET review_count = stats.review_count,
+            rating_sum = stats.rating_sum,
+            rating_avg = stats.rating_sum::float8 / stats.review_count,
+            rating_histogram = stats.rating_histogram
+        FROM (
+            SELECT book_uid,
+                   sum(reviews)::int AS review_count,
+                   sum(reviews * rating)::int AS rating_sum,
+                   jsonb_object_agg(rating::text, reviews) AS rating_histogram
+            FROM (
+                SELECT book_uid, rating, count(*) AS reviews
+                FROM reviews
+                WHERE book_uid IS NOT NULL
+                GROUP BY book_uid, rating
+            ) AS per_rating
+            GROUP BY book_uid
+        ) AS stats
+        WHERE books.uid = stats.book_uid
+        """
+    )
+    with op.get_context().autocommit_block():
+        op.create_index('ix_books_rating_avg_created_at_uid', 'books', ['rating_avg', 'created_at', 'uid'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_books_rating_avg_created_at_uid', table_name='books', postgresql_concurrently=True)
+    op.drop_column('books', 'rating_histogram')
+    op.drop_column('books', 'rating_avg')
+    op.drop_column('books', 'rating_sum')
+    op.drop_column('books', 'review_count')
@@ -0,0 +1,31 @@
+"""add review user keyset index
+
+Revision ID: f1a8d4c62b07
+Revises: e7c3a9b15d42
+Create Date: 2026-10-18 17:12:05.904471
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a8d4c62b07'
+down_revision: Union[str, Sequence[str], None] = 'e7c3a9b15d42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_reviews_user_uid_created_at_uid', 'reviews', ['user_uid', 'created_at', 'uid'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_reviews_user_uid_created_at_uid', table_name='reviews', postgresql_concurrently=True)
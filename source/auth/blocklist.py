@@ -0,0 +1,121 @@
+"""In-process mirror of the revoked-token blocklist.
+
+Revoked JTIs live in Redis as plain keys with a TTL (see
+``source.db.redis``). Every worker mirrors them in an expiring set: revocations
+arrive over pub/sub, and the whole set is rebuilt with SCAN whenever the
+listener (re)connects and every ``BLOCKLIST_RESYNC_INTERVAL`` seconds. While
+the mirror has been resynced within ``BLOCKLIST_MAX_STALENESS`` seconds a
+lookup is answered locally; otherwise it falls back to Redis.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+from redis.exceptions import RedisError
+
+from source.config import Config
+from source.db import pubsub
+from source.db.redis import (
+    JTI_EXPIRY,
+    add_jti_to_blocklist,
+    redis_client,
+    token_in_blocklist,
+)
+
+logger = logging.getLogger(__name__)
+
+REVOKED_CHANNEL = "auth:revoked"
+# JTIs are uuid4 strings; the pattern keeps other keys out of the scan
+JTI_KEY_PATTERN = "????????-????-????-????-????????????"
+SCAN_BATCH = 1000
+
+
+class RevokedTokenMirror:
+    def __init__(self, max_staleness: float):
+        self.max_staleness = max_staleness
+        self._expires_at: Dict[str, float] = {}
+        self._synced_at: Optional[float] = None
+
+    def is_fresh(self) -> bool:
+        return (
+            self._synced_at is not None
+            and time.monotonic() - self._synced_at <= self.max_staleness
+        )
+
+    def add(self, jti: str, ttl: float = JTI_EXPIRY) -> None:
+        self._expires_at[jti] = time.monotonic() + ttl
+
+    def contains(self, jti: str) -> bool:
+        expires_at = self._expires_at.get(jti)
+        if expires_at is None:
+            return False
+        if expires_at < time.monotonic():
+            del self._expires_at[jti]
+            return False
+        return True
+
+    def _on_revoked(self, jti: str) -> None:
+        self.add(jti)
+
+    async def resync(self) -> None:
+        """Rebuild the mirror from the keys currently in Redis"""
+        started = time.monotonic()
+        expires_at = {}
+        batch = []
+
+        async for key in redis_client.scan_iter(match=JTI_KEY_PATTERN, count=SCAN_BATCH):
+            batch.append(key)
+            if len(batch) >= SCAN_BATCH:
+                await self._collect_ttls(batch, started, expires_at)
+                batch = []
+        if batch:
+            await self._collect_ttls(batch, started, expires_at)
+
+        # keep revocations that arrived over pub/sub while scanning
+        for jti, expiry in self._expires_at.items():
+            if expiry > expires_at.get(jti, 0):
+                expires_at[jti] = expiry
+
+        self._expires_at = expires_at
+        self._synced_at = started
+
+    async def _collect_ttls(self, keys: list, now: float, expires_at: dict) -> None:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.pttl(key)
+            ttls = await pipe.execute()
+
+        for key, ttl in zip(keys, ttls):
+            # -2: expired since the scan, -1: no expiry set
+            if ttl == -2:
+                continue
+            ttl = JTI_EXPIRY * 1000 if ttl == -1 else ttl
+            expires_at[key.decode()] = now + ttl / 1000
+
+    async def run(self, interval: float) -> None:
+        """Resync periodically until cancelled; started from the lifespan"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.resync()
+            except RedisError:
+                logger.warning("could not resync the revoked token mirror")
+
+
+revoked_tokens = RevokedTokenMirror(max_staleness=Config.BLOCKLIST_MAX_STALENESS)
+pubsub.subscribe(REVOKED_CHANNEL, revoked_tokens._on_revoked)
+pubsub.on_connect(revoked_tokens.resync)
+
+
+async def revoke_token(jti: str) -> None:
+    await add_jti_to_blocklist(jti)
+    revoked_tokens.add(jti)
+    await pubsub.publish(REVOKED_CHANNEL, jti)
+
+
+async def is_token_revoked(jti: str) -> bool:
+    if revoked_tokens.is_fresh():
+        return revoked_tokens.contains(jti)
+    return await token_in_blocklist(jti)
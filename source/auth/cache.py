@@ -0,0 +1,15 @@
+from source.config import Config
+from source.db.cache import BroadcastTTLCache
+from source.db.outbox import handles
+
+# slim principals keyed by email, see get_current_user
+principal_cache = BroadcastTTLCache(
+    "principal",
+    maxsize=Config.PRINCIPAL_CACHE_MAXSIZE,
+    ttl=Config.PRINCIPAL_CACHE_TTL,
+)
+
+
+@handles("user.updated")
+async def evict_principal(payload: dict) -> None:
+    await principal_cache.invalidate(payload["email"])
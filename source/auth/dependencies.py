@@ -3,11 +3,10 @@ from fastapi import Request, status, Depends
 from fastapi.exceptions import HTTPException
 from fastapi.security.http import HTTPAuthorizationCredentials
 from .utils import decode_token
-from source.db.redis import token_in_blocklist
+from .blocklist import is_token_revoked
 from sqlmodel.ext.asyncio.session import AsyncSession
 from source.db.main import get_sessiion
 from .services import UserService
-from source.db.models import User
 from typing import List
 from source.errors import (
     InvalidToken,
@@ -27,19 +26,31 @@ class TokenBearer(HTTPBearer):
 
     async def __call__(self, request: Request) -> HTTPAuthorizationCredentials | None:
         creds = await super().__call__(request)
-        token = creds.credentials
+        token_data = await self.authenticate(request, creds.credentials)
+
+        self.verify_token_data(token_data)
+        return token_data
+
+    async def authenticate(self, request: Request, token: str) -> dict:
+        """Decode the token and check the blocklist once per request.
+
+        Routes often reach several bearer instances (their own and the one
+        behind RoleChecker), which FastAPI does not deduplicate, so the
+        verified token is kept on ``request.state`` for the others.
+        """
+        verified = getattr(request.state, "verified_token", None)
+        if verified is not None and verified[0] == token:
+            return verified[1]
+
         token_data = self.token_valid(token)
 
         if not token_data:
             raise InvalidToken()
 
-        if await token_in_blocklist(token_data["jti"]):
+        if await is_token_revoked(token_data["jti"]):
             raise InvalidToken()
 
-        print("Token JTI:", token_data["jti"])
-        print("Is in blocklist?", await token_in_blocklist(token_data["jti"]))
-
-        self.verify_token_data(token_data)
+        request.state.verified_token = (token, token_data)
         return token_data
 
     def token_valid(self, token: str) -> dict | None:
@@ -51,7 +62,6 @@ class TokenBearer(HTTPBearer):
 
 class AccessTokenBearer(TokenBearer):
     def verify_token_data(self, token_data: dict):
-        # 👇 This is called from parent during token validation
         if token_data.get("refresh", False):
             raise AccessTokenRequired()
 
@@ -67,9 +77,11 @@ async def get_current_user(
     session: AsyncSession = Depends(get_sessiion),
 ):
     user_email = token_details["user"]["email"]
-    user = await user_service.get_user_by_email(user_email, session)
+    principal = await user_service.get_principal(user_email, session)
+    if principal is None:
+        raise InvalidToken()
 
-    return user
+    return principal
 
 
 class RoleChecker:
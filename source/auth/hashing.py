@@ -0,0 +1,69 @@
+"""Password hashing off the event loop.
+
+bcrypt is deliberately slow, and a single hash or verify holds a worker's
+event loop for the whole computation when called inline. ``password_hasher``
+runs them on a small thread pool instead (bcrypt releases the GIL while it
+works), with at most ``PASSWORD_HASH_CONCURRENCY`` in flight; further calls
+wait their turn without blocking other requests.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from prometheus_client import Gauge, Histogram
+
+from source.config import Config
+
+from .utils import generate_hash_password, password_context, verify_password
+
+hash_queue_depth = Gauge(
+    "password_hash_queue_depth", "Password hash operations waiting for a worker"
+)
+hash_seconds = Histogram(
+    "password_hash_seconds",
+    "Password hash operation latency, including the wait for a worker",
+    ["operation"],
+)
+
+
+class PasswordHasher:
+    def __init__(self, concurrency: int):
+        self._executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="password-hash"
+        )
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def _run(self, operation: str, func, *args):
+        started = time.perf_counter()
+        hash_queue_depth.inc()
+        try:
+            await self._slots.acquire()
+        finally:
+            hash_queue_depth.dec()
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._slots.release()
+            hash_seconds.labels(operation).observe(time.perf_counter() - started)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", generate_hash_password, password)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self._run("verify", verify_password, password, password_hash)
+
+    async def verify_and_update(
+        self, password: str, password_hash: str
+    ) -> tuple[bool, Optional[str]]:
+        """Verify, and return a new hash as well when the stored one was made
+        with a different bcrypt cost than ``BCRYPT_ROUNDS``."""
+        return await self._run(
+            "verify", password_context.verify_and_update, password, password_hash
+        )
+
+
+password_hasher = PasswordHasher(concurrency=Config.PASSWORD_HASH_CONCURRENCY)
@@ -1,13 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from .schemas import UserCreate, UserOut, UserLogin, UserBookModel, EmailModel, PasswordResetRequestModel, PasswordRequestConfirmModel
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Query, Request, Response
+from typing import Optional
+from .schemas import UserCreate, UserOut, UserLogin, UserProfileModel, EmailModel, PasswordResetRequestModel, PasswordRequestConfirmModel
 from .services import UserService
 from source.db.main import get_sessiion
 from sqlmodel.ext.asyncio.session import AsyncSession
 from .utils import (
     create_acces_token,
     decode_token,
-    verify_password,
-    generate_hash_password,
     create_url_safe_token,
     decode_url_safe_token,
 )
@@ -19,62 +18,57 @@ from .dependencies import (
     get_current_user,
     RoleChecker,
 )
-from source.db.redis import add_jti_to_blocklist
+from .blocklist import revoke_token
+from .hashing import password_hasher
+from source.ratelimit import LOGIN, PASSWORD_RESET, SIGNUP, RateLimit
+from source.books.schemas import BookPage
+from source.books.services import BookService
+from source.reviews.schemas import ReviewPage
+from source.reviews.services import ReviewService
+from source.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from source.conditional import make_etag, etag_matches, not_modified
 from source.errors import (
-    UserAlreadyExists,
-    UserNotFound,
     InvalidCredentials,
     InvalidToken,
 )
-from source.mail import mail, create_message
+from source.mail import enqueue_email
 from source.config import Config
 
-from source.celery_task import send_email
-
 REFRESH_TOKEN_EXPIRY = 2
 
 refresh_token_beaer = RefreshTokenBearer()
 access_token_bearer = AccessTokenBearer()
 role_checker = RoleChecker(["admin", "user"])
+ME_PREVIEW_SIZE = 5
 auth_router = APIRouter()
 user_service = UserService()
+book_service = BookService()
+review_service = ReviewService()
 
 
 @auth_router.post("/send_mail")
 async def send_mail(emails: EmailModel):
     emails = emails.addresses
 
-    html = "<h1>Welcome to the app</h1>"
     subject="Welcome to our app"
-    send_email.delay(emails, subject,html)
+    await enqueue_email(emails, subject, "welcome.html")
     return {"message": "Email sent successfully"}
 
 
-@auth_router.post("/signup")
+@auth_router.post("/signup", dependencies=[Depends(RateLimit(SIGNUP))])
 async def create_user_account(
     user_data: UserCreate, bg_tasks:BackgroundTasks,session: AsyncSession = Depends(get_sessiion)
 ):
     email = user_data.email
-    user_exists = await user_service.user_exists(email, session)
-
-    if user_exists:
-        raise UserAlreadyExists()
-
     new_user = await user_service.create_user(user_data, session)
 
     token = create_url_safe_token({"email": email})
 
     link = f"http://{Config.DOMAIN}/api/v1/auth/verify/{token}"
 
-    html_message = f"""
-    <h1>Verify your Email</h1>
-    <p>Please click this <a href="{link}">link</a> to verify your email</p>
-    """
     emails=[email]
     subject = "Verify your email"
-    send_email.delay(emails, subject, html_message)
-    #await mail.send_message(meassage)
-    # bg_tasks.add_task(mail.send_message, meassage)
+    await enqueue_email(emails, subject, "verify_email.html", {"link": link})
 
     return {
         "message": "Account Created! Check email to verify your account",
@@ -89,12 +83,7 @@ async def verufy_user_account(
     token_data = decode_url_safe_token(token)
     user_email = token_data.get("email")
     if user_email:
-        user = await user_service.get_user_by_email(user_email, session)
-
-        if not user:
-            raise UserNotFound()
-
-        await user_service.update_user(user, {"isverified": True}, session)
+        await user_service.update_user(user_email, {"isverified": True}, session)
 
         return JSONResponse(
             content={"message": "Account verified successfully"},
@@ -107,7 +96,7 @@ async def verufy_user_account(
     )
 
 
-@auth_router.post("/login")
+@auth_router.post("/login", dependencies=[Depends(RateLimit(LOGIN))])
 async def login_user(
     login_data: UserLogin, session: AsyncSession = Depends(get_sessiion)
 ):
@@ -116,9 +105,17 @@ async def login_user(
 
     user = await user_service.get_user_by_email(email, session)
     if user:
-        password_valid = verify_password(password, user.password_hash)
+        password_valid, new_hash = await password_hasher.verify_and_update(
+            password, user.password_hash
+        )
 
         if password_valid:
+            if new_hash is not None:
+                # BCRYPT_ROUNDS changed since this hash was made
+                await user_service.update_user(
+                    email, {"password_hash": new_hash}, session
+                )
+
             access_token = create_acces_token(
                 user_data={
                     "email": user.email,
@@ -162,37 +159,92 @@ async def generate_new_access_token(token_detail: dict = Depends(refresh_token_b
 async def revooke_token(token_details: dict = Depends(access_token_bearer)):
     jti = token_details["jti"]
 
-    await add_jti_to_blocklist(jti)
+    await revoke_token(jti)
 
     return JSONResponse(
         content={"message": "Logged out successfully"}, status_code=status.HTTP_200_OK
     )
 
 
-@auth_router.get("/me", response_model=UserBookModel)
-async def get_current_user(
-    user=Depends(get_current_user), _: bool = Depends(role_checker)
+@auth_router.get("/me", response_model=UserProfileModel)
+async def get_current_user_profile(
+    request: Request,
+    response: Response,
+    limit: int = Query(ME_PREVIEW_SIZE, ge=0, le=MAX_PAGE_SIZE),
+    user=Depends(get_current_user),
+    _: bool = Depends(role_checker),
+    session: AsyncSession = Depends(get_sessiion),
 ):
-    return user
+    """The profile with collection counts and the newest ``limit`` books and
+    reviews; follow the cursors on /me/books and /me/reviews for the rest"""
+    profile = await user_service.get_user_by_email(user.email, session)
+    counts = await user_service.get_collection_counts(user.uid, session)
+    books = {"items": [], "next_cursor": None, "prev_cursor": None}
+    reviews = dict(books)
+    if limit:
+        books = await book_service.get_user_books(user.uid, session, limit=limit)
+        reviews = await review_service.get_user_reviews(user.uid, session, limit=limit)
+
+    etag = make_etag(
+        profile.uid,
+        profile.update_at,
+        counts.book_count,
+        counts.review_count,
+        *(f"{book.uid}:{book.version}" for book in books["items"]),
+        *(f"{review.uid}:{review.update_at}" for review in reviews["items"]),
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    response.headers["ETag"] = etag
+    return UserProfileModel(
+        **vars(UserOut.model_validate(profile, from_attributes=True)),
+        book_count=counts.book_count,
+        review_count=counts.review_count,
+        books=books,
+        reviews=reviews,
+    )
 
-@auth_router.post("/password-reset-request")
+
+@auth_router.get("/me/books", response_model=BookPage)
+async def get_current_user_books(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    user=Depends(get_current_user),
+    _: bool = Depends(role_checker),
+    session: AsyncSession = Depends(get_sessiion),
+):
+    return await book_service.get_user_books(
+        user.uid, session, limit=limit, cursor=cursor
+    )
+
+
+@auth_router.get("/me/reviews", response_model=ReviewPage)
+async def get_current_user_reviews(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    user=Depends(get_current_user),
+    _: bool = Depends(role_checker),
+    session: AsyncSession = Depends(get_sessiion),
+):
+    return await review_service.get_user_reviews(
+        user.uid, session, limit=limit, cursor=cursor
+    )
+
+
+@auth_router.post(
+    "/password-reset-request", dependencies=[Depends(RateLimit(PASSWORD_RESET))]
+)
 async def password_reset_request(email_data:PasswordResetRequestModel):
     email = email_data.email
     
     token = create_url_safe_token({"email":email})
     link = f"http://{Config.DOMAIN}/api/v1/auth/password-reset-confirm/{token}"
     
-    html_message = f"""
-    <h1>Reset your password</h1>
-    <p>Please click this <a href="{link}">link</a> to Rest your password</p>
-    """
-    
-    message = create_message(
-        recipients=[email], subject="Reset Your password", body=html_message    
+    await enqueue_email(
+        [email], "Reset Your password", "password_reset.html", {"link": link}
     )
     
-    await mail.send_message(message)
-    
     return JSONResponse(
         content={
         "message":"Please check your email for instructions to reset your password"
@@ -220,13 +272,8 @@ async def reset_account_password(token:str, passwords:PasswordRequestConfirmMode
         
     user_email = token_data.get("email")
     if user_email:
-        user =  await user_service.get_user_by_email(user_email, session)
-        
-        if not user:
-            raise UserNotFound()
-        
-        password_hash = generate_hash_password(new_password)
-        await user_service.update_user(user, {"password_hash":password_hash}, session)
+        password_hash = await password_hasher.hash(new_password)
+        await user_service.update_user(user_email, {"password_hash":password_hash}, session)
         return JSONResponse(
             content={"message":"Password reset successfully"},
             status_code=status.HTTP_200_OK     
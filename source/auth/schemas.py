@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
-from source.books.schemas import Book
-from source.reviews.schemas import ReviewModel
+from source.books.schemas import BookPage
+from source.reviews.schemas import ReviewPage
 import uuid
 from datetime import datetime
 from typing import List
@@ -24,11 +24,20 @@ class UserOut(BaseModel):
     update_at:datetime
     
     
-class UserBookModel(UserOut):
-    books:List[Book]
-    reviews:List[ReviewModel]
+class UserProfileModel(UserOut):
+    book_count:int
+    review_count:int
+    books:BookPage
+    reviews:ReviewPage
     
 
+class Principal(BaseModel):
+    uid:uuid.UUID
+    email:str
+    role:str
+    isverified:bool
+
+
 class UserLogin(BaseModel):
     email:str
     password:str
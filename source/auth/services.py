@@ -1,36 +1,93 @@
-from source.db.models import User
+from source.db.models import Book, Review, User
+from source.db.loading import USER_PRINCIPAL
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlmodel import select
-from .schemas import UserCreate
-from .utils import  generate_hash_password, verify_password
+from sqlmodel import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from .schemas import Principal, UserCreate
+from .cache import principal_cache
+from source.db.outbox import record_event
+from source.errors import UserAlreadyExists, UserNotFound
+from .hashing import password_hasher
 
 class UserService:
-    async def get_user_by_email(self, email:str, session:AsyncSession):
-        statement = select(User).where(User.email == email)
+    async def get_user_by_email(self, email:str, session:AsyncSession, shape=USER_PRINCIPAL):
+        statement = select(User).options(*shape).where(User.email == email)
         result = await session.exec(statement)
         
         user = result.first()
         return user
     
+    async def get_principal(self, email:str, session:AsyncSession):
+        """Identity and permissions of a user, served from the principal cache"""
+        principal = principal_cache.get(email)
+        if principal is not None:
+            return principal
+
+        statement = select(User.uid, User.email, User.role, User.isverified).where(
+            User.email == email
+        )
+        result = await session.exec(statement)
+        row = result.first()
+        if row is None:
+            return None
+
+        principal = Principal.model_validate(row, from_attributes=True)
+        principal_cache.set(email, principal)
+        return principal
+
+    async def get_collection_counts(self, user_uid, session:AsyncSession):
+        """Number of books and reviews the user has, in one round trip"""
+        book_count = select(func.count()).where(Book.user_uid == user_uid)
+        review_count = select(func.count()).where(Review.user_uid == user_uid)
+        statement = select(
+            book_count.scalar_subquery().label("book_count"),
+            review_count.scalar_subquery().label("review_count"),
+        )
+        result = await session.exec(statement)
+        return result.one()
+
     async def user_exists(self,email:str, session:AsyncSession):
         user = await self.get_user_by_email(email, session)
 
         return True if user is not None else False
     
     async def create_user(self, user_data:UserCreate, session:AsyncSession):
-        user_data_dict = user_data.model_dump()
+        user_data_dict = user_data.model_dump(exclude={"password"})
         
-        new_user = User(**user_data_dict)
-        
-        new_user.password_hash=generate_hash_password(user_data_dict["password"])
-        new_user.role="user"
-        session.add(new_user)
+        # uq_users_email decides the race between concurrent signups
+        statement = (
+            insert(User)
+            .values(
+                **user_data_dict,
+                password_hash=await password_hasher.hash(user_data.password),
+                role="user",
+                isverified=False,
+            )
+            .on_conflict_do_nothing(index_elements=[User.email])
+            .returning(User)
+        )
+        result = await session.exec(statement)
+        new_user = result.scalar_one_or_none()
+
+        if new_user is None:
+            await session.rollback()
+            raise UserAlreadyExists()
+
         await session.commit()
         return new_user
     
-    async def update_user(self, user:User, user_data:dict, session:AsyncSession):
-        for k,v in user_data.items():
-            setattr(user, k,v)
+    async def update_user(self, email:str, user_data:dict, session:AsyncSession):
+        statement = (
+            update(User).where(User.email == email).values(**user_data).returning(User)
+        )
+        result = await session.exec(statement)
+        user = result.scalar_one_or_none()
+
+        if user is None:
+            await session.rollback()
+            raise UserNotFound()
             
+        record_event(session, "user.updated", user_uid=user.uid, email=email)
         await session.commit()
+        await principal_cache.invalidate(email)
         return user
\ No newline at end of file
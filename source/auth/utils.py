@@ -6,7 +6,13 @@ import uuid
 import logging
 from itsdangerous import URLSafeTimedSerializer
 
-password_context = CryptContext(schemes=["bcrypt"])
+# min and max pin the cost, so hashes made with another cost need an update
+password_context = CryptContext(
+    schemes=["bcrypt"],
+    bcrypt__default_rounds=Config.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=Config.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=Config.BCRYPT_ROUNDS,
+)
 
 ACCESS_TOKEN_EXPIRY = 3600
 
@@ -0,0 +1,124 @@
+"""Incremental parsers for the streaming bulk import endpoint.
+
+Both parsers consume the request body chunk by chunk and yield one
+``(row_number, record)`` pair at a time, where ``record`` is either a dict of
+raw field values or the exception that made the row unreadable. Nothing but
+the current line is ever held in memory.
+"""
+
+import csv
+import json
+from typing import AsyncIterator, Union
+
+MAX_LINE_BYTES = 1024 * 1024
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+CSV_TYPES = ("text/csv", "application/csv")
+
+Record = Union[dict, Exception]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, Union[str, Exception]]]:
+    line_number = 0
+    pending = b""
+    oversized = False
+
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+
+        for line in lines:
+            line_number += 1
+            if oversized:
+                oversized = False
+                yield line_number, ValueError("line exceeds the maximum length")
+            else:
+                yield line_number, line.decode("utf-8", errors="replace").rstrip("\r")
+
+        if len(pending) > MAX_LINE_BYTES:
+            # drop the bytes and report the row once its newline arrives
+            oversized = True
+            pending = b""
+
+    if pending or oversized:
+        line_number += 1
+        if oversized:
+            yield line_number, ValueError("line exceeds the maximum length")
+        else:
+            yield line_number, pending.decode("utf-8", errors="replace").rstrip("\r")
+
+
+async def iter_ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, Record]]:
+    async for line_number, line in iter_lines(chunks):
+        if isinstance(line, Exception):
+            yield line_number, line
+            continue
+        if not line.strip():
+            continue
+
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"invalid JSON: {e}")
+            continue
+
+        if not isinstance(record, dict):
+            yield line_number, ValueError("each line must be a JSON object")
+            continue
+
+        yield line_number, record
+
+
+async def iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, Record]]:
+    header = None
+    buffered: list[str] = []
+    first_line = 0
+
+    async for line_number, line in iter_lines(chunks):
+        if isinstance(line, Exception):
+            buffered = []
+            yield line_number, line
+            continue
+
+        if not buffered:
+            first_line = line_number
+        buffered.append(line)
+        logical_line = "\n".join(buffered)
+
+        # an odd number of quotes means a quoted field continues on the next line
+        if logical_line.count('"') % 2 and len(logical_line) <= MAX_LINE_BYTES:
+            continue
+        buffered = []
+
+        if not logical_line.strip():
+            continue
+
+        try:
+            fields = next(csv.reader([logical_line], strict=True))
+        except csv.Error as e:
+            yield first_line, ValueError(f"invalid CSV: {e}")
+            continue
+
+        if header is None:
+            header = [name.strip() for name in fields]
+            continue
+
+        if len(fields) != len(header):
+            yield first_line, ValueError(
+                f"expected {len(header)} fields, found {len(fields)}"
+            )
+            continue
+
+        yield first_line, dict(zip(header, fields))
+
+    if buffered:
+        yield first_line, ValueError("unterminated quoted field")
+
+
+def record_parser(content_type: str):
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type in NDJSON_TYPES:
+        return iter_ndjson_records
+    if media_type in CSV_TYPES:
+        return iter_csv_records
+    return None
@@ -0,0 +1,31 @@
+from source.config import Config
+from source.db.cache import TwoTierCache
+from source.db.outbox import handles
+
+# Serialized BookDetailModel bodies keyed by book uid
+book_detail_cache = TwoTierCache(
+    "book_detail",
+    maxsize=Config.BOOK_CACHE_MAXSIZE,
+    local_ttl=Config.BOOK_CACHE_LOCAL_TTL,
+    remote_ttl=Config.BOOK_CACHE_REDIS_TTL,
+)
+
+
+@handles(
+    "book.updated",
+    "book.deleted",
+    "book.tagged",
+    "review.created",
+    "review.deleted",
+    "reviews.imported",
+    "tag.attached",
+    "tag.updated",
+    "tag.deleted",
+)
+async def evict_book_details(payload: dict) -> None:
+    # writers evict right after commit too; this covers a worker that died
+    # in between, and evicting twice is harmless
+    book_uids = payload.get("book_uids") or [payload.get("book_uid")]
+    for book_uid in book_uids:
+        if book_uid is not None:
+            await book_detail_cache.invalidate(book_uid)
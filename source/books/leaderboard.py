@@ -0,0 +1,166 @@
+"""Top-rated and trending leaderboards kept in Redis sorted sets.
+
+``refresh_leaderboards`` recomputes every board from the database and swaps
+the new sorted sets in atomically; it runs periodically from Celery. Request
+handlers only read: one ``ZREVRANGE`` and one batched fetch of the books.
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from source.config import Config
+from source.db.loading import BOOK_LIST
+from source.db.models import Book, Review
+from source.db.redis import redis_client
+
+TOP_WINDOWS = {"7d": timedelta(days=7), "30d": timedelta(days=30), "all": None}
+TRENDING_WINDOW = timedelta(days=Config.TRENDING_WINDOW_DAYS)
+
+TRENDING_KEY = "leaderboard:trending"
+
+
+def top_key(window: str) -> str:
+    return f"leaderboard:top:{window}"
+
+
+def bayesian_scores(
+    review_counts: np.ndarray, rating_sums: np.ndarray, prior_weight: float
+) -> np.ndarray:
+    """Per-book average rating pulled towards the overall mean by
+    ``prior_weight`` phantom reviews, so one five-star review does not top
+    the board."""
+    total_reviews = review_counts.sum()
+    if total_reviews == 0:
+        return np.zeros_like(review_counts)
+
+    prior_mean = rating_sums.sum() / total_reviews
+    return (prior_weight * prior_mean + rating_sums) / (prior_weight + review_counts)
+
+
+def per_book_totals(book_index: np.ndarray, weights: np.ndarray, size: int) -> np.ndarray:
+    return np.bincount(book_index, weights=weights, minlength=size)
+
+
+def decayed_counts(
+    book_index: np.ndarray, ages: np.ndarray, half_life: float, size: int
+) -> np.ndarray:
+    """Review counts where a review loses half its weight every ``half_life``
+    seconds of age."""
+    weights = np.exp2(-ages / half_life)
+    return per_book_totals(book_index, weights, size)
+
+
+def top_entries(book_uids: np.ndarray, scores: np.ndarray, size: int) -> dict:
+    """The ``size`` highest scores as a ZADD mapping, without a full sort"""
+    if len(scores) > size:
+        keep = np.argpartition(scores, -size)[-size:]
+        book_uids, scores = book_uids[keep], scores[keep]
+    return {str(uid): float(score) for uid, score in zip(book_uids, scores)}
+
+
+async def _recent_reviews(session: AsyncSession, since: datetime):
+    statement = select(Review.book_uid, Review.rating, Review.created_at).where(
+        Review.book_uid.is_not(None), Review.created_at >= since
+    )
+    result = await session.exec(statement)
+    rows = result.all()
+
+    if not rows:
+        empty = np.array([])
+        return empty.astype(object), empty.astype(np.intp), empty, empty
+
+    book_uids, ratings, created_at = zip(*rows)
+    unique_uids, book_index = np.unique(np.array(book_uids, dtype=object), return_inverse=True)
+    timestamps = np.array([value.timestamp() for value in created_at])
+    return unique_uids, book_index, np.array(ratings, dtype=np.float64), timestamps
+
+
+async def _all_time_top(session: AsyncSession) -> dict:
+    # the all-time window reuses the per-book aggregates instead of the reviews
+    statement = select(Book.uid, Book.review_count, Book.rating_sum).where(
+        Book.review_count > 0
+    )
+    result = await session.exec(statement)
+    rows = result.all()
+    if not rows:
+        return {}
+
+    book_uids, review_counts, rating_sums = (np.array(column) for column in zip(*rows))
+    scores = bayesian_scores(
+        review_counts.astype(np.float64),
+        rating_sums.astype(np.float64),
+        Config.LEADERBOARD_PRIOR_WEIGHT,
+    )
+    return top_entries(book_uids, scores, Config.LEADERBOARD_SIZE)
+
+
+async def _store(key: str, entries: dict):
+    staging_key = f"{key}:staging"
+    async with redis_client.pipeline(transaction=True) as pipe:
+        if entries:
+            pipe.delete(staging_key)
+            pipe.zadd(staging_key, entries)
+            pipe.rename(staging_key, key)
+        else:
+            pipe.delete(key)
+        await pipe.execute()
+
+
+async def refresh_leaderboards(session: AsyncSession, now: Optional[datetime] = None):
+    now = now or datetime.now()
+    oldest = now - max(TOP_WINDOWS["30d"], TRENDING_WINDOW)
+    unique_uids, book_index, ratings, timestamps = await _recent_reviews(session, oldest)
+    size = len(unique_uids)
+
+    for window, span in TOP_WINDOWS.items():
+        if span is None:
+            await _store(top_key(window), await _all_time_top(session))
+            continue
+
+        in_window = timestamps >= (now - span).timestamp()
+        review_counts = per_book_totals(book_index[in_window], None, size)
+        rating_sums = per_book_totals(book_index[in_window], ratings[in_window], size)
+        scores = bayesian_scores(
+            review_counts, rating_sums, Config.LEADERBOARD_PRIOR_WEIGHT
+        )
+        reviewed = review_counts > 0
+        await _store(
+            top_key(window),
+            top_entries(unique_uids[reviewed], scores[reviewed], Config.LEADERBOARD_SIZE),
+        )
+
+    in_window = timestamps >= (now - TRENDING_WINDOW).timestamp()
+    scores = decayed_counts(
+        book_index[in_window],
+        now.timestamp() - timestamps[in_window],
+        Config.TRENDING_HALF_LIFE_HOURS * 3600,
+        size,
+    )
+    trending = scores > 0
+    await _store(
+        TRENDING_KEY,
+        top_entries(unique_uids[trending], scores[trending], Config.LEADERBOARD_SIZE),
+    )
+
+
+async def read_leaderboard(key: str, limit: int, session: AsyncSession) -> list:
+    """Books on the board in rank order, each paired with its score"""
+    ranked = await redis_client.zrevrange(key, 0, limit - 1, withscores=True)
+    if not ranked:
+        return []
+
+    book_uids = [uid.decode() for uid, _ in ranked]
+    statement = select(Book).options(*BOOK_LIST).where(Book.uid.in_(book_uids))
+    result = await session.exec(statement)
+    books = {str(book.uid): book for book in result.all()}
+
+    # books deleted since the last refresh are simply skipped
+    return [
+        {"book": books[uid], "score": score}
+        for uid, (_, score) in zip(book_uids, ranked)
+        if uid in books
+    ]
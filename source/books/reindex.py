@@ -0,0 +1,28 @@
+"""Rebuild the book search index.
+
+The search document is a generated column, so Postgres keeps it current on
+every write; this only rebuilds the GIN index (e.g. after a large import has
+bloated it) and refreshes planner statistics. Run it with:
+
+    python -m source.books.reindex
+"""
+
+import asyncio
+
+from sqlalchemy import text
+
+from source.db.main import async_engine
+
+
+async def reindex_book_search():
+    async with async_engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("REINDEX INDEX CONCURRENTLY ix_books_search_vector"))
+        await conn.execute(text("ANALYZE books"))
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(reindex_book_search())
+    print("book search index rebuilt")
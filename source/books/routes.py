@@ -1,38 +1,169 @@
-from fastapi import APIRouter, status, Depends
-from .schemas import Book, BookUpdateModel, BookCreateModel, BookDetailModel
+from fastapi import APIRouter, status, Depends, Query, Request
+from .schemas import (
+    Book,
+    BookUpdateModel,
+    BookCreateModel,
+    BookDetailModel,
+    BookPage,
+    BulkImportResult,
+    FacetedBookPage,
+    RankedBook,
+)
 from fastapi.exceptions import HTTPException
-from typing import List
+from fastapi.responses import Response, StreamingResponse
+from typing import List, Literal, Optional
 from source.db.main import get_sessiion
 from sqlmodel.ext.asyncio.session import AsyncSession
 from source.books.services import BookService
+from source.books.cache import book_detail_cache
+from source.books.bulk import record_parser
+from source.books import leaderboard
+from source.config import Config
+from source.db.export import start_ndjson
+from source.db.models import naive_timestamp
+from datetime import datetime
 from uuid import UUID
 from source.auth.dependencies import AccessTokenBearer
 from source.auth.dependencies import RoleChecker
 from source.errors import BookNotFound
+from source.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from source.conditional import make_etag, etag_matches, not_modified
+from source.ratelimit import READS, UserRateLimit
 
 role_checker = Depends(RoleChecker(["admin", "user"]))
+read_rate_limit = Depends(UserRateLimit(READS))
 book_router = APIRouter()
 book_service = BookService()
 access_token_bearer = AccessTokenBearer()
+MAX_TAG_FILTERS = 10
+
+
+def conditional_page(request: Request, response: Response, page: dict):
+    """Answer 304 when the client already holds this page, before it is serialized"""
+    etag = make_etag(
+        *(f"{book.uid}:{book.version}" for book in page["items"]),
+        page["next_cursor"],
+        page["prev_cursor"],
+        *(f"{facet['tag_uid']}:{facet['count']}" for facet in page.get("facets") or ()),
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    response.headers["ETag"] = etag
+    return page
 
 
-@book_router.get("/books", response_model=List[Book])
+@book_router.get(
+    "/books", response_model=FacetedBookPage, dependencies=[read_rate_limit]
+)
 async def get_all_books(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: Literal["created_at", "rating"] = "created_at",
+    tags: Optional[str] = Query(None, max_length=500, description="Comma separated tag names"),
+    match: Literal["all", "any"] = "all",
+    facets: bool = False,
     session: AsyncSession = Depends(get_sessiion),
     token_details: dict = role_checker,
 ):
-    books = await book_service.get_all_books(session)
-    return books
+    tag_names = [name.strip() for name in (tags or "").split(",") if name.strip()]
+    if len(tag_names) > MAX_TAG_FILTERS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Filter by at most {MAX_TAG_FILTERS} tags",
+        )
+
+    books = await book_service.get_all_books(
+        session,
+        limit=limit,
+        cursor=cursor,
+        sort=sort,
+        tags=tag_names,
+        match=match,
+        facets=facets,
+    )
+    return conditional_page(request, response, books)
 
 
-@book_router.get("/books/{user_uid}", response_model=List[Book])
+@book_router.get(
+    "/books/search", response_model=BookPage, dependencies=[read_rate_limit]
+)
+async def search_books(
+    request: Request,
+    response: Response,
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_sessiion),
+    token_details: dict = role_checker,
+):
+    books = await book_service.search_books(q, session, limit=limit, cursor=cursor)
+    return conditional_page(request, response, books)
+
+
+@book_router.get(
+    "/books/top", response_model=List[RankedBook], dependencies=[read_rate_limit]
+)
+async def get_top_books(
+    window: Literal["7d", "30d", "all"] = "7d",
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    session: AsyncSession = Depends(get_sessiion),
+    token_details: dict = role_checker,
+):
+    return await leaderboard.read_leaderboard(
+        leaderboard.top_key(window), limit, session
+    )
+
+
+@book_router.get(
+    "/books/trending", response_model=List[RankedBook], dependencies=[read_rate_limit]
+)
+async def get_trending_books(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    session: AsyncSession = Depends(get_sessiion),
+    token_details: dict = role_checker,
+):
+    return await leaderboard.read_leaderboard(leaderboard.TRENDING_KEY, limit, session)
+
+
+@book_router.get("/books/export", dependencies=[role_checker, read_rate_limit])
+async def export_books(
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    user_uid: Optional[UUID] = None,
+    language: Optional[str] = None,
+):
+    statement = book_service.export_books_statement(
+        created_after=naive_timestamp(created_after),
+        created_before=naive_timestamp(created_before),
+        user_uid=user_uid,
+        language=language,
+    )
+    return StreamingResponse(
+        await start_ndjson(statement),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="books.ndjson"'},
+    )
+
+
+@book_router.get(
+    "/books/{user_uid}", response_model=BookPage, dependencies=[read_rate_limit]
+)
 async def get_user_book_submissions(
     user_uid: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     session: AsyncSession = Depends(get_sessiion),
     token_details: dict = role_checker,
 ):
-    books = await book_service.get_user_books(user_uid, session)
-    return books
+    books = await book_service.get_user_books(
+        user_uid, session, limit=limit, cursor=cursor
+    )
+    return conditional_page(request, response, books)
 
 
 @book_router.post(
@@ -51,20 +182,74 @@ async def create_book(
     return new_book
 
 
+@book_router.post(
+    "/books/bulk",
+    response_model=BulkImportResult,
+    dependencies=[role_checker],
+)
+async def bulk_create_books(
+    request: Request,
+    batch_size: int = Query(
+        Config.BULK_IMPORT_BATCH_SIZE, ge=1, le=Config.BULK_IMPORT_MAX_BATCH_SIZE
+    ),
+    session: AsyncSession = Depends(get_sessiion),
+    token_details: dict = Depends(access_token_bearer),
+):
+    parse_records = record_parser(request.headers.get("content-type", ""))
+    if parse_records is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send books as application/x-ndjson or text/csv",
+        )
+
+    user_id = token_details.get("user")["user_uid"]
+    result = await book_service.bulk_create_books(
+        parse_records(request.stream()), user_id, session, batch_size=batch_size
+    )
+    return result
+
+
 @book_router.get(
-    "/book/{book_uid}", response_model=BookDetailModel, dependencies=[role_checker]
+    "/book/{book_uid}",
+    response_model=BookDetailModel,
+    dependencies=[role_checker, read_rate_limit],
 )
 async def get_one_book(
     book_uid: UUID,
+    request: Request,
     session: AsyncSession = Depends(get_sessiion),
     token_details: dict = Depends(access_token_bearer),
 ):
-    book = await book_service.get_book(book_uid, session)
+    if request.headers.get("if-none-match"):
+        # a one-column primary key probe settles most revalidations
+        version = await book_service.get_book_version(book_uid, session)
+        if version is None:
+            raise BookNotFound()
 
-    if book:
-        return book
+        etag = make_etag(book_uid, version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+    # cache entries are stored as b"<etag>\n<json body>"
+    cached = await book_detail_cache.get(str(book_uid))
+
+    if cached is None:
+        generation = await book_detail_cache.generation(str(book_uid))
+        book = await book_service.get_book_detail(book_uid, session)
+        if not book:
+            raise BookNotFound()
+
+        etag = make_etag(book.uid, book.version)
+        body = BookDetailModel.model_validate(book, from_attributes=True).model_dump_json()
+        body = body.encode()
+        await book_detail_cache.set(
+            str(book_uid), etag.encode() + b"\n" + body, generation
+        )
     else:
-        raise BookNotFound()
+        etag, body = cached.split(b"\n", 1)
+        etag = etag.decode()
+
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
 
 @book_router.patch("/book/{book_uid}", response_model=Book, dependencies=[role_checker])
@@ -75,10 +260,7 @@ async def update_book(
     token_details: dict = Depends(access_token_bearer),
 ):
     updated_book = await book_service.update_book(book_uid, book_update_data, session)
-    if updated_book:
-        return updated_book
-    else:
-        raise BookNotFound()
+    return updated_book
 
 
 @book_router.delete("/book/{book_uid}", dependencies=[role_checker])
@@ -87,8 +269,5 @@ async def delete_book(
     session: AsyncSession = Depends(get_sessiion),
     token_details: dict = Depends(access_token_bearer),
 ):
-    book_to_delete = await book_service.delete_book(book_uid, session)
-    if book_to_delete:
-        return {"message": "Successfully deleted book"}
-    else:
-        raise BookNotFound()
\ No newline at end of file
+    await book_service.delete_book(book_uid, session)
+    return {"message": "Successfully deleted book"}
\ No newline at end of file
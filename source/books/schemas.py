@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, List, Optional
 import uuid
 from source.reviews.schemas import ReviewModel
 from datetime import datetime, date
@@ -15,11 +15,36 @@ class Book(BaseModel):
     language:str
     created_at:datetime
     update_at:datetime
+    review_count:int=0
+    rating_avg:float=0.0
+    rating_histogram:Dict[str,int]={}
     
 class BookDetailModel(Book):
     reviews: List[ReviewModel]
     tags:List[TagModel]
 
+
+class RankedBook(BaseModel):
+    book:Book
+    score:float
+
+
+class BookPage(BaseModel):
+    items:List[Book]
+    next_cursor:Optional[str]=None
+    prev_cursor:Optional[str]=None
+
+
+class TagFacet(BaseModel):
+    tag_uid:uuid.UUID
+    name:str
+    count:int
+
+
+class FacetedBookPage(BookPage):
+    facets:Optional[List[TagFacet]]=None
+    facets_estimated:bool=False
+
     
 class BookCreateModel(BaseModel):
     title:str
@@ -36,3 +61,16 @@ class BookUpdateModel(BaseModel):
     page_count:int
     language:str
     
+
+
+class BulkImportRowError(BaseModel):
+    row:int
+    errors:List[str]
+
+
+class BulkImportResult(BaseModel):
+    inserted:int
+    failed:int
+    errors:List[BulkImportRowError]
+    elapsed_seconds:float
+    rows_per_second:float
@@ -1,28 +1,431 @@
 from sqlmodel.ext.asyncio.session import AsyncSession
 from .schemas import BookCreateModel, BookUpdateModel
-from sqlmodel import select, desc
-from source.db.models import Book
-from datetime import datetime
+from sqlmodel import select, insert, update, delete
+from sqlalchemy import (
+    Float,
+    Integer,
+    String,
+    case,
+    cast,
+    exists,
+    false,
+    func,
+    literal,
+    or_,
+    union_all,
+)
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.attributes import set_committed_value
+from pydantic import ValidationError
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, REGCONFIG, TEXT
+from source.db.models import Book, BookTag, Review, Tag, TagBookCount, BOOK_SEARCH_VECTOR
+from source.db.loading import BOOK_LIST, BOOK_DETAIL, REVIEW_LIST
+from source.books.cache import book_detail_cache
+from source.db.outbox import record_event
+from source.pagination import paginate, DEFAULT_PAGE_SIZE
+from source.tags.counts import adjust_tag_counts
+from source.errors import BookNotFound
+from source.config import Config
+from datetime import datetime, date
+from typing import AsyncIterator, Optional, Sequence
+import math
+import time
+import uuid
+
+BOOK_ORDER = (Book.created_at, Book.uid)
+BOOK_RATING_ORDER = (Book.rating_avg, Book.created_at, Book.uid)
+BOOK_SORTS = {"created_at": BOOK_ORDER, "rating": BOOK_RATING_ORDER}
+BOOK_EXPORT_COLUMNS = [
+    column for column in Book.__table__.c if column.name != "search_vector"
+]
+SEARCH_CONFIG = "simple"
+BOOK_DETAIL_REVIEWS = 10
+MAX_FACETS = 100
+# filtered facets count at most this many tag links of the matching books,
+# then scale the counts up; see get_tag_facets
+FACET_SAMPLE_SIZE = 10000
 
 
 class BookService:
-    async def get_all_books(self, session: AsyncSession):
-        statement = select(Book).order_by(desc(Book.created_at))
+    async def get_all_books(
+        self,
+        session: AsyncSession,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        sort: str = "created_at",
+        tags: Sequence[str] = (),
+        match: str = "all",
+        facets: bool = False,
+    ):
+        statement = select(Book).options(*BOOK_LIST)
+        if tags:
+            tag_counts = await self._tag_counts(session, tags)
+            tagged = self._tagged_books(list(tag_counts), len(set(tags)), match)
+            statement = statement.where(Book.uid.in_(tagged))
+
+        page = await paginate(session, statement, BOOK_SORTS[sort], limit, cursor)
+        if facets:
+            page.update(await self.get_tag_facets(session, tags, match))
+        return page
+
+    async def _tag_counts(self, session: AsyncSession, tags: Sequence[str]):
+        """Uid -> book count of the named tags that exist"""
+        result = await session.exec(
+            select(Tag.uid, func.coalesce(TagBookCount.book_count, 0))
+            .outerjoin(TagBookCount, TagBookCount.tag_uid == Tag.uid)
+            .where(Tag.name.in_(set(tags)))
+        )
+        return dict(result.all())
+
+    def _tagged_books(self, tag_uids: Sequence[uuid.UUID], names: int, match: str):
+        """Uids of the books linked to all (or any) of the tags; ``names`` is
+        how many were asked for, so a name that does not exist matches
+        nothing under all"""
+        # filtering on the uids rather than joining tags lets the planner see
+        # how many links each tag has, and intersecting with one join per
+        # tag lets it merge the ix_booktag_tag_uid_book_uid ranges instead of
+        # grouping every link of every tag
+        if match == "any":
+            return select(BookTag.book_uid).where(BookTag.tag_uid.in_(tag_uids))
+        if len(tag_uids) < names:
+            return select(BookTag.book_uid).where(false())
+        first, *rest = tag_uids
+        statement = select(BookTag.book_uid).where(BookTag.tag_uid == first)
+        for tag_uid in rest:
+            link = aliased(BookTag)
+            statement = statement.join(
+                link, (link.book_uid == BookTag.book_uid) & (link.tag_uid == tag_uid)
+            )
+        return statement
+
+    async def get_tag_facets(
+        self, session: AsyncSession, tags: Sequence[str] = (), match: str = "all"
+    ):
+        """Book counts per tag, across all books or across the books tagged
+        with all (or any) of ``tags``.
+
+        The unfiltered counts are read from tag_book_counts. Filtered ones
+        are counted over a sample: the first ``FACET_SAMPLE_SIZE`` links of
+        the rarest filter tag (for all) or of each filter tag in proportion
+        to its count (for any). Links are ordered by random book uids, so a
+        prefix is a random sample, and the counts are scaled up to the
+        candidates it was drawn from; ``facets_estimated`` says when that
+        happened.
+        """
+        if not tags:
+            count = TagBookCount.book_count.label("count")
+            statement = (
+                select(Tag.uid, Tag.name, count)
+                .join(TagBookCount, TagBookCount.tag_uid == Tag.uid)
+                .where(TagBookCount.book_count > 0)
+                .order_by(count.desc(), Tag.name)
+                .limit(MAX_FACETS)
+            )
+            result = await session.exec(statement)
+            facets = [
+                {"tag_uid": row.uid, "name": row.name, "count": row.count}
+                for row in result.all()
+            ]
+            return {"facets": facets, "facets_estimated": False}
+
+        tag_counts = await self._tag_counts(session, tags)
+
+        if match == "all":
+            if len(tag_counts) < len(set(tags)):
+                return {"facets": [], "facets_estimated": False}
+            rarest = min(tag_counts, key=tag_counts.get)
+            candidates = tag_counts[rarest]
+            if candidates == 0:
+                return {"facets": [], "facets_estimated": False}
+            scanned = (
+                select(BookTag.book_uid)
+                .where(BookTag.tag_uid == rarest)
+                .limit(FACET_SAMPLE_SIZE)
+                .subquery()
+            )
+            sample = select(scanned.c.book_uid)
+            for tag_uid in tag_counts:
+                if tag_uid != rarest:
+                    link = aliased(BookTag)
+                    sample = sample.where(
+                        exists().where(
+                            link.book_uid == scanned.c.book_uid, link.tag_uid == tag_uid
+                        )
+                    )
+        else:
+            candidates = sum(tag_counts.values())
+            if candidates == 0:
+                return {"facets": [], "facets_estimated": False}
+            links = union_all(
+                *(
+                    select(BookTag.book_uid)
+                    .where(BookTag.tag_uid == tag_uid)
+                    .limit(math.ceil(FACET_SAMPLE_SIZE * book_count / candidates))
+                    for tag_uid, book_count in tag_counts.items()
+                    if book_count > 0
+                )
+            ).subquery()
+            sample = select(links.c.book_uid)
+
+        count = func.count().label("count")
+        statement = (
+            select(Tag.uid, Tag.name, count)
+            .join(BookTag, BookTag.tag_uid == Tag.uid)
+            .where(BookTag.book_uid.in_(sample))
+            .group_by(Tag.uid)
+            .order_by(count.desc(), Tag.name)
+            .limit(MAX_FACETS)
+        )
         result = await session.exec(statement)
-        book = result.all()
-        return book if book is not None else None
-    
-    async def get_user_books(self, user_uid:str, session: AsyncSession):
-        statement = select(Book).where(Book.user_uid==user_uid).order_by(desc(Book.created_at))
+        scale = max(candidates / FACET_SAMPLE_SIZE, 1.0)
+        facets = [
+            {"tag_uid": row.uid, "name": row.name, "count": round(row.count * scale)}
+            for row in result.all()
+        ]
+        return {"facets": facets, "facets_estimated": candidates > FACET_SAMPLE_SIZE}
+
+    async def get_user_books(
+        self,
+        user_uid: str,
+        session: AsyncSession,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ):
+        statement = select(Book).options(*BOOK_LIST).where(Book.user_uid == user_uid)
+        return await paginate(session, statement, BOOK_ORDER, limit, cursor)
+
+    async def search_books(
+        self,
+        query: str,
+        session: AsyncSession,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ):
+        ts_query = func.websearch_to_tsquery(literal(SEARCH_CONFIG, REGCONFIG), query)
+        rank = func.ts_rank_cd(BOOK_SEARCH_VECTOR, ts_query, type_=Float).label("rank")
+
+        statement = (
+            select(Book, rank)
+            .options(*BOOK_LIST)
+            .where(BOOK_SEARCH_VECTOR.op("@@")(ts_query))
+        )
+        page = await paginate(
+            session,
+            statement,
+            (rank, Book.uid),
+            limit,
+            cursor,
+            row_key=lambda row: (row.rank, row.Book.uid),
+        )
+        page["items"] = [row.Book for row in page["items"]]
+        return page
+
+    def export_books_statement(
+        self,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        user_uid: Optional[uuid.UUID] = None,
+        language: Optional[str] = None,
+    ):
+        statement = select(*BOOK_EXPORT_COLUMNS)
+        if created_after is not None:
+            statement = statement.where(Book.created_at >= created_after)
+        if created_before is not None:
+            statement = statement.where(Book.created_at < created_before)
+        if user_uid is not None:
+            statement = statement.where(Book.user_uid == user_uid)
+        if language is not None:
+            statement = statement.where(Book.language == language)
+
+        return statement.order_by(*BOOK_ORDER)
+
+    async def get_book(self, book_uid: str, session: AsyncSession, shape=BOOK_LIST):
+        statement = select(Book).options(*shape).where(Book.uid == book_uid)
         result = await session.exec(statement)
-        book = result.all()
-        return book if book is not None else None
+        return result.first()
+
+    async def get_book_detail(self, book_uid: str, session: AsyncSession):
+        """The book with its tags and only its newest ``BOOK_DETAIL_REVIEWS``
+        reviews; the rest are paged through /reviews/book/{book_uid}"""
+        book = await self.get_book(book_uid, session, shape=BOOK_DETAIL)
+        if book is None:
+            return None
 
-    async def get_book(self, book_uid: str, session: AsyncSession):
-        statement = select(Book).where(Book.uid == book_uid)
+        statement = (
+            select(Review)
+            .options(*REVIEW_LIST)
+            .where(Review.book_uid == book.uid)
+            .order_by(Review.created_at.desc(), Review.uid.desc())
+            .limit(BOOK_DETAIL_REVIEWS)
+        )
+        reviews = (await session.exec(statement)).all()
+        set_committed_value(book, "reviews", list(reviews))
+        return book
+
+    async def get_book_version(self, book_uid: str, session: AsyncSession):
+        statement = select(Book.version).where(Book.uid == book_uid)
         result = await session.exec(statement)
         return result.first()
 
+    async def touch_books(self, session: AsyncSession, *criteria):
+        """Bump the version of the matching books after their reviews or tags
+        changed, without counting it as an edit of the book itself. Runs in
+        the caller's transaction and returns the uids that were touched.
+        """
+        statement = (
+            update(Book)
+            .where(*criteria)
+            .values(version=Book.version + 1, update_at=Book.update_at)
+            .returning(Book.uid)
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.exec(statement)
+        return result.scalars().all()
+
+    async def record_review_rating(
+        self, session: AsyncSession, book_uid, rating: int, delta: int
+    ):
+        """Fold one review being added (delta=1) or removed (delta=-1) into the
+        book's rating stats. A single UPDATE in the caller's transaction that
+        also bumps the version; returns the book uid, or None if it is gone.
+        """
+        key = str(rating)
+        review_count = Book.review_count + delta
+        rating_sum = Book.rating_sum + delta * rating
+        bucket = func.coalesce(cast(Book.rating_histogram[key].astext, Integer), 0) + delta
+
+        statement = (
+            update(Book)
+            .where(Book.uid == book_uid)
+            .values(
+                review_count=review_count,
+                rating_sum=rating_sum,
+                rating_avg=func.coalesce(
+                    cast(rating_sum, Float) / func.nullif(cast(review_count, Float), 0),
+                    0.0,
+                ),
+                # empty buckets are dropped so the histogram matches what
+                # reconcile_rating_stats rebuilds from the reviews table
+                rating_histogram=case(
+                    (bucket <= 0, Book.rating_histogram.op("-")(key)),
+                    else_=func.jsonb_set(
+                        Book.rating_histogram,
+                        literal([key], ARRAY(TEXT)),
+                        func.to_jsonb(bucket),
+                    ),
+                ),
+                version=Book.version + 1,
+                update_at=Book.update_at,
+            )
+            .returning(Book.uid)
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.exec(statement)
+        return result.scalar_one_or_none()
+
+    async def reconcile_rating_stats(
+        self, session: AsyncSession, batch_size: int = Config.RATING_RECONCILE_BATCH_SIZE
+    ):
+        """Recompute the rating stats from the reviews table in primary key
+        batches, rewriting only the books whose stored stats drifted.
+        Returns the number of books repaired.
+        """
+        repaired = 0
+        last_uid = None
+
+        while True:
+            # lock the batch before reading the reviews: otherwise a review
+            # write committing while the rebuild waits on a row is
+            # overwritten with stats from the rebuild's older snapshot
+            statement = (
+                select(Book.uid)
+                .order_by(Book.uid)
+                .limit(batch_size)
+                .with_for_update(key_share=True)
+            )
+            if last_uid is not None:
+                statement = statement.where(Book.uid > last_uid)
+            result = await session.exec(statement)
+            batch = result.all()
+            if not batch:
+                return repaired
+
+            last_uid = batch[-1]
+            repaired_uids = await self.rebuild_rating_stats(session, batch)
+            await session.commit()
+
+            for book_uid in repaired_uids:
+                await book_detail_cache.invalidate(str(book_uid))
+            repaired += len(repaired_uids)
+
+    async def rebuild_rating_stats(self, session: AsyncSession, book_uids: list):
+        """Rewrite the stats of ``book_uids`` that differ from their reviews,
+        bumping their versions; runs in the caller's transaction and returns
+        the uids that changed"""
+        per_rating = (
+            select(Review.book_uid, Review.rating, func.count().label("reviews"))
+            .where(Review.book_uid.in_(book_uids))
+            .group_by(Review.book_uid, Review.rating)
+            .subquery()
+        )
+        per_book = (
+            select(
+                per_rating.c.book_uid,
+                cast(func.sum(per_rating.c.reviews), Integer).label("review_count"),
+                cast(
+                    func.sum(per_rating.c.reviews * per_rating.c.rating), Integer
+                ).label("rating_sum"),
+                func.jsonb_object_agg(
+                    cast(per_rating.c.rating, String), per_rating.c.reviews
+                ).label("rating_histogram"),
+            )
+            .group_by(per_rating.c.book_uid)
+            .subquery()
+        )
+        # books without reviews must be reset too, hence the outer join
+        stats = (
+            select(
+                Book.uid,
+                func.coalesce(per_book.c.review_count, 0).label("review_count"),
+                func.coalesce(per_book.c.rating_sum, 0).label("rating_sum"),
+                func.coalesce(
+                    per_book.c.rating_histogram, cast(literal("{}"), JSONB)
+                ).label("rating_histogram"),
+            )
+            .outerjoin(per_book, per_book.c.book_uid == Book.uid)
+            .where(Book.uid.in_(book_uids))
+            .subquery()
+        )
+
+        statement = (
+            update(Book)
+            .where(
+                Book.uid == stats.c.uid,
+                or_(
+                    Book.review_count.is_distinct_from(stats.c.review_count),
+                    Book.rating_sum.is_distinct_from(stats.c.rating_sum),
+                    Book.rating_histogram.is_distinct_from(stats.c.rating_histogram),
+                ),
+            )
+            .values(
+                review_count=stats.c.review_count,
+                rating_sum=stats.c.rating_sum,
+                rating_avg=func.coalesce(
+                    cast(stats.c.rating_sum, Float)
+                    / func.nullif(cast(stats.c.review_count, Float), 0),
+                    0.0,
+                ),
+                rating_histogram=stats.c.rating_histogram,
+                version=Book.version + 1,
+                update_at=Book.update_at,
+            )
+            .returning(Book.uid)
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.exec(statement)
+        return result.scalars().all()
+
     async def create_book(self, book_data: BookCreateModel, user_uid:str,session: AsyncSession):
         book_data_dict = book_data.model_dump()
         new_book = Book(**book_data_dict)
@@ -32,31 +435,132 @@ class BookService:
         ).date()
 
         new_book.user_uid=user_uid
+        # assigned here rather than at flush so the event can carry it
+        new_book.uid = uuid.uuid4()
         session.add(new_book)
+        record_event(session, "book.created", book_uid=new_book.uid, user_uid=user_uid)
         await session.commit()  
         return new_book
 
     async def update_book(
         self, book_uid: str, update_data: BookUpdateModel, session: AsyncSession
     ):
-        book_to_update = await self.get_book(book_uid, session)
+        statement = (
+            update(Book)
+            .where(Book.uid == book_uid)
+            .values(**update_data.model_dump(), version=Book.version + 1)
+            .returning(Book)
+        )
+        result = await session.exec(statement)
+        updated_book = result.scalar_one_or_none()
 
-        if book_to_update is not None:
-            update_data_dict = update_data.model_dump()
+        if updated_book is None:
+            await session.rollback()
+            raise BookNotFound()
 
-            for k, v in update_data_dict.items():
-                setattr(book_to_update, k, v)
+        record_event(session, "book.updated", book_uid=book_uid)
+        await session.commit()
+        await book_detail_cache.invalidate(str(book_uid))
+        return updated_book
 
-            await session.commit()
+    async def delete_book(self, book_uid: str, session: AsyncSession):
+        # lock first so links added meanwhile are committed before the
+        # DELETE's snapshot is taken and get counted below
+        locked = await session.exec(
+            select(Book.uid).where(Book.uid == book_uid).with_for_update()
+        )
+        if locked.first() is None:
+            await session.rollback()
+            raise BookNotFound()
 
-            return book_to_update
-        else:
-            return None
+        # reviews are detached and tag links removed by the foreign keys;
+        # RETURNING reads the links from the pre-delete snapshot
+        tag_uids = (
+            select(func.array_agg(BookTag.tag_uid))
+            .where(BookTag.book_uid == Book.uid)
+            .scalar_subquery()
+        )
+        statement = delete(Book).where(Book.uid == book_uid).returning(Book.uid, tag_uids)
+        result = await session.exec(statement)
+        deleted_uid, tag_uids = result.one()
 
-    async def delete_book(self, book_uid: str, session: AsyncSession):
-        book_to_delete = await self.get_book(book_uid, session)
-        if book_to_delete is not None:
-            await session.delete(book_to_delete)
+        await adjust_tag_counts(session, tag_uids or [], delta=-1)
+        record_event(session, "book.deleted", book_uid=deleted_uid, tag_uids=tag_uids or [])
+        await session.commit()
+        await book_detail_cache.invalidate(str(book_uid))
+        return deleted_uid
+
+    async def bulk_create_books(
+        self,
+        records: AsyncIterator,
+        user_uid: str,
+        session: AsyncSession,
+        batch_size: int = Config.BULK_IMPORT_BATCH_SIZE,
+    ):
+        started = time.perf_counter()
+        summary = {"inserted": 0, "failed": 0, "errors": []}
+        owner_uid = uuid.UUID(user_uid)
+        batch = []
+
+        async for row_number, record in records:
+            if isinstance(record, Exception):
+                self._record_failure(summary, row_number, [str(record)])
+                continue
+
+            try:
+                book_data = BookCreateModel.model_validate(record)
+                row = book_data.model_dump()
+                row["published_date"] = date.fromisoformat(row["published_date"])
+            except ValidationError as e:
+                messages = [
+                    f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+                    for err in e.errors()
+                ]
+                self._record_failure(summary, row_number, messages)
+                continue
+            except ValueError as e:
+                self._record_failure(summary, row_number, [f"published_date: {e}"])
+                continue
+
+            row["user_uid"] = owner_uid
+            batch.append((row_number, row))
+
+            if len(batch) >= batch_size:
+                await self._insert_batch(batch, session, summary)
+                batch = []
+
+        if batch:
+            await self._insert_batch(batch, session, summary)
+
+        elapsed = time.perf_counter() - started
+        summary["elapsed_seconds"] = round(elapsed, 3)
+        summary["rows_per_second"] = round(summary["inserted"] / elapsed, 1) if elapsed else 0.0
+        return summary
+
+    async def _insert_batch(self, batch: list, session: AsyncSession, summary: dict):
+        now = datetime.now()
+        for _, row in batch:
+            row["created_at"] = row["update_at"] = now
+
+        try:
+            await session.exec(insert(Book), params=[row for _, row in batch])
             await session.commit()
-        else:
-            return None
+            summary["inserted"] += len(batch)
+            return
+        except DBAPIError:
+            await session.rollback()
+
+        # the batch was rejected as a whole; retry row by row to find the culprits
+        for row_number, row in batch:
+            try:
+                await session.exec(insert(Book), params=[row])
+                await session.commit()
+                summary["inserted"] += 1
+            except DBAPIError as e:
+                await session.rollback()
+                self._record_failure(summary, row_number, [str(e.orig)])
+
+    def _record_failure(self, summary: dict, row_number: int, messages: list):
+        summary["failed"] += 1
+        if len(summary["errors"]) < Config.BULK_IMPORT_MAX_ERRORS:
+            summary["errors"].append({"row": row_number, "errors": messages})
@@ -1,15 +1,36 @@
 from celery import Celery
-from .mail import mail, create_message
+from .books import leaderboard
+from .books.services import BookService
+from .db import outbox
+from .db.main import async_engine, async_session
+from .db.redis import redis_client
 from asgiref.sync import async_to_sync
 
 c_app = Celery("worker")
 
 c_app.config_from_object('source.config')
 
+async def _run_with_session(job):
+    try:
+        async with async_session() as session:
+            return await job(session)
+    finally:
+        # async_to_sync runs every task on a fresh event loop, so pooled
+        # connections from this run cannot be reused by the next one
+        await async_engine.dispose()
+        await redis_client.connection_pool.disconnect()
+
+
+@c_app.task()
+def reconcile_rating_stats():
+    return async_to_sync(_run_with_session)(BookService().reconcile_rating_stats)
+
+
+@c_app.task()
+def refresh_leaderboards():
+    async_to_sync(_run_with_session)(leaderboard.refresh_leaderboards)
+
+
 @c_app.task()
-def send_email(recipients:list[str], subject:str, body:str):
-    message = create_message(
-        recipients=recipients, subject=subject, body=body
-    )
-    
-    async_to_sync(mail.send_message)(message)
\ No newline at end of file
+def purge_outbox():
+    return async_to_sync(_run_with_session)(outbox.purge_dispatched_events)
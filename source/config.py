@@ -17,8 +17,64 @@ class Settings(BaseSettings):
     USE_CREDENTIALS: bool = True
     VALIDATE_CERTS: bool = True
     
+    MAIL_POOL_SIZE:int=4
+    MAIL_BATCH_SIZE:int=50
+    MAIL_MAX_ATTEMPTS:int=5
+    MAIL_RETRY_BASE_DELAY:float=5.0
+    
+    PUBLISH_QUEUE_SIZE:int=10000
+    PUBLISH_BATCH_SIZE:int=100
+    PUBLISH_ENQUEUE_TIMEOUT:float=0.05
+
+    OUTBOX_BATCH_SIZE:int=100
+    OUTBOX_POLL_INTERVAL:float=1.0
+    OUTBOX_MAX_ATTEMPTS:int=10
+    OUTBOX_RETRY_BASE_DELAY:float=1.0
+    OUTBOX_RETENTION:int=7 * 24 * 60 * 60
+    OUTBOX_PURGE_INTERVAL:int=60 * 60
+    
     DOMAIN:str
 
+    RAISE_ON_UNLOADED_RELATIONSHIPS:bool=False
+
+    BOOK_CACHE_MAXSIZE:int=10000
+    BOOK_CACHE_LOCAL_TTL:int=30
+    BOOK_CACHE_REDIS_TTL:int=600
+
+    BCRYPT_ROUNDS:int=12
+    PASSWORD_HASH_CONCURRENCY:int=4
+
+    RATE_LIMIT_ENABLED:bool=True
+    RATE_LIMIT_LEASE_TTL:float=1.0
+    RATE_LIMIT_LOCAL_KEYS:int=100000
+    TRUSTED_PROXY_HOPS:int=1
+
+    PRINCIPAL_CACHE_MAXSIZE:int=10000
+    PRINCIPAL_CACHE_TTL:int=60
+
+    TAG_CACHE_RECHECK_INTERVAL:float=1.0
+    TAG_CACHE_MAX_AGE:int=300
+
+    BLOCKLIST_RESYNC_INTERVAL:int=60
+    BLOCKLIST_MAX_STALENESS:int=120
+
+    BULK_IMPORT_BATCH_SIZE:int=1000
+    BULK_IMPORT_MAX_BATCH_SIZE:int=10000
+    BULK_IMPORT_MAX_ERRORS:int=1000
+    REVIEW_IMPORT_MAX_ROWS:int=5000
+
+    EXPORT_CHUNK_BYTES:int=64 * 1024
+    EXPORT_YIELD_PER:int=1000
+
+    RATING_RECONCILE_BATCH_SIZE:int=5000
+    RATING_RECONCILE_INTERVAL:int=24 * 60 * 60
+
+    LEADERBOARD_SIZE:int=1000
+    LEADERBOARD_PRIOR_WEIGHT:float=10.0
+    LEADERBOARD_REFRESH_INTERVAL:int=5 * 60
+    TRENDING_WINDOW_DAYS:int=7
+    TRENDING_HALF_LIFE_HOURS:float=48.0
+
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
@@ -26,4 +82,18 @@ Config = Settings()
 
 broker_url = Config.REDIS_URL
 result_backend = Config.REDIS_URL
+beat_schedule = {
+    "reconcile-rating-stats": {
+        "task": "source.celery_task.reconcile_rating_stats",
+        "schedule": Config.RATING_RECONCILE_INTERVAL,
+    },
+    "refresh-leaderboards": {
+        "task": "source.celery_task.refresh_leaderboards",
+        "schedule": Config.LEADERBOARD_REFRESH_INTERVAL,
+    },
+    "purge-outbox": {
+        "task": "source.celery_task.purge_outbox",
+        "schedule": Config.OUTBOX_PURGE_INTERVAL,
+    },
+}
 
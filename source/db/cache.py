@@ -0,0 +1,208 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+from prometheus_client import Counter
+from redis.exceptions import RedisError
+
+from source.db import pubsub
+from source.db.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+cache_hits = Counter("cache_hits_total", "Cache hits", ["cache", "tier"])
+cache_misses = Counter("cache_misses_total", "Cache misses", ["cache"])
+
+# KEYS[1] value, KEYS[2] generation; ARGV value, expected generation, ttl.
+# Stores the value only if the key was not invalidated since the generation
+# was read.
+GUARDED_SET = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[2] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+return 1
+"""
+
+# KEYS[1] value, KEYS[2] generation; ARGV ttl of the generation
+INVALIDATE = """
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+redis.call('DEL', KEYS[1])
+return 1
+"""
+
+Generation = Tuple[int, Optional[bytes]]
+
+
+class LocalTTLCache:
+    """Bounded in-process LRU cache whose entries expire after ``ttl`` seconds"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class BroadcastTTLCache:
+    """Per-worker LRU+TTL cache of Python objects, kept coherent across
+    workers by broadcasting invalidations. There is no shared tier, so a hit
+    costs no I/O at all; a missed broadcast is bounded by ``ttl``.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.local = LocalTTLCache(maxsize=maxsize, ttl=ttl)
+        pubsub.subscribe(INVALIDATION_CHANNEL, self._on_invalidation)
+
+    def _on_invalidation(self, message: str) -> None:
+        name, _, key = message.partition(":")
+        if name == self.name:
+            self.local.pop(key)
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is None:
+            cache_misses.labels(self.name).inc()
+        else:
+            cache_hits.labels(self.name, "local").inc()
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self.local.set(key, value)
+
+    async def invalidate(self, key: str) -> None:
+        self.local.pop(key)
+        await pubsub.publish(INVALIDATION_CHANNEL, f"{self.name}:{key}")
+
+
+class TwoTierCache:
+    """Read-through byte cache: a per-worker L1 in front of a shared Redis L2.
+
+    ``invalidate`` drops the key from Redis and broadcasts it so that every
+    worker evicts its L1 copy. Redis failures degrade to cache misses rather
+    than failing the request.
+
+    A reader filling a miss takes ``generation(key)`` before reading the
+    database and passes it to ``set``, which then stores nothing if the key
+    was invalidated in between: otherwise a write committing during the read
+    would be cached over with the old value. Redis keeps a per-key counter
+    that ``invalidate`` bumps; the L1 check uses one per-worker counter of
+    invalidations, which can only skip a fill it did not need to.
+    """
+
+    def __init__(self, name: str, maxsize: int, local_ttl: float, remote_ttl: int):
+        self.name = name
+        self.remote_ttl = remote_ttl
+        self.local = LocalTTLCache(maxsize=maxsize, ttl=local_ttl)
+        self._epoch = 0
+        pubsub.subscribe(INVALIDATION_CHANNEL, self._on_invalidation)
+
+    def _remote_key(self, key: str) -> str:
+        return f"cache:{self.name}:{key}"
+
+    def _generation_key(self, key: str) -> str:
+        return f"cache:{self.name}:gen:{key}"
+
+    def _on_invalidation(self, message: str) -> None:
+        name, _, key = message.partition(":")
+        if name == self.name:
+            self._epoch += 1
+            self.local.pop(key)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = self.local.get(key)
+        if value is not None:
+            cache_hits.labels(self.name, "local").inc()
+            return value
+
+        try:
+            value = await redis_client.get(self._remote_key(key))
+        except RedisError:
+            logger.warning("redis unavailable for cache %s", self.name)
+            value = None
+
+        if value is not None:
+            cache_hits.labels(self.name, "redis").inc()
+            self.local.set(key, value)
+            return value
+
+        cache_misses.labels(self.name).inc()
+        return None
+
+    async def generation(self, key: str) -> Generation:
+        """Take before reading the value to ``set`` from the database"""
+        try:
+            remote = await redis_client.get(self._generation_key(key))
+        except RedisError:
+            logger.warning("redis unavailable for cache %s", self.name)
+            return self._epoch, None
+        return self._epoch, remote or b"0"
+
+    async def set(self, key: str, value: bytes, generation: Generation) -> None:
+        epoch, remote = generation
+        if remote is not None:
+            try:
+                stored = await redis_client.eval(
+                    GUARDED_SET,
+                    2,
+                    self._remote_key(key),
+                    self._generation_key(key),
+                    value,
+                    remote,
+                    self.remote_ttl,
+                )
+            except RedisError:
+                logger.warning("redis unavailable for cache %s", self.name)
+            else:
+                if not stored:
+                    return
+        if epoch == self._epoch:
+            self.local.set(key, value)
+
+    async def invalidate(self, key: str) -> None:
+        self._epoch += 1
+        self.local.pop(key)
+        try:
+            await redis_client.eval(
+                INVALIDATE,
+                2,
+                self._remote_key(key),
+                self._generation_key(key),
+                # outlives any value a reader could still be about to set
+                self.remote_ttl,
+            )
+        except RedisError:
+            logger.warning("redis unavailable for cache %s", self.name)
+        await pubsub.publish(INVALIDATION_CHANNEL, f"{self.name}:{key}")
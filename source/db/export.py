@@ -0,0 +1,67 @@
+import json
+import uuid
+from datetime import date, datetime
+from typing import AsyncIterator
+
+from source.config import Config
+from source.db.main import async_session
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+async def stream_ndjson(
+    statement,
+    chunk_size: int = Config.EXPORT_CHUNK_BYTES,
+    yield_per: int = Config.EXPORT_YIELD_PER,
+) -> AsyncIterator[bytes]:
+    """Stream the rows of a column select as NDJSON in chunks of ~chunk_size bytes.
+
+    Rows come from a server-side cursor ``yield_per`` at a time, so memory use
+    depends on the chunk and fetch sizes, never on the table size. The export
+    opens its own session because the response body is produced after the
+    request's dependencies have been torn down.
+    """
+    async with async_session() as session:
+        result = await session.stream(
+            statement.execution_options(yield_per=yield_per)
+        )
+        buffer = bytearray()
+
+        async for row in result.mappings():
+            buffer += json.dumps(
+                dict(row), default=_json_default, separators=(",", ":")
+            ).encode()
+            buffer += b"\n"
+
+            if len(buffer) >= chunk_size:
+                yield bytes(buffer)
+                buffer.clear()
+
+        if buffer:
+            yield bytes(buffer)
+
+
+async def start_ndjson(statement, **options) -> AsyncIterator[bytes]:
+    """``stream_ndjson``, with the statement run and its first chunk read
+    before returning. Call it before building the response so that a failing
+    query becomes an error response instead of a truncated 200 download.
+    """
+    chunks = stream_ndjson(statement, **options)
+    try:
+        first = await anext(chunks)
+    except StopAsyncIteration:
+        first = b""
+
+    async def body():
+        if first:
+            yield first
+        async for chunk in chunks:
+            yield chunk
+
+    return body()
@@ -0,0 +1,32 @@
+"""Named relationship-loading shapes for service queries.
+
+Relationships on the models are lazy by default, so a plain ``select(Book)``
+only loads the ``books`` columns. A service method that needs children asks
+for them explicitly by passing one of these shapes to ``.options()``.
+
+When ``RAISE_ON_UNLOADED_RELATIONSHIPS`` is enabled (the test suite turns it
+on) every shape also adds ``raiseload("*")``, so touching a relationship the
+query did not ask for fails loudly instead of emitting hidden SQL.
+"""
+
+from sqlalchemy.orm import raiseload, selectinload
+
+from source.config import Config
+from source.db.models import Book, Review, Tag
+
+
+def load_shape(*options):
+    if Config.RAISE_ON_UNLOADED_RELATIONSHIPS:
+        return (*options, raiseload("*"))
+    return options
+
+
+BOOK_LIST = load_shape()
+# reviews are loaded separately, newest BOOK_DETAIL_REVIEWS only
+BOOK_DETAIL = load_shape(selectinload(Book.tags))
+
+USER_PRINCIPAL = load_shape()
+
+TAG_LIST = load_shape()
+
+REVIEW_LIST = load_shape()
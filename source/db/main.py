@@ -6,6 +6,10 @@ from sqlalchemy.orm import sessionmaker
 
 async_engine = AsyncEngine(create_engine(url=Config.DATABASE_URL, echo=False))
 
+async_session = sessionmaker(
+    bind=async_engine, class_=AsyncSession, expire_on_commit=False
+)
+
 
 async def init_db():
     async with async_engine.begin() as conn:    
@@ -13,9 +17,5 @@ async def init_db():
 
 
 async def get_sessiion():
-    Session = sessionmaker(
-        bind=async_engine, class_=AsyncSession, expire_on_commit=False
-    )
-
-    async with Session() as session:
+    async with async_session() as session:
         yield session
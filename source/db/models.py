@@ -1,12 +1,23 @@
 import sqlalchemy.dialects.postgresql as pg
-from sqlmodel import SQLModel, Column, Field, VARCHAR, Relationship
+from sqlmodel import SQLModel, Column, Field, VARCHAR, Relationship, Index
+from sqlalchemy import BigInteger, Computed, Identity, UniqueConstraint, text
 import uuid
 from datetime import datetime, date, timezone
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
+
+
+def naive_timestamp(value: Optional[datetime]) -> Optional[datetime]:
+    """The TIMESTAMP columns hold naive local time (``datetime.now``), which
+    asyncpg refuses to compare with aware datetimes; convert those to the
+    local zone and drop the offset"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
 
 
 class User(SQLModel, table=True):
     __tablename__ = "users"
+    __table_args__ = (UniqueConstraint("email", name="uq_users_email"),)
 
     uid: uuid.UUID = Field(
         sa_column=Column(pg.UUID, nullable=False, primary_key=True, default=uuid.uuid4)
@@ -21,26 +32,37 @@ class User(SQLModel, table=True):
     )
     isverified: bool = Field(default=False)
     password_hash: str = Field(exclude=True)
-    created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now()))
-    update_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now()))
-    books: List["Book"] = Relationship(
-        back_populates="user", sa_relationship_kwargs={"lazy": "selectin"}
-    )
-    reviews: List["Review"] = Relationship(
-        back_populates="user", sa_relationship_kwargs={"lazy": "selectin"}
+    created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
+    update_at: datetime = Field(
+        sa_column=Column(pg.TIMESTAMP, default=datetime.now, onupdate=datetime.now)
     )
+    books: List["Book"] = Relationship(back_populates="user")
+    reviews: List["Review"] = Relationship(back_populates="user")
 
     def __repr__(self):
         return f"<User {self.username}>"
 
 
 class BookTag(SQLModel, table=True):
-    book_uid: uuid.UUID = Field(default=None, foreign_key="books.uid", primary_key=True)
-    tag_uid: uuid.UUID = Field(default=None, foreign_key="tags.uid", primary_key=True)
+    # the primary key leads with book_uid; lookups and facet filters by tag
+    # scan this one, index-only since it covers both columns
+    __table_args__ = (Index("ix_booktag_tag_uid_book_uid", "tag_uid", "book_uid"),)
+
+    book_uid: uuid.UUID = Field(
+        default=None, foreign_key="books.uid", primary_key=True, ondelete="CASCADE"
+    )
+    tag_uid: uuid.UUID = Field(
+        default=None, foreign_key="tags.uid", primary_key=True, ondelete="CASCADE"
+    )
 
 
 class Book(SQLModel, table=True):
     __tablename__ = "books"
+    __table_args__ = (
+        Index("ix_books_created_at_uid", "created_at", "uid"),
+        Index("ix_books_user_uid_created_at_uid", "user_uid", "created_at", "uid"),
+        Index("ix_books_rating_avg_created_at_uid", "rating_avg", "created_at", "uid"),
+    )
 
     uid: uuid.UUID = Field(
         sa_column=Column(pg.UUID, nullable=False, primary_key=True, default=uuid.uuid4)
@@ -52,42 +74,102 @@ class Book(SQLModel, table=True):
     page_count: int
     language: str
     user_uid: Optional[uuid.UUID] = Field(default=None, foreign_key="users.uid")
-    created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now()))
-    update_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now()))
+    created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
+    update_at: datetime = Field(
+        sa_column=Column(pg.TIMESTAMP, default=datetime.now, onupdate=datetime.now)
+    )
+    # bumped whenever the book or its reviews/tags change; feeds the ETag
+    version: int = Field(
+        default=1, sa_column=Column(pg.INTEGER, nullable=False, default=1, server_default="1")
+    )
+    # rating stats, maintained in the same transaction as every review write
+    review_count: int = Field(
+        default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0")
+    )
+    rating_sum: int = Field(
+        default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0")
+    )
+    rating_avg: float = Field(
+        default=0.0,
+        sa_column=Column(pg.DOUBLE_PRECISION, nullable=False, server_default="0"),
+    )
+    rating_histogram: Dict[str, int] = Field(
+        default_factory=dict,
+        sa_column=Column(pg.JSONB, nullable=False, server_default=text("'{}'::jsonb")),
+    )
     user: Optional["User"] = Relationship(back_populates="books")
     reviews: List["Review"] = Relationship(
-        back_populates="book", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="book", sa_relationship_kwargs={"passive_deletes": True}
     )
     tags: List["Tag"] = Relationship(
         link_model=BookTag,
         back_populates="books",
-        sa_relationship_kwargs={"lazy": "selectin"},
+        sa_relationship_kwargs={"passive_deletes": True},
     )
 
     def __repr__(self):
         return f"<Book {self.title}>"
 
 
+# Weighted full-text document for book search. The generated column lives on
+# the table but is deliberately left unmapped, so ordinary selects of Book
+# never fetch it; queries reach it through BOOK_SEARCH_VECTOR.
+BOOK_SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(author, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(publisher, '')), 'C')"
+)
+Book.__table__.append_column(
+    Column("search_vector", pg.TSVECTOR, Computed(BOOK_SEARCH_DOCUMENT, persisted=True))
+)
+BOOK_SEARCH_VECTOR = Book.__table__.c.search_vector
+Index("ix_books_search_vector", BOOK_SEARCH_VECTOR, postgresql_using="gin")
+
+
 class Tag(SQLModel, table=True):
     __tablename__ = "tags"
+    __table_args__ = (UniqueConstraint("name", name="uq_tags_name"),)
 
     uid: uuid.UUID = Field(
         sa_column=Column(pg.UUID, nullable=False, primary_key=True, default=uuid.uuid4)
     )
     name: str = Field(sa_column=Column(pg.VARCHAR, nullable=False))
-    created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now()))
+    created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
     books: List["Book"] = Relationship(
         link_model=BookTag,
         back_populates="tags",
-        sa_relationship_kwargs={"lazy": "selectin"},
+        sa_relationship_kwargs={"passive_deletes": True},
     )
 
     def __repr__(self):
         return f"<Tag {self.name}>"
 
 
+class TagBookCount(SQLModel, table=True):
+    """How many books carry each tag, kept up to date by every write to
+    booktag so unfiltered facets never count the link table"""
+
+    __tablename__ = "tag_book_counts"
+
+    tag_uid: uuid.UUID = Field(
+        default=None, foreign_key="tags.uid", primary_key=True, ondelete="CASCADE"
+    )
+    book_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+
+
 class Review(SQLModel, table=True):
     __tablename__ = "reviews"
+    __table_args__ = (
+        Index("ix_reviews_user_uid_created_at_uid", "user_uid", "created_at", "uid"),
+        Index("ix_reviews_book_uid_created_at_uid", "book_uid", "created_at", "uid"),
+        Index(
+            "ix_reviews_book_uid_rating_created_at_uid",
+            "book_uid",
+            "rating",
+            "created_at",
+            "uid",
+        ),
+    )
 
     uid: uuid.UUID = Field(
         sa_column=Column(pg.UUID, primary_key=True, nullable=False, default=uuid.uuid4)
@@ -95,11 +177,51 @@ class Review(SQLModel, table=True):
     rating: int = Field(lt=5)
     review_text: str
     user_uid: Optional[uuid.UUID] = Field(default=None, foreign_key="users.uid")
-    book_uid: Optional[uuid.UUID] = Field(default=None, foreign_key="books.uid")
-    created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now()))
-    update_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now()))
+    book_uid: Optional[uuid.UUID] = Field(
+        default=None, foreign_key="books.uid", ondelete="SET NULL"
+    )
+    created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
+    update_at: datetime = Field(
+        sa_column=Column(pg.TIMESTAMP, default=datetime.now, onupdate=datetime.now)
+    )
     user: Optional[User] = Relationship(back_populates="reviews")
     book: Optional[Book] = Relationship(back_populates="reviews")
 
     def __repr__(self):
         return f"<Review for book {self.book_uid} by user {self.user_uid}"
+
+
+class OutboxEvent(SQLModel, table=True):
+    """A domain event written in the same transaction as the change it
+    describes; source.db.outbox hands it to its handlers after commit"""
+
+    __tablename__ = "outbox"
+    # the dispatcher only ever scans undelivered events in id order
+    __table_args__ = (
+        Index(
+            "ix_outbox_pending",
+            "available_at",
+            "id",
+            postgresql_where=text("dispatched_at IS NULL"),
+        ),
+    )
+
+    id: Optional[int] = Field(
+        default=None, sa_column=Column(BigInteger, Identity(), primary_key=True)
+    )
+    topic: str = Field(sa_column=Column(pg.VARCHAR, nullable=False))
+    payload: Dict[str, Any] = Field(
+        default_factory=dict, sa_column=Column(pg.JSONB, nullable=False)
+    )
+    attempts: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    last_error: Optional[str] = None
+    created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
+    available_at: datetime = Field(
+        sa_column=Column(pg.TIMESTAMP, nullable=False, default=datetime.now)
+    )
+    dispatched_at: Optional[datetime] = Field(
+        default=None, sa_column=Column(pg.TIMESTAMP, nullable=True)
+    )
+
+    def __repr__(self):
+        return f"<OutboxEvent {self.id} {self.topic}>"
@@ -0,0 +1,168 @@
+"""Transactional outbox for domain events.
+
+Service methods call ``record_event(session, topic, **payload)`` before they
+commit, so the event row lands in the same transaction as the change it
+describes: it exists if and only if the change does. The dispatcher started
+from the application lifespan then claims undelivered rows in id order with
+``FOR UPDATE SKIP LOCKED``, so any number of workers can drain the table
+without handing out the same event twice at once, and passes each one to the
+handlers registered for its topic with ``@handles(topic)``.
+
+A delivered event is marked with ``dispatched_at``, which is the dispatcher's
+offset: everything below the oldest row still pending has been handled.
+Events whose handlers raise are retried with exponential backoff, up to
+``OUTBOX_MAX_ATTEMPTS`` times. After that they are dead: parked in the table
+with their ``last_error`` for inspection, counted in
+``outbox_events_dead_total``, and purged with the delivered events once
+older than ``OUTBOX_RETENTION``. Delivery is at-least-once; a worker dying
+between running the handlers and committing the marker delivers the batch
+again, so handlers must be idempotent.
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List
+
+from prometheus_client import Counter, Gauge
+from pydantic_core import to_jsonable_python
+from sqlmodel import delete, or_, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from source.config import Config
+from source.db.main import async_session
+from source.db.models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY = 15 * 60
+MAX_POLL_BACKOFF = 30.0
+
+Handler = Callable[[dict], Awaitable[None]]
+_handlers: Dict[str, List[Handler]] = defaultdict(list)
+
+events_dispatched = Counter(
+    "outbox_events_dispatched_total", "Events handed to every handler", ["topic"]
+)
+events_failed = Counter(
+    "outbox_events_failed_total", "Deliveries where a handler raised", ["topic"]
+)
+events_dead = Counter(
+    "outbox_events_dead_total", "Events given up on after OUTBOX_MAX_ATTEMPTS", ["topic"]
+)
+last_dispatched = Gauge("outbox_last_dispatched_id", "Highest event id delivered by this worker")
+
+
+def handles(*topics: str):
+    """Register the decorated coroutine for events on ``topics``"""
+
+    def register(handler: Handler) -> Handler:
+        for topic in topics:
+            _handlers[topic].append(handler)
+        return handler
+
+    return register
+
+
+def record_event(session: AsyncSession, topic: str, **payload) -> None:
+    """Add an event to the caller's transaction; it is only dispatched if that
+    transaction commits"""
+    session.add(OutboxEvent(topic=topic, payload=to_jsonable_python(payload)))
+
+
+class OutboxDispatcher:
+    def __init__(
+        self, batch_size: int, poll_interval: float, max_attempts: int, retry_delay: float
+    ):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    async def _deliver(self, event: OutboxEvent) -> None:
+        for handler in _handlers.get(event.topic, ()):
+            await handler(event.payload)
+
+    async def dispatch_batch(self, session: AsyncSession) -> int:
+        """Deliver up to ``batch_size`` due events; returns how many were claimed"""
+        now = datetime.now()
+        statement = (
+            select(OutboxEvent)
+            .where(
+                OutboxEvent.dispatched_at.is_(None),
+                OutboxEvent.available_at <= now,
+                OutboxEvent.attempts < self.max_attempts,
+            )
+            .order_by(OutboxEvent.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        result = await session.exec(statement)
+        events = result.all()
+
+        for event in events:
+            try:
+                await self._deliver(event)
+            except Exception as e:
+                events_failed.labels(event.topic).inc()
+                event.attempts += 1
+                event.last_error = repr(e)
+                delay = self.retry_delay * 2 ** (event.attempts - 1)
+                event.available_at = now + timedelta(seconds=min(delay, MAX_RETRY_DELAY))
+                if event.attempts >= self.max_attempts:
+                    events_dead.labels(event.topic).inc()
+                    logger.error("giving up on outbox event %s (%s)", event.id, event.topic)
+                else:
+                    logger.warning("outbox event %s (%s) failed, retrying", event.id, event.topic)
+                continue
+            event.dispatched_at = now
+            events_dispatched.labels(event.topic).inc()
+
+        await session.commit()
+        delivered = [event.id for event in events if event.dispatched_at is not None]
+        if delivered:
+            last_dispatched.set(max(delivered))
+        return len(events)
+
+    async def run(self) -> None:
+        """Dispatch until cancelled; started once per worker from the lifespan"""
+        backoff = self.poll_interval
+        while True:
+            try:
+                async with async_session() as session:
+                    claimed = await self.dispatch_batch(session)
+            except Exception:
+                # nothing awaits this task, so anything escaping here would
+                # end delivery silently for the rest of the worker's life
+                logger.exception("outbox dispatch failed, retrying in %.1fs", backoff)
+                await asyncio.sleep(backoff)
+                backoff = min(max(backoff, 0.1) * 2, MAX_POLL_BACKOFF)
+                continue
+            backoff = self.poll_interval
+            # a full batch means there is a backlog, keep going without sleeping
+            if claimed < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+
+async def purge_dispatched_events(session: AsyncSession) -> int:
+    """Delete delivered and dead events older than ``OUTBOX_RETENTION`` seconds"""
+    cutoff = datetime.now() - timedelta(seconds=Config.OUTBOX_RETENTION)
+    statement = delete(OutboxEvent).where(
+        or_(
+            OutboxEvent.dispatched_at < cutoff,
+            (OutboxEvent.attempts >= Config.OUTBOX_MAX_ATTEMPTS)
+            & (OutboxEvent.created_at < cutoff),
+        )
+    )
+    result = await session.exec(statement)
+    await session.commit()
+    return result.rowcount
+
+
+dispatcher = OutboxDispatcher(
+    batch_size=Config.OUTBOX_BATCH_SIZE,
+    poll_interval=Config.OUTBOX_POLL_INTERVAL,
+    max_attempts=Config.OUTBOX_MAX_ATTEMPTS,
+    retry_delay=Config.OUTBOX_RETRY_BASE_DELAY,
+)
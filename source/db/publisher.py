@@ -0,0 +1,119 @@
+"""Background publisher for Redis work queues.
+
+Handlers call ``publisher.push(key, payload)``, which only puts the payload on
+a bounded in-process queue; a single task started from the application
+lifespan drains it and LPUSHes everything it has in one pipelined round trip,
+up to ``PUBLISH_BATCH_SIZE`` payloads at a time. Broker latency therefore
+never lands on the request path.
+
+When Redis is slow or down the batch in hand is retried and the queue fills
+up. A push then waits up to ``PUBLISH_ENQUEUE_TIMEOUT`` seconds for room and
+raises ``PublishQueueFull`` after that, so requests fail fast instead of
+piling up behind the broker. Payloads still queued when the worker stops are
+lost.
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+
+from prometheus_client import Counter, Gauge, Histogram
+from redis.exceptions import RedisError
+
+from source.config import Config
+from source.db.redis import redis_client
+from source.errors import PublishQueueFull
+
+logger = logging.getLogger(__name__)
+
+RETRY_DELAY = 0.1
+MAX_RETRY_DELAY = 5.0
+
+enqueue_seconds = Histogram(
+    "publish_enqueue_seconds",
+    "Time a request spent handing a payload to the publisher",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5),
+)
+publish_seconds = Histogram(
+    "publish_latency_seconds", "Time from push until Redis acknowledged the payload"
+)
+publish_rejected = Counter("publish_rejected_total", "Pushes refused on a full queue")
+publish_errors = Counter("publish_errors_total", "Failed pipelined publishes")
+queue_depth = Gauge("publish_queue_depth", "Payloads waiting to be published")
+
+
+class QueuePublisher:
+    def __init__(self, maxsize: int, batch_size: int, enqueue_timeout: float):
+        self.batch_size = batch_size
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    async def push(self, key: str, payload: str) -> None:
+        """Queue ``payload`` for an LPUSH onto ``key``"""
+        started = time.perf_counter()
+        item = (key, payload, started)
+        try:
+            try:
+                self._queue.put_nowait(item)
+            except asyncio.QueueFull:
+                await asyncio.wait_for(self._queue.put(item), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            publish_rejected.inc()
+            raise PublishQueueFull()
+        finally:
+            enqueue_seconds.observe(time.perf_counter() - started)
+
+    async def _next_batch(self) -> list:
+        batch = [await self._queue.get()]
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _publish(self, batch: list) -> None:
+        payloads = defaultdict(list)
+        for key, payload, _ in batch:
+            payloads[key].append(payload)
+
+        delay = RETRY_DELAY
+        while True:
+            try:
+                async with redis_client.pipeline(transaction=False) as pipe:
+                    for key, values in payloads.items():
+                        pipe.lpush(key, *values)
+                    await pipe.execute()
+                break
+            except RedisError:
+                publish_errors.inc()
+                logger.warning("could not publish %d payloads, retrying", len(batch))
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+
+        acked = time.perf_counter()
+        for _, _, pushed_at in batch:
+            publish_seconds.observe(acked - pushed_at)
+
+    async def run(self) -> None:
+        """Publish until cancelled; started once per worker from the lifespan"""
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._publish(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def drain(self, timeout: float) -> None:
+        """Wait for queued payloads to be published, for at most ``timeout``"""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("dropping %d unpublished payloads", self._queue.qsize())
+
+
+publisher = QueuePublisher(
+    maxsize=Config.PUBLISH_QUEUE_SIZE,
+    batch_size=Config.PUBLISH_BATCH_SIZE,
+    enqueue_timeout=Config.PUBLISH_ENQUEUE_TIMEOUT,
+)
+queue_depth.set_function(publisher._queue.qsize)
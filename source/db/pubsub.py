@@ -0,0 +1,79 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List
+
+from redis.exceptions import RedisError
+
+from source.db.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY = 1.0
+
+_handlers: Dict[str, List[Callable[[str], None]]] = defaultdict(list)
+_connect_hooks: List[Callable[[], Awaitable[None]]] = []
+
+
+def subscribe(channel: str, handler: Callable[[str], None]) -> None:
+    """Register a handler that is called with every message on ``channel``.
+
+    Handlers run on the event loop and must not block.
+    """
+    _handlers[channel].append(handler)
+
+
+def on_connect(hook: Callable[[], Awaitable[None]]) -> None:
+    """Register a coroutine function that runs every time the listener has
+    (re)subscribed, so a subscriber can catch up on what it missed while
+    disconnected. Messages published meanwhile are delivered afterwards.
+    """
+    _connect_hooks.append(hook)
+
+
+async def publish(channel: str, message: str) -> None:
+    try:
+        await redis_client.publish(channel, message)
+    except RedisError:
+        logger.exception("could not publish to %s", channel)
+
+
+def _dispatch(channel: str, data: str) -> None:
+    for handler in _handlers.get(channel, ()):
+        try:
+            handler(data)
+        except Exception:
+            logger.exception("pub/sub handler for %s failed", channel)
+
+
+async def listen() -> None:
+    """Deliver messages for every subscribed channel until cancelled.
+
+    Started once per worker from the application lifespan. Reconnects after
+    Redis errors; messages published while disconnected are lost, so
+    subscribers must bound their staleness some other way (e.g. a TTL).
+    """
+    if not _handlers:
+        return
+
+    while True:
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(*_handlers.keys())
+            for hook in _connect_hooks:
+                try:
+                    await hook()
+                except RedisError:
+                    raise
+                except Exception:
+                    logger.exception("pub/sub connect hook failed")
+            async for message in pubsub.listen():
+                channel = message["channel"].decode()
+                _dispatch(channel, message["data"].decode())
+        except asyncio.CancelledError:
+            raise
+        except RedisError:
+            logger.warning("pub/sub connection lost, reconnecting")
+            await asyncio.sleep(RECONNECT_DELAY)
+        finally:
+            await pubsub.aclose()
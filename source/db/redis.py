@@ -3,12 +3,12 @@ from source.config import Config
 
 JTI_EXPIRY = 3600
 
-token_blocklist = Redis.from_url(Config.REDIS_URL)
+redis_client = Redis.from_url(Config.REDIS_URL)
 
 async def add_jti_to_blocklist(jti:str)->None:
-    await token_blocklist.set(name=jti, value="revoked", ex=JTI_EXPIRY)
+    await redis_client.set(name=jti, value="revoked", ex=JTI_EXPIRY)
     
 async def token_in_blocklist(jti:str)->bool:
-    jti = await token_blocklist.get(jti)
+    jti = await redis_client.get(jti)
     
-    return jti is not None
\ No newline at end of file
+    return jti is not None
@@ -80,6 +80,25 @@ class AccountNotVerified(BooklyException):
     
     pass
 
+
+class InvalidCursor(BooklyException):
+    """User has provided a pagination cursor that cannot be decoded"""
+
+    pass
+
+class RateLimitExceeded(BooklyException):
+    """User has made too many requests to a rate limited route"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+class PublishQueueFull(BooklyException):
+    """Background work could not be queued because the broker is falling behind"""
+
+    pass
+
 def create_exception_handler(
     status_code: int, initial_detail: Any
 ) -> Callable[[Request, Exception], JSONResponse]:
@@ -230,6 +249,42 @@ def register_all_errors(app:FastAPI):
         )
     )
 
+    app.add_exception_handler(
+        InvalidCursor,
+        create_exception_handler(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            initial_detail={
+                "message": "Invalid pagination cursor",
+                "error_code": "invalid_cursor",
+                "resolution": "Please start again from the first page",
+            },
+        ),
+    )
+
+    @app.exception_handler(RateLimitExceeded)
+    async def rate_limit_exceeded(request: Request, exc: RateLimitExceeded):
+        return JSONResponse(
+            content={
+                "message": "Too many requests",
+                "error_code": "rate_limited",
+                "resolution": f"Please retry after {exc.retry_after} seconds",
+            },
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
+    @app.exception_handler(PublishQueueFull)
+    async def publish_queue_full(request: Request, exc: PublishQueueFull):
+        return JSONResponse(
+            content={
+                "message": "Service is busy",
+                "error_code": "service_busy",
+                "resolution": "Please try again shortly",
+            },
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": "1"},
+        )
+
     @app.exception_handler(500)
     async def internal_server_error(request, exc):
         return JSONResponse(
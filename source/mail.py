@@ -1,30 +1,60 @@
-from fastapi_mail import FastMail, ConnectionConfig, MessageSchema, MessageType
-from .config import Config
+"""Outbound mail, queued in Redis and delivered by ``python -m source.mailer``.
+
+Request handlers neither render nor wait on SMTP or Redis: ``enqueue_email``
+hands the template name and its context to the background publisher, which
+pushes them onto a Redis list. The mailer
+process pops them in batches, renders the precompiled templates and sends
+over a pool of logged-in SMTP connections.
+"""
+
+import json
+from email.message import EmailMessage
 from pathlib import Path
 
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from .config import Config
+from .db.publisher import publisher
+
 BASE_DIR = Path(__file__).resolve().parent
+TEMPLATE_FOLDER = Path(BASE_DIR, "templates")
 
-mail_config = ConnectionConfig(
-    MAIL_USERNAME=Config.MAIL_USERNAME,
-    MAIL_PASSWORD=Config.MAIL_PASSWORD,
-    MAIL_FROM=Config.MAIL_FROM,
-    MAIL_PORT=Config.MAIL_PORT,
-    MAIL_SERVER=Config.MAIL_SERVER,
-    MAIL_FROM_NAME=Config.MAIL_FROM_NAME,
-    MAIL_STARTTLS=Config.MAIL_STARTTLS,
-    MAIL_SSL_TLS=Config.MAIL_SSL_TLS,
-    USE_CREDENTIALS=Config.USE_CREDENTIALS,
-    VALIDATE_CERTS=Config.VALIDATE_CERTS,
-    #TEMPLATE_FOLDER=Path(BASE_DIR, 'templates')
-)
+OUTBOX_KEY = "mail:outbox"
+RETRY_KEY = "mail:retry"
+DEAD_LETTER_KEY = "mail:dead"
 
-mail = FastMail(
-    config=mail_config
+templates = Environment(
+    loader=FileSystemLoader(TEMPLATE_FOLDER),
+    autoescape=select_autoescape(["html"]),
+    auto_reload=False,
+    cache_size=-1,
 )
 
-def create_message(recipients:list[str], subject:str, body:str):
-    message = MessageSchema(
-        recipients=recipients, subject=subject, body=body, subtype=MessageType.html
-    )
-    
-    return message
\ No newline at end of file
+
+def precompile_templates() -> None:
+    """Compile every template up front so sending never hits the disk"""
+    for name in templates.list_templates(extensions=["html"]):
+        templates.get_template(name)
+
+
+async def enqueue_email(
+    recipients: list[str], subject: str, template: str, context: dict = None
+) -> None:
+    job = {
+        "recipients": recipients,
+        "subject": subject,
+        "template": template,
+        "context": context or {},
+        "attempts": 0,
+    }
+    await publisher.push(OUTBOX_KEY, json.dumps(job))
+
+
+def create_message(recipients: list[str], subject: str, template: str, context: dict):
+    message = EmailMessage()
+    message["From"] = f"{Config.MAIL_FROM_NAME} <{Config.MAIL_FROM}>"
+    message["To"] = ", ".join(recipients)
+    message["Subject"] = subject
+    message.set_content(templates.get_template(template).render(**context), subtype="html")
+
+    return message
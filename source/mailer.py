@@ -0,0 +1,192 @@
+"""Mail delivery worker.
+
+Runs as its own long-lived process next to the API and the Celery worker:
+
+    python -m source.mailer
+
+One event loop for the life of the process, a pool of ``MAIL_POOL_SIZE``
+logged-in SMTP connections that are reused across messages, and batches of
+up to ``MAIL_BATCH_SIZE`` queued messages sent concurrently over the pool.
+A failed message is retried with exponential backoff through a Redis sorted
+set and moved to ``mail:dead`` after ``MAIL_MAX_ATTEMPTS``.
+
+Messages are popped before they are sent, so a batch in flight when the
+process is killed is lost.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+
+import aiosmtplib
+from prometheus_client import Counter, Histogram
+
+from source.config import Config
+from source.db.redis import redis_client
+from source.mail import (
+    DEAD_LETTER_KEY,
+    OUTBOX_KEY,
+    RETRY_KEY,
+    create_message,
+    precompile_templates,
+)
+
+logger = logging.getLogger(__name__)
+
+POLL_TIMEOUT = 1
+# errors that leave a connection unusable; anything else (a refused
+# recipient, a rejected message) is per message, and aiosmtplib resets the
+# envelope so the session can be reused
+CONNECTION_ERRORS = (
+    aiosmtplib.SMTPServerDisconnected,
+    aiosmtplib.SMTPConnectError,
+    aiosmtplib.SMTPTimeoutError,
+    OSError,
+)
+
+mail_sent = Counter("mail_sent_total", "Messages handed to the SMTP server")
+mail_failed = Counter("mail_failed_total", "Failed delivery attempts", ["final"])
+mail_batch_seconds = Histogram("mail_batch_seconds", "Time to deliver one batch")
+
+
+class SMTPPool:
+    """Fixed number of SMTP connections, opened on first use and reopened
+    after a connection-level error"""
+
+    def __init__(self, size: int, **smtp_options):
+        self.smtp_options = smtp_options
+        self._idle: asyncio.Queue = asyncio.Queue()
+        for _ in range(size):
+            self._idle.put_nowait(None)
+
+    async def _open(self) -> aiosmtplib.SMTP:
+        client = aiosmtplib.SMTP(**self.smtp_options)
+        await client.connect()
+        return client
+
+    @asynccontextmanager
+    async def connection(self):
+        client = await self._idle.get()
+        try:
+            if client is None or not client.is_connected:
+                client = await self._open()
+            yield client
+        except CONNECTION_ERRORS:
+            if client is not None:
+                client.close()
+            client = None
+            raise
+        finally:
+            self._idle.put_nowait(client)
+
+    async def close(self) -> None:
+        while not self._idle.empty():
+            client = self._idle.get_nowait()
+            if client is not None and client.is_connected:
+                await client.quit()
+
+
+def smtp_pool_from_config() -> SMTPPool:
+    credentials = {}
+    if Config.USE_CREDENTIALS:
+        credentials = {"username": Config.MAIL_USERNAME, "password": Config.MAIL_PASSWORD}
+
+    return SMTPPool(
+        Config.MAIL_POOL_SIZE,
+        hostname=Config.MAIL_SERVER,
+        port=Config.MAIL_PORT,
+        use_tls=Config.MAIL_SSL_TLS,
+        start_tls=Config.MAIL_STARTTLS,
+        validate_certs=Config.VALIDATE_CERTS,
+        **credentials,
+    )
+
+
+class MailWorker:
+    def __init__(
+        self,
+        pool: SMTPPool,
+        batch_size: int = Config.MAIL_BATCH_SIZE,
+        max_attempts: int = Config.MAIL_MAX_ATTEMPTS,
+        retry_delay: float = Config.MAIL_RETRY_BASE_DELAY,
+    ):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    async def _send(self, job: dict) -> None:
+        message = create_message(
+            job["recipients"], job["subject"], job["template"], job["context"]
+        )
+        async with self.pool.connection() as client:
+            await client.send_message(message)
+
+    async def deliver(self, jobs: list) -> None:
+        """Send a batch concurrently; the pool bounds how many at once"""
+        with mail_batch_seconds.time():
+            results = await asyncio.gather(
+                *(self._send(job) for job in jobs), return_exceptions=True
+            )
+
+        for job, result in zip(jobs, results):
+            if isinstance(result, Exception):
+                await self._failed(job, result)
+            else:
+                mail_sent.inc()
+
+    async def _failed(self, job: dict, error: Exception) -> None:
+        job["attempts"] += 1
+        if job["attempts"] >= self.max_attempts:
+            mail_failed.labels("true").inc()
+            logger.error("giving up on mail to %s: %s", job["recipients"], error)
+            await redis_client.lpush(DEAD_LETTER_KEY, json.dumps(job))
+            return
+
+        mail_failed.labels("false").inc()
+        delay = self.retry_delay * 2 ** (job["attempts"] - 1)
+        delay *= random.uniform(0.5, 1.5)
+        await redis_client.zadd(RETRY_KEY, {json.dumps(job): time.time() + delay})
+
+    async def requeue_due_retries(self) -> None:
+        due = await redis_client.zrangebyscore(RETRY_KEY, "-inf", time.time())
+        for job in due:
+            # only the worker whose ZREM succeeds requeues the message
+            if await redis_client.zrem(RETRY_KEY, job):
+                await redis_client.rpush(OUTBOX_KEY, job)
+
+    async def next_batch(self) -> list:
+        items = await redis_client.rpop(OUTBOX_KEY, self.batch_size)
+        if not items:
+            popped = await redis_client.brpop([OUTBOX_KEY], timeout=POLL_TIMEOUT)
+            if popped is None:
+                return []
+            items = [popped[1]]
+            if self.batch_size > 1:
+                items += await redis_client.rpop(OUTBOX_KEY, self.batch_size - 1) or []
+
+        return [json.loads(item) for item in items]
+
+    async def run(self) -> None:
+        while True:
+            await self.requeue_due_retries()
+            batch = await self.next_batch()
+            if batch:
+                await self.deliver(batch)
+
+
+async def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    precompile_templates()
+    pool = smtp_pool_from_config()
+    try:
+        await MailWorker(pool).run()
+    finally:
+        await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
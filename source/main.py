@@ -1,19 +1,37 @@
+import asyncio
 from fastapi import FastAPI, status
+from prometheus_client import make_asgi_app
 from source.books.routes import book_router
 from source.auth.routes import auth_router
 from source.reviews.routes import review_router
 from contextlib import asynccontextmanager
-from source.db.main import init_db
 from source.tags.routes import tags_router
 from fastapi.responses import JSONResponse
 from .errors import register_all_errors
 from .middle_ware import register_middleware
+from source.db import pubsub
+from source.db.publisher import publisher
+from source.db.outbox import dispatcher
+from source.auth.blocklist import revoked_tokens
+from source.config import Config
 
 @asynccontextmanager
 async def life_span(app: FastAPI):
     print("server is starting...")
-    await init_db()
+    # schema is owned by Alembic (alembic upgrade head), not create_all
+    listener = asyncio.create_task(pubsub.listen())
+    blocklist_sync = asyncio.create_task(
+        revoked_tokens.run(Config.BLOCKLIST_RESYNC_INTERVAL)
+    )
+    publishing = asyncio.create_task(publisher.run())
+    dispatching = asyncio.create_task(dispatcher.run())
     yield
+    # undelivered events stay in the outbox for the next worker
+    dispatching.cancel()
+    await publisher.drain(timeout=5)
+    publishing.cancel()
+    blocklist_sync.cancel()
+    listener.cancel()
     print("server has been stopped...")
 
 
@@ -23,6 +41,7 @@ app = FastAPI(
     title="Bookly",
     description="A REST API for a book review web service",
     version=version,
+    lifespan=life_span,
 )
 
 register_all_errors(app) 
@@ -32,3 +51,4 @@ app.include_router(book_router, tags=["book"])
 app.include_router(auth_router, prefix=f"/api/{version}/auth", tags=["users"])
 app.include_router(review_router, prefix=f"/api/{version}/reviews", tags=["reviews"])
 app.include_router(tags_router, prefix=f"/api/{version}/tags", tags=["tags"])
+app.mount("/metrics", make_asgi_app())
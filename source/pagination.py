@@ -0,0 +1,131 @@
+import base64
+import binascii
+import json
+import uuid
+from datetime import date, datetime
+from typing import Any, Callable, Optional, Sequence
+
+from sqlalchemy import tuple_
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from source.errors import InvalidCursor
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+NEXT = "next"
+PREV = "prev"
+
+
+def _to_json(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def _from_json(value: Any, python_type: type):
+    if value is None:
+        return None
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is uuid.UUID:
+        return uuid.UUID(value)
+    return python_type(value)
+
+
+def _python_type(column) -> Optional[type]:
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return None
+
+
+def encode_cursor(values: Sequence[Any], direction: str = NEXT) -> str:
+    payload = json.dumps(
+        {"v": [_to_json(v) for v in values], "d": direction}, separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence[Any]) -> tuple[list, str]:
+    """Turn an opaque cursor back into typed key values for the given sort columns"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        raw_values = payload["v"]
+        direction = payload["d"]
+
+        if direction not in (NEXT, PREV) or len(raw_values) != len(columns):
+            raise InvalidCursor()
+
+        values = []
+        for raw, column in zip(raw_values, columns):
+            python_type = _python_type(column)
+            values.append(raw if python_type is None else _from_json(raw, python_type))
+
+        return values, direction
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidCursor()
+
+
+def _column_key(row: Any, column) -> Any:
+    return getattr(row, column.key)
+
+
+async def paginate(
+    session: AsyncSession,
+    statement,
+    order_by: Sequence[Any],
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    descending: bool = True,
+    row_key: Optional[Callable[[Any], tuple]] = None,
+) -> dict:
+    """Keyset-paginate ``statement`` over the ``order_by`` columns.
+
+    The last column must be unique (usually the primary key) so that every
+    row has a distinct position. Each page costs one indexed range scan no
+    matter how deep into the result set it is.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if row_key is None:
+        row_key = lambda row: tuple(_column_key(row, c) for c in order_by)
+
+    values, direction = (
+        decode_cursor(cursor, order_by) if cursor else (None, NEXT)
+    )
+    forward = direction == NEXT
+    scan_descending = descending == forward
+
+    if values is not None:
+        keys = tuple_(*order_by)
+        boundary = tuple_(*values)
+        statement = statement.where(
+            keys < boundary if scan_descending else keys > boundary
+        )
+
+    statement = statement.order_by(
+        *[c.desc() if scan_descending else c.asc() for c in order_by]
+    ).limit(limit + 1)
+
+    result = await session.exec(statement)
+    rows = list(result.all())
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not forward:
+        rows.reverse()
+
+    next_cursor = None
+    prev_cursor = None
+    if rows:
+        if has_more or not forward:
+            next_cursor = encode_cursor(row_key(rows[-1]), NEXT)
+        if (values is not None and forward) or (not forward and has_more):
+            prev_cursor = encode_cursor(row_key(rows[0]), PREV)
+
+    return {"items": rows, "next_cursor": next_cursor, "prev_cursor": prev_cursor}
@@ -0,0 +1,166 @@
+"""Token-bucket rate limiting shared by all workers through Redis.
+
+Each bucket lives in a Redis hash and is refilled and drawn from by one Lua
+script, so concurrent workers never race on it. To keep Redis off the path
+of most requests a worker draws ``lease`` tokens at a time and hands them out
+locally for up to ``RATE_LIMIT_LEASE_TTL`` seconds; rejections are
+remembered locally for as long, too. Across N workers a limit can therefore be
+exceeded by at most N * (lease - 1) requests, which is why strict policies
+lease a single token.
+
+Buckets are kept per route as well as per client IP or user, so paging
+through /books does not spend the budget for /tags.
+
+If Redis is unavailable requests are let through rather than failed.
+"""
+
+import logging
+import math
+import time
+from dataclasses import dataclass
+
+from fastapi import Depends, Request
+from redis.exceptions import RedisError
+
+from source.auth.dependencies import AccessTokenBearer
+from source.config import Config
+from source.db.cache import LocalTTLCache
+from source.db.redis import redis_client
+from source.errors import RateLimitExceeded
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] bucket; ARGV capacity, refill per second, tokens wanted.
+# Returns {granted, retry after in ms}.
+TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local wanted = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local granted = math.min(wanted, math.floor(tokens))
+tokens = tokens - granted
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+
+if granted > 0 then
+    return {granted, 0}
+end
+return {0, math.ceil((1 - tokens) / rate * 1000)}
+"""
+
+
+@dataclass(frozen=True)
+class RatePolicy:
+    name: str
+    capacity: int
+    refill_per_second: float
+    lease: int = 1
+
+
+LOGIN = RatePolicy("login", capacity=10, refill_per_second=10 / 60)
+SIGNUP = RatePolicy("signup", capacity=5, refill_per_second=5 / 3600)
+PASSWORD_RESET = RatePolicy("password_reset", capacity=5, refill_per_second=5 / 3600)
+READS = RatePolicy("reads", capacity=120, refill_per_second=10, lease=10)
+
+
+class TokenBuckets:
+    def __init__(self, maxsize: int, lease_ttl: float):
+        # per key: [leased tokens left, blocked until]
+        self._local = LocalTTLCache(maxsize=maxsize, ttl=lease_ttl)
+        self._script = redis_client.register_script(TOKEN_BUCKET)
+
+    async def take(self, policy: RatePolicy, identity: str) -> float:
+        """Take one token; returns 0, or the seconds to wait when there is none"""
+        key = f"ratelimit:{policy.name}:{identity}"
+        now = time.monotonic()
+
+        entry = self._local.get(key)
+        if entry is not None:
+            if entry[1] > now:
+                return entry[1] - now
+            if entry[0] > 0:
+                entry[0] -= 1
+                return 0
+
+        try:
+            granted, retry_after_ms = await self._script(
+                keys=[key], args=[policy.capacity, policy.refill_per_second, policy.lease]
+            )
+        except RedisError:
+            logger.warning("redis unavailable, not rate limiting %s", key)
+            return 0
+
+        if granted == 0:
+            retry_after = retry_after_ms / 1000
+            self._local.set(key, [0, now + retry_after])
+            return retry_after
+
+        self._local.set(key, [granted - 1, 0])
+        return 0
+
+
+buckets = TokenBuckets(
+    maxsize=Config.RATE_LIMIT_LOCAL_KEYS, lease_ttl=Config.RATE_LIMIT_LEASE_TTL
+)
+
+
+async def enforce(policy: RatePolicy, identity: str) -> None:
+    if not Config.RATE_LIMIT_ENABLED:
+        return
+
+    retry_after = await buckets.take(policy, identity)
+    if retry_after > 0:
+        raise RateLimitExceeded(retry_after=math.ceil(retry_after))
+
+
+def client_identity(request: Request) -> str:
+    """The client IP, for limiting anonymous routes. Servers listening on a
+    unix socket report no client; behind the proxy that owns that socket the
+    client is the X-Forwarded-For hop appended by the outermost of the
+    ``TRUSTED_PROXY_HOPS`` proxies. Hops to the left of it are whatever the
+    client sent, so they are never used. Without a trusted hop every such
+    request shares a single bucket rather than going unlimited.
+    """
+    if request.client is not None and request.client.host:
+        return f"ip:{request.client.host}"
+    hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",")]
+    hops = [hop for hop in hops if hop]
+    trusted = Config.TRUSTED_PROXY_HOPS
+    if trusted > 0 and len(hops) >= trusted:
+        return f"ip:{hops[-trusted]}"
+    return "ip:unknown"
+
+
+def route_of(request: Request) -> str:
+    """The matched route template, so that /book/{book_uid} is one bucket
+    however many books are read"""
+    route = request.scope.get("route")
+    return getattr(route, "path", request.url.path)
+
+
+class RateLimit:
+    """Route dependency limiting each client IP on each route by ``policy``"""
+
+    def __init__(self, policy: RatePolicy):
+        self.policy = policy
+
+    async def __call__(self, request: Request):
+        await enforce(self.policy, f"{client_identity(request)}:{route_of(request)}")
+
+
+class UserRateLimit(RateLimit):
+    """Route dependency limiting each authenticated user on each route by
+    ``policy``"""
+
+    async def __call__(
+        self, request: Request, token_details: dict = Depends(AccessTokenBearer())
+    ):
+        user_uid = token_details["user"]["user_uid"]
+        await enforce(self.policy, f"user:{user_uid}:{route_of(request)}")
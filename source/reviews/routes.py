@@ -1,24 +1,69 @@
-from fastapi import APIRouter, Depends, status, HTTPException
-from source.db.models import User
-from .schemas import ReviewCreateModel
+from fastapi import APIRouter, Body, Depends, status, HTTPException, Query
+from .schemas import ReviewCreateModel, ReviewImportModel, ReviewImportResult, ReviewPage
+from source.config import Config
 from source.db.main import get_sessiion
-from source.auth.dependencies import get_current_user
 from sqlmodel.ext.asyncio.session import AsyncSession
 from .services import ReviewService
-from source.auth.dependencies import RoleChecker, get_current_user
+from source.auth.dependencies import AccessTokenBearer, RoleChecker
+from source.db.export import start_ndjson
+from source.db.models import naive_timestamp
+from source.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from source.ratelimit import READS, UserRateLimit
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import List, Literal, Optional
+import uuid
 
 review_router = APIRouter()
 review_service = ReviewService()
 admin_role_checker = Depends(RoleChecker(['admin']))
 user_role_checker = Depends(RoleChecker(['user', 'admin']))
+read_rate_limit = Depends(UserRateLimit(READS))
+access_token_bearer = AccessTokenBearer()
 
-@review_router.get("/", dependencies=[user_role_checker])
+@review_router.get("/", dependencies=[user_role_checker, read_rate_limit])
 async def get_all_reviews(session:AsyncSession=Depends(get_sessiion)):
     reviews = await review_service.get_all_reviews(session)
     
     return reviews
 
-@review_router.get("/{review_uid}",dependencies=[user_role_checker])
+@review_router.get("/export", dependencies=[user_role_checker, read_rate_limit])
+async def export_reviews(
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    user_uid: Optional[uuid.UUID] = None,
+    book_uid: Optional[uuid.UUID] = None,
+):
+    statement = review_service.export_reviews_statement(
+        created_after=naive_timestamp(created_after),
+        created_before=naive_timestamp(created_before),
+        user_uid=user_uid,
+        book_uid=book_uid,
+    )
+    return StreamingResponse(
+        await start_ndjson(statement),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="reviews.ndjson"'},
+    )
+
+@review_router.get(
+    "/book/{book_uid}",
+    response_model=ReviewPage,
+    dependencies=[user_role_checker, read_rate_limit],
+)
+async def get_book_reviews(
+    book_uid: uuid.UUID,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: Literal["created_at", "rating"] = "created_at",
+    min_rating: Optional[int] = Query(None, ge=0, lt=5),
+    session: AsyncSession = Depends(get_sessiion),
+):
+    return await review_service.get_book_reviews(
+        book_uid, session, limit=limit, cursor=cursor, sort=sort, min_rating=min_rating
+    )
+
+@review_router.get("/{review_uid}",dependencies=[user_role_checker, read_rate_limit])
 async def get_review(review_uid:str, session:AsyncSession=Depends(get_sessiion)):
     review = await review_service.get_reviews(review_uid, session)
     if not review:
@@ -27,13 +72,13 @@ async def get_review(review_uid:str, session:AsyncSession=Depends(get_sessiion))
 
 @review_router.post("/book/{book_uid}")
 async def add_review_to_books(
-    book_uid: str,
+    book_uid: uuid.UUID,
     review_data: ReviewCreateModel,
-    current_user: User = Depends(get_current_user),
+    token_details: dict = Depends(access_token_bearer),
     session: AsyncSession = Depends(get_sessiion),
 ):
     new_review = await review_service.add_review_to_book(
-        user_email=current_user.email,
+        user_uid=uuid.UUID(token_details["user"]["user_uid"]),
         book_uid=book_uid,
         review_data=review_data,
         session=session,
@@ -41,10 +86,19 @@ async def add_review_to_books(
     
     return new_review
 
+@review_router.post(
+    "/bulk", response_model=ReviewImportResult, dependencies=[admin_role_checker]
+)
+async def bulk_add_reviews(
+    reviews: List[ReviewImportModel] = Body(
+        min_length=1, max_length=Config.REVIEW_IMPORT_MAX_ROWS
+    ),
+    session: AsyncSession = Depends(get_sessiion),
+):
+    return await review_service.bulk_add_reviews(reviews, session)
+
 @review_router.delete("/{review_uid}", dependencies=[user_role_checker], status_code=status.HTTP_200_OK)
-async def delete_review(review_uid:str, current_user:User=Depends(get_current_user), session:AsyncSession=Depends(get_sessiion)):
-    review = await review_service.delete_review_to_from_book(review_uid=review_uid, user_email=current_user.email, session=session)
+async def delete_review(review_uid:uuid.UUID, token_details:dict=Depends(access_token_bearer), session:AsyncSession=Depends(get_sessiion)):
+    await review_service.delete_review_to_from_book(review_uid=review_uid, user_uid=uuid.UUID(token_details["user"]["user_uid"]), session=session)
     
     return {"message":"successfully deleted review"}
-    
-
@@ -1,7 +1,8 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+from source.db.models import naive_timestamp
 import uuid
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class ReviewModel(BaseModel):
     uid:uuid.UUID
@@ -14,6 +15,34 @@ class ReviewModel(BaseModel):
 
 
 
+class ReviewPage(BaseModel):
+    items:List[ReviewModel]
+    next_cursor:Optional[str]=None
+    prev_cursor:Optional[str]=None
+
+
+
 class ReviewCreateModel(BaseModel):
     rating:int = Field(lt=5)
-    review_text:str
\ No newline at end of file
+    review_text:str
+
+
+class ReviewImportModel(ReviewCreateModel):
+    user_uid:uuid.UUID
+    book_uid:uuid.UUID
+    created_at:Optional[datetime]=None
+
+    # migrated data usually carries offsets such as "Z"
+    _naive_created_at = field_validator("created_at")(naive_timestamp)
+
+
+class ReviewImportRow(BaseModel):
+    row:int
+    uid:Optional[uuid.UUID]=None
+    error:Optional[str]=None
+
+
+class ReviewImportResult(BaseModel):
+    inserted:int
+    failed:int
+    results:List[ReviewImportRow]
@@ -1,55 +1,126 @@
-from source.db.models import Review
-from source.auth.services import UserService
+from source.db.models import Book, Review, User
+from source.db.loading import REVIEW_LIST
 from source.books.services import BookService
+from source.books.cache import book_detail_cache
+from source.db.outbox import record_event
+from source.pagination import paginate, DEFAULT_PAGE_SIZE
 from sqlmodel.ext.asyncio.session import AsyncSession
-from .schemas import ReviewCreateModel
+from source.errors import BookNotFound, UserNotFound
+from .schemas import ReviewCreateModel, ReviewImportModel
 from fastapi import HTTPException, status
-from sqlmodel import select, desc
+from sqlmodel import select, desc, delete, insert
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+from typing import List, Optional
+import uuid
 
 book_service = BookService()
-user_service = UserService()
+
+REVIEW_ORDER = (Review.created_at, Review.uid)
+REVIEW_RATING_ORDER = (Review.rating, Review.created_at, Review.uid)
+REVIEW_SORTS = {"created_at": REVIEW_ORDER, "rating": REVIEW_RATING_ORDER}
+REVIEW_FOREIGN_KEYS = {
+    "reviews_book_uid_fkey": BookNotFound,
+    "reviews_user_uid_fkey": UserNotFound,
+}
 
 class ReviewService:
 
     async def add_review_to_book(
         self,
-        user_email: str,
-        book_uid: str,
+        user_uid,
+        book_uid,
         review_data: ReviewCreateModel,
         session: AsyncSession,
     ):
+        """Insert by foreign key; the constraints stand in for loading the
+        book and the user first"""
+        statement = (
+            insert(Review)
+            .values(**review_data.model_dump(), user_uid=user_uid, book_uid=book_uid)
+            .returning(Review)
+        )
         try:
-            book = await book_service.get_book(book_uid=book_uid, session=session)
-            user = await user_service.get_user_by_email(email=user_email, session=session)
-            review_data_dict = review_data.model_dump()
-            new_review = Review(**review_data_dict)
-            
-            if not book:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Book not found"
-                )
-                
-            if not user:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="User not found"
-                )
-            new_review.user = user
-            new_review.book = book
-            
-            session.add(new_review)
-            await session.commit()
-            return new_review
-        
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Opps...Something went wrong"
+            result = await session.exec(statement)
+        except IntegrityError as e:
+            await session.rollback()
+            raise _missing_parent(e)
+        new_review = result.scalar_one()
+
+        await book_service.record_review_rating(
+            session, book_uid, new_review.rating, delta=1
+        )
+        record_event(
+            session,
+            "review.created",
+            review_uid=new_review.uid,
+            book_uid=book_uid,
+            user_uid=user_uid,
+            rating=new_review.rating,
+        )
+        await session.commit()
+        await book_detail_cache.invalidate(str(book_uid))
+        return new_review
+
+    async def bulk_add_reviews(self, reviews: List[ReviewImportModel], session: AsyncSession):
+        """Insert migrated reviews in one transaction, reporting each row by
+        its index in ``reviews``. Rows whose book or user does not exist are
+        skipped; the rest are inserted with one statement.
+        """
+        book_uids = sorted({review.book_uid for review in reviews})
+        user_uids = sorted({review.user_uid for review in reviews})
+
+        # lock the books so their stats can be rebuilt without racing single
+        # review writes, and the users so neither can vanish mid-import
+        books = await session.exec(
+            select(Book.uid)
+            .where(Book.uid.in_(book_uids))
+            .order_by(Book.uid)
+            .with_for_update(key_share=True)
+        )
+        existing_books = set(books.all())
+        users = await session.exec(
+            select(User.uid)
+            .where(User.uid.in_(user_uids))
+            .order_by(User.uid)
+            .with_for_update(read=True, key_share=True)
+        )
+        existing_users = set(users.all())
+
+        results = []
+        rows = []
+        for row_number, review in enumerate(reviews):
+            if review.book_uid not in existing_books:
+                results.append({"row": row_number, "error": "book not found"})
+            elif review.user_uid not in existing_users:
+                results.append({"row": row_number, "error": "user not found"})
+            else:
+                row = review.model_dump(exclude_none=True)
+                row.setdefault("created_at", datetime.now())
+                row["update_at"] = row["created_at"]
+                results.append({"row": row_number})
+                rows.append((results[-1], row))
+
+        if rows:
+            statement = insert(Review).returning(Review.uid, sort_by_parameter_order=True)
+            inserted = await session.exec(statement, params=[row for _, row in rows])
+            for (result, _), uid in zip(rows, inserted.scalars().all()):
+                result["uid"] = uid
+
+            touched = await book_service.rebuild_rating_stats(
+                session, sorted({row["book_uid"] for _, row in rows})
             )
-    
+            record_event(session, "reviews.imported", book_uids=touched, count=len(rows))
+        await session.commit()
+
+        if rows:
+            for book_uid in touched:
+                await book_detail_cache.invalidate(str(book_uid))
+
+        return {"inserted": len(rows), "failed": len(reviews) - len(rows), "results": results}
+
     async def get_reviews(self, review_uid:str, session:AsyncSession):
-        statement = select(Review).where(Review.uid == review_uid)
+        statement = select(Review).options(*REVIEW_LIST).where(Review.uid == review_uid)
         result = await session.exec(statement)
         if not result:
             raise HTTPException(
@@ -59,21 +130,88 @@ class ReviewService:
         return result.first()
     
     async def get_all_reviews(self, session:AsyncSession):
-        statement = select(Review).order_by(desc(Review.created_at))
+        statement = select(Review).options(*REVIEW_LIST).order_by(desc(Review.created_at))
         
         result = await session.exec(statement)
         return result.all()
     
-    async def delete_review_to_from_book(self, review_uid:str, user_email:str, session:AsyncSession):
-        user = await user_service.get_user_by_email(user_email, session)
-        review = await self.get_reviews(review_uid, session)
-        
-        print(review)
-        
-        if not review or review.user_uid != user.uid:
+    async def get_user_reviews(
+        self,
+        user_uid,
+        session: AsyncSession,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ):
+        statement = select(Review).options(*REVIEW_LIST).where(Review.user_uid == user_uid)
+        return await paginate(session, statement, REVIEW_ORDER, limit, cursor)
+
+    async def get_book_reviews(
+        self,
+        book_uid,
+        session: AsyncSession,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        sort: str = "created_at",
+        min_rating: Optional[int] = None,
+    ):
+        statement = select(Review).options(*REVIEW_LIST).where(Review.book_uid == book_uid)
+        if min_rating is not None:
+            statement = statement.where(Review.rating >= min_rating)
+        return await paginate(session, statement, REVIEW_SORTS[sort], limit, cursor)
+
+    def export_reviews_statement(
+        self,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        user_uid: Optional[uuid.UUID] = None,
+        book_uid: Optional[uuid.UUID] = None,
+    ):
+        statement = select(*Review.__table__.c)
+        if created_after is not None:
+            statement = statement.where(Review.created_at >= created_after)
+        if created_before is not None:
+            statement = statement.where(Review.created_at < created_before)
+        if user_uid is not None:
+            statement = statement.where(Review.user_uid == user_uid)
+        if book_uid is not None:
+            statement = statement.where(Review.book_uid == book_uid)
+
+        return statement.order_by(Review.created_at, Review.uid)
+    
+    async def delete_review_to_from_book(self, review_uid:str, user_uid, session:AsyncSession):
+        statement = (
+            delete(Review)
+            .where(Review.uid == review_uid, Review.user_uid == user_uid)
+            .returning(Review.uid, Review.book_uid, Review.rating)
+        )
+        result = await session.exec(statement)
+        review = result.one_or_none()
+
+        if review is None:
+            await session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Cannot delete this review"
             )
-        await session.delete(review)
+        if review.book_uid is not None:
+            await book_service.record_review_rating(
+                session, review.book_uid, review.rating, delta=-1
+            )
+        record_event(
+            session,
+            "review.deleted",
+            review_uid=review.uid,
+            book_uid=review.book_uid,
+            user_uid=user_uid,
+            rating=review.rating,
+        )
         await session.commit()
+        if review.book_uid is not None:
+            await book_detail_cache.invalidate(str(review.book_uid))
+
+
+def _missing_parent(error: IntegrityError) -> Exception:
+    for constraint, missing in REVIEW_FOREIGN_KEYS.items():
+        if constraint in str(error.orig):
+            return missing()
+    return error
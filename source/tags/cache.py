@@ -0,0 +1,121 @@
+"""Per-worker dictionary of every tag, guarded by a version counter in Redis.
+
+The tag set is small and rarely changes, so each worker holds all of it: the
+name -> uid map used to resolve tag names, and the tag list already
+serialized for GET /tags. Every write to ``tags`` bumps ``tags:version``
+after committing; a worker compares its copy against that counter (at most
+every ``TAG_CACHE_RECHECK_INTERVAL`` seconds for list reads, on every call
+for name lookups) and reloads when it moved, or when its copy is older than
+``TAG_CACHE_MAX_AGE`` in case a bump was lost. The counter is read before
+the tags are loaded, so a write racing a reload only costs one extra reload.
+
+If Redis is unavailable the tags are read from the database every time.
+"""
+
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from pydantic import TypeAdapter
+from redis.exceptions import RedisError
+from sqlmodel import desc, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from source.conditional import make_etag
+from source.config import Config
+from source.db.cache import cache_hits, cache_misses
+from source.db.models import Tag
+from source.db.redis import redis_client
+
+from .schemas import TagModel
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "tags:version"
+
+tag_list_adapter = TypeAdapter(List[TagModel])
+
+
+@dataclass(frozen=True)
+class TagSnapshot:
+    version: Optional[int]
+    uids: Dict[str, uuid.UUID]
+    body: bytes
+    etag: str
+
+
+class TagDictionary:
+    def __init__(self, recheck_interval: float, max_age: float):
+        self.recheck_interval = recheck_interval
+        self.max_age = max_age
+        self._snapshot: Optional[TagSnapshot] = None
+        self._checked_at = 0.0
+        self._loaded_at = 0.0
+
+    async def _version(self) -> Optional[int]:
+        try:
+            version = await redis_client.get(VERSION_KEY)
+        except RedisError:
+            logger.warning("redis unavailable for the tag dictionary")
+            return None
+        return int(version or 0)
+
+    async def _load(self, version: Optional[int], session: AsyncSession) -> TagSnapshot:
+        statement = select(Tag.uid, Tag.name, Tag.created_at).order_by(desc(Tag.created_at))
+        result = await session.exec(statement)
+        rows = result.all()
+
+        tags = [TagModel.model_validate(row, from_attributes=True) for row in rows]
+        body = tag_list_adapter.dump_json(tags)
+        return TagSnapshot(
+            version=version,
+            uids={row.name: row.uid for row in rows},
+            body=body,
+            etag=make_etag(body.decode()),
+        )
+
+    async def snapshot(self, session: AsyncSession, recheck: bool = False) -> TagSnapshot:
+        now = time.monotonic()
+        snapshot = self._snapshot
+        if snapshot is not None and now - self._loaded_at > self.max_age:
+            snapshot = None
+        if snapshot is not None and not recheck and now - self._checked_at < self.recheck_interval:
+            cache_hits.labels("tags", "local").inc()
+            return snapshot
+
+        version = await self._version()
+        if snapshot is not None and version is not None and version == snapshot.version:
+            self._checked_at = now
+            cache_hits.labels("tags", "local").inc()
+            return snapshot
+
+        cache_misses.labels("tags").inc()
+        snapshot = await self._load(version, session)
+        if version is not None:
+            self._snapshot = snapshot
+            self._checked_at = self._loaded_at = now
+        return snapshot
+
+    async def lookup(self, names: Iterable[str], session: AsyncSession) -> Dict[str, uuid.UUID]:
+        """uids of the ``names`` that exist, as far as the dictionary knows"""
+        uids = (await self.snapshot(session, recheck=True)).uids
+        return {name: uids[name] for name in names if name in uids}
+
+    def clear(self) -> None:
+        self._snapshot = None
+
+    async def bump(self) -> None:
+        """Call after committing a change to ``tags``"""
+        self.clear()
+        try:
+            await redis_client.incr(VERSION_KEY)
+        except RedisError:
+            logger.warning("could not bump %s, other workers may serve stale tags", VERSION_KEY)
+
+
+tag_dictionary = TagDictionary(
+    recheck_interval=Config.TAG_CACHE_RECHECK_INTERVAL,
+    max_age=Config.TAG_CACHE_MAX_AGE,
+)
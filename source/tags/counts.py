@@ -0,0 +1,36 @@
+"""Per-tag book counts behind the unfiltered /books facets.
+
+Every write to ``booktag`` adjusts ``tag_book_counts`` in the same
+transaction. Rows are upserted in tag uid order so concurrent writers
+touching overlapping tags lock them in the same order.
+"""
+
+import uuid
+from collections import Counter
+from typing import Iterable
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from source.db.models import TagBookCount
+
+
+async def adjust_tag_counts(
+    session: AsyncSession, tag_uids: Iterable[uuid.UUID], delta: int
+) -> None:
+    """Add ``delta`` to the count of each tag, once per occurrence in ``tag_uids``"""
+    deltas = Counter(tag_uids)
+    if not deltas:
+        return
+
+    statement = insert(TagBookCount).values(
+        [
+            {"tag_uid": tag_uid, "book_count": count * delta}
+            for tag_uid, count in sorted(deltas.items())
+        ]
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[TagBookCount.tag_uid],
+        set_={"book_count": TagBookCount.book_count + statement.excluded.book_count},
+    )
+    await session.exec(statement)
@@ -1,26 +1,44 @@
+import uuid
 from typing import List
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, Response, status
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 
 from source.auth.dependencies import RoleChecker
 from source.books.schemas import Book
+from source.conditional import etag_matches, not_modified
 from source.db.main import get_sessiion
-
-from .schemas import TagAddModel, TagCreateModel, TagModel
+from source.ratelimit import READS, UserRateLimit
+
+from .schemas import (
+    TagAddModel,
+    TagBooksModel,
+    TagBooksResult,
+    TagCreateModel,
+    TagModel,
+)
 from .services import TagService
 
 tags_router = APIRouter()
 tag_service = TagService()
 user_role_checker = Depends(RoleChecker(["user", "admin"]))
+read_rate_limit = Depends(UserRateLimit(READS))
 
 
-@tags_router.get("/", response_model=List[TagModel], dependencies=[user_role_checker])
-async def get_all_tags(session: AsyncSession = Depends(get_sessiion)):
+@tags_router.get(
+    "/",
+    response_model=List[TagModel],
+    dependencies=[user_role_checker, read_rate_limit],
+)
+async def get_all_tags(request: Request, session: AsyncSession = Depends(get_sessiion)):
     tags = await tag_service.get_tags(session)
+    if etag_matches(request, tags.etag):
+        return not_modified(tags.etag)
 
-    return tags
+    return Response(
+        content=tags.body, media_type="application/json", headers={"ETag": tags.etag}
+    )
 
 
 @tags_router.post(
@@ -42,7 +60,7 @@ async def add_tag(
     "/book/{book_uid}/tags", response_model=Book, dependencies=[user_role_checker]
 )
 async def add_tags_to_book(
-    book_uid: str, tag_data: TagAddModel, session: AsyncSession = Depends(get_sessiion)
+    book_uid: uuid.UUID, tag_data: TagAddModel, session: AsyncSession = Depends(get_sessiion)
 ) -> Book:
 
     book_with_tag = await tag_service.add_tag_to_book(
@@ -52,6 +70,21 @@ async def add_tags_to_book(
     return book_with_tag
 
 
+@tags_router.post(
+    "/{tag_uid}/books", response_model=TagBooksResult, dependencies=[user_role_checker]
+)
+async def add_tag_to_books(
+    tag_uid: uuid.UUID,
+    tag_books: TagBooksModel,
+    session: AsyncSession = Depends(get_sessiion),
+) -> TagBooksResult:
+    result = await tag_service.attach_tag_to_books(
+        tag_uid=tag_uid, book_uids=tag_books.book_uids, session=session
+    )
+
+    return result
+
+
 @tags_router.put(
     "/{tag_uid}", response_model=TagModel, dependencies=[user_role_checker]
 )
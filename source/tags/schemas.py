@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime
 from typing import List
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class TagModel(BaseModel):
@@ -16,4 +16,13 @@ class TagCreateModel(BaseModel):
 
 
 class TagAddModel(BaseModel):
-    tags: List[TagCreateModel]
\ No newline at end of file
+    tags: List[TagCreateModel]
+
+class TagBooksModel(BaseModel):
+    book_uids: List[uuid.UUID] = Field(min_length=1, max_length=1000)
+
+
+class TagBooksResult(BaseModel):
+    attached: List[uuid.UUID]
+    already_attached: List[uuid.UUID]
+    missing: List[uuid.UUID]
@@ -1,11 +1,19 @@
-from fastapi import status
-from fastapi.exceptions import HTTPException
-from sqlmodel import desc, select
+import uuid
+from typing import Dict, List, Tuple
+
+from sqlmodel import delete, func, select, update
 from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 
 from source.books.services import BookService
-from source.db.models import Tag
+from source.books.cache import book_detail_cache
+from source.db.models import Book, BookTag, Tag
+from source.db.outbox import record_event
+from source.db.loading import TAG_LIST
 
+from .cache import TagSnapshot, tag_dictionary
+from .counts import adjust_tag_counts
 from .schemas import TagAddModel, TagCreateModel
 from source.errors import BookNotFound, TagNotFound, TagAlreadyExists
 
@@ -13,73 +21,209 @@ book_service = BookService()
 
 
 class TagService:
-    async def get_tags(self, session: AsyncSession):
-        statement = select(Tag).order_by(desc(Tag.created_at))
-        result = await session.exec(statement)
-        return result.all()
+    async def get_tags(self, session: AsyncSession) -> TagSnapshot:
+        """All tags, served from this worker's tag dictionary"""
+        return await tag_dictionary.snapshot(session)
 
     async def add_tag_to_book(
         self, book_uid: str, tag_data: TagAddModel, session: AsyncSession
     ):
-        book = await book_service.get_book(book_uid=book_uid, session=session)
-
-        if not book:
+        names = [tag.name for tag in tag_data.tags]
+        try:
+            return await self._add_tags_to_book(book_uid, names, session)
+        except IntegrityError:
+            # a tag this worker's dictionary knew was deleted meanwhile
+            await session.rollback()
+            tag_dictionary.clear()
+            return await self._add_tags_to_book(book_uid, names, session)
+
+    async def _add_tags_to_book(self, book_uid: str, names: List[str], session: AsyncSession):
+        # bumping the version doubles as the existence check and locks the book
+        if not await book_service.touch_books(session, Book.uid == book_uid):
+            await session.rollback()
             raise BookNotFound()
 
-        for tag_item in tag_data.tags:
-            statement = select(Tag).where(Tag.name == tag_item.name)
+        tags, created = await self.resolve_tags(names, session)
+        if tags:
+            statement = (
+                insert(BookTag)
+                .values([{"book_uid": book_uid, "tag_uid": uid} for uid in tags.values()])
+                .on_conflict_do_nothing()
+                .returning(BookTag.tag_uid)
+            )
+            result = await session.exec(statement)
+            linked = result.scalars().all()
+            await adjust_tag_counts(session, linked, delta=1)
+            record_event(session, "book.tagged", book_uid=book_uid, tag_uids=linked)
+
+        await session.commit()
+        if created:
+            await tag_dictionary.bump()
+        await book_detail_cache.invalidate(str(book_uid))
+        return await book_service.get_book(book_uid, session)
+
+    async def resolve_tags(
+        self, names: List[str], session: AsyncSession
+    ) -> Tuple[Dict[str, uuid.UUID], bool]:
+        """Map each name to its tag uid, creating the missing tags, and say
+        whether any were created. Known names come from the tag dictionary;
+        the rest take two statements at most, whatever their number, and
+        uq_tags_name keeps concurrent callers from creating a name twice.
+        """
+        # sorted, so concurrent inserts of overlapping names lock in one order
+        names = sorted(set(names))
+        if not names:
+            return {}, False
+
+        tags = await tag_dictionary.lookup(names, session)
+        missing = [name for name in names if name not in tags]
+        created = False
+        if missing:
+            statement = (
+                insert(Tag)
+                .values([{"name": name} for name in missing])
+                .on_conflict_do_nothing(index_elements=[Tag.name])
+                .returning(Tag.name, Tag.uid)
+            )
             result = await session.exec(statement)
-            tag = result.one_or_none()
-            if not tag:
-                tag = Tag(name=tag_item.name)
+            inserted = result.all()
+            tags.update(inserted)
+            created = bool(inserted)
 
-            book.tags.append(tag)
+            # created by a concurrent request between our SELECT and INSERT
+            lost = [name for name in missing if name not in tags]
+            if lost:
+                tags.update(await self._tags_named(lost, session))
+
+        return tags, created
+
+    async def _tags_named(self, names: List[str], session: AsyncSession) -> Dict[str, uuid.UUID]:
+        statement = select(Tag.name, Tag.uid).where(Tag.name.in_(names))
+        result = await session.exec(statement)
+        return dict(result.all())
+
+    async def attach_tag_to_books(
+        self, tag_uid: str, book_uids: List[uuid.UUID], session: AsyncSession
+    ):
+        tag = await session.exec(
+            select(Tag.uid).where(Tag.uid == tag_uid).with_for_update(read=True, key_share=True)
+        )
+        if tag.first() is None:
+            await session.rollback()
+            raise TagNotFound()
 
-        session.add(book)
+        # share-locked so none of them can be deleted before the links are in
+        books = await session.exec(
+            select(Book.uid)
+            .where(Book.uid.in_(book_uids))
+            .order_by(Book.uid)
+            .with_for_update(read=True, key_share=True)
+        )
+        existing = books.all()
+
+        attached = []
+        if existing:
+            statement = (
+                insert(BookTag)
+                .values([{"book_uid": uid, "tag_uid": tag_uid} for uid in existing])
+                .on_conflict_do_nothing()
+                .returning(BookTag.book_uid)
+            )
+            result = await session.exec(statement)
+            attached = result.scalars().all()
+            if attached:
+                await book_service.touch_books(session, Book.uid.in_(attached))
+                await adjust_tag_counts(session, [tag_uid] * len(attached), delta=1)
+                record_event(session, "tag.attached", tag_uid=tag_uid, book_uids=attached)
         await session.commit()
-        await session.refresh(book)
-        return book
 
-    async def get_tag_by_uid(self, tag_uid: str, session: AsyncSession):
-        statement = select(Tag).where(Tag.uid == tag_uid)
+        for book_uid in attached:
+            await book_detail_cache.invalidate(str(book_uid))
+
+        found, linked = set(existing), set(attached)
+        return {
+            "attached": attached,
+            "already_attached": [uid for uid in existing if uid not in linked],
+            "missing": [uid for uid in dict.fromkeys(book_uids) if uid not in found],
+        }
+
+    async def get_tag_by_uid(self, tag_uid: str, session: AsyncSession, shape=TAG_LIST):
+        statement = select(Tag).options(*shape).where(Tag.uid == tag_uid)
         result = await session.exec(statement)
 
         return result.first()
 
     async def add_tag(self, tag_data: TagCreateModel, session: AsyncSession):
-        statement = select(Tag).where(Tag.name == tag_data.name)
-
+        # uq_tags_name decides the race between concurrent creates
+        statement = (
+            insert(Tag)
+            .values(name=tag_data.name)
+            .on_conflict_do_nothing(index_elements=[Tag.name])
+            .returning(Tag)
+        )
         result = await session.exec(statement)
-        tag = result.first()
+        new_tag = result.scalar_one_or_none()
 
-        if tag:
+        if new_tag is None:
+            await session.rollback()
             raise TagAlreadyExists()
-        new_tag = Tag(name=tag_data.name)
-        session.add(new_tag)
+
         await session.commit()
+        await tag_dictionary.bump()
         return new_tag
 
     async def update_tag(self, tag_uid: str, tag_update_data: TagCreateModel, session: AsyncSession):
-        tag = await self.get_tag_by_uid(tag_uid=tag_uid, session=session)
-
-        if not tag:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
-
         update_data_dict = tag_update_data.model_dump(exclude_unset=True)
 
-        for k, v in update_data_dict.items():
-            if hasattr(tag, k):
-                setattr(tag, k, v)
+        statement = (
+            update(Tag).where(Tag.uid == tag_uid).values(**update_data_dict).returning(Tag)
+        )
+        try:
+            result = await session.exec(statement)
+        except IntegrityError:
+            await session.rollback()
+            raise TagAlreadyExists()
+        tag = result.scalar_one_or_none()
+
+        if tag is None:
+            await session.rollback()
+            raise TagNotFound()
 
+        # the new name shows up in the detail view of every tagged book
+        touched = await book_service.touch_books(
+            session,
+            Book.uid.in_(select(BookTag.book_uid).where(BookTag.tag_uid == tag.uid)),
+        )
+        record_event(session, "tag.updated", tag_uid=tag.uid, book_uids=touched)
         await session.commit()
-        await session.refresh(tag)
+        await tag_dictionary.bump()
+        for book_uid in touched:
+            await book_detail_cache.invalidate(str(book_uid))
         return tag
 
     async def delete_tag(self, tag_uid: str, session: AsyncSession):
-        tag = await self.get_tag_by_uid(tag_uid, session)
+        # the links and the tag's count go with the tag (ON DELETE CASCADE); RETURNING reads them
+        # from the pre-delete snapshot so the affected books can be evicted
+        tagged_books = (
+            select(func.array_agg(BookTag.book_uid))
+            .where(BookTag.tag_uid == Tag.uid)
+            .scalar_subquery()
+        )
+        statement = (
+            delete(Tag).where(Tag.uid == tag_uid).returning(Tag.uid, tagged_books)
+        )
+        result = await session.exec(statement)
+        deleted = result.one_or_none()
 
-        if not tag:
+        if deleted is None:
+            await session.rollback()
             raise TagNotFound()
 
-        await session.delete(tag)
+        book_uids = deleted[1] or []
+        if book_uids:
+            await book_service.touch_books(session, Book.uid.in_(book_uids))
+        record_event(session, "tag.deleted", tag_uid=deleted[0], book_uids=book_uids)
         await session.commit()
+        await tag_dictionary.bump()
+        for book_uid in book_uids:
+            await book_detail_cache.invalidate(str(book_uid))
@@ -1,3 +1,8 @@
+import os
+
+os.environ.setdefault("RAISE_ON_UNLOADED_RELATIONSHIPS", "true")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
 from source.db.main import get_sessiion
 from source.main import app
 from fastapi.testclient import TestClient
@@ -22,4 +27,5 @@ def fake_user_service():
 
 @pytest.fixture
 def test_client():
-    return TestClient(app)
\ No newline at end of file
+    # TrustedHostMiddleware rejects the default "testserver" host
+    return TestClient(app, base_url="http://localhost")
\ No newline at end of file
@@ -1,3 +1,12 @@
+import asyncio
+import uuid
+from datetime import datetime
+from unittest.mock import ANY, AsyncMock, Mock, patch
+
+from source.auth.cache import principal_cache
+from source.auth.schemas import Principal
+from source.auth.services import UserService
+
 auth_prefix = f"/api/v1/auth"
 
 
@@ -9,8 +18,89 @@ def test_user_creation(fake_session, fake_user_service, test_client):
         "firstname": "string",
         "lastname": "string"
     }
+    fake_user_service.create_user = AsyncMock(return_value={"email": signup_data["email"]})
+
+    enqueue_email = AsyncMock()
+    with patch("source.auth.routes.user_service", fake_user_service), patch(
+        "source.auth.routes.enqueue_email", enqueue_email
+    ):
+        response = test_client.post(url=f"{auth_prefix}/signup", json=signup_data)
+
+    # signup is a single insert; the unique email constraint rejects duplicates
+    assert response.status_code == 200
+    fake_user_service.create_user.assert_awaited_once()
+    enqueue_email.assert_awaited_once_with(
+        [signup_data["email"]], "Verify your email", "verify_email.html", ANY
+    )
+
+
+def test_principal_is_cached_until_a_broadcast_invalidation():
+    email = "reader@example.com"
+    row = Mock(uid=uuid.uuid4(), email=email, role="user", isverified=True)
+    result = Mock()
+    result.first.return_value = row
+    session = Mock()
+    session.exec = AsyncMock(return_value=result)
+    service = UserService()
+
+    first = asyncio.run(service.get_principal(email, session))
+    second = asyncio.run(service.get_principal(email, session))
+
+    assert first == second
+    assert first.role == "user"
+    assert session.exec.await_count == 1
+
+    # what another worker's update_user broadcasts
+    principal_cache._on_invalidation(f"principal:{email}")
+    asyncio.run(service.get_principal(email, session))
+    assert session.exec.await_count == 2
+
+
+def test_me_returns_counts_and_first_page_without_loading_relationships(test_client):
+    now = datetime(2024, 1, 1)
+    principal = Principal(
+        uid=uuid.uuid4(), email="reader@example.com", role="user", isverified=True
+    )
+    profile = Mock(
+        uid=principal.uid,
+        username="reader",
+        email=principal.email,
+        firstname="Re",
+        lastname="Ader",
+        isverified=True,
+        password_hash="hash",
+        created_at=now,
+        update_at=now,
+    )
+    routes_user_service = Mock()
+    routes_user_service.get_user_by_email = AsyncMock(return_value=profile)
+    routes_user_service.get_collection_counts = AsyncMock(
+        return_value=Mock(book_count=12, review_count=40)
+    )
+    empty_page = {"items": [], "next_cursor": "next", "prev_cursor": None}
+    book_service = Mock(get_user_books=AsyncMock(return_value=empty_page))
+    review_service = Mock(get_user_reviews=AsyncMock(return_value=empty_page))
+    token = {
+        "user": {"email": principal.email, "user_uid": str(principal.uid)},
+        "jti": "j",
+        "refresh": False,
+    }
 
-    response = test_client.post(url=f"{auth_prefix}/signup", json=signup_data)
+    with patch("source.auth.dependencies.decode_token", Mock(return_value=token)), patch(
+        "source.auth.dependencies.is_token_revoked", AsyncMock(return_value=False)
+    ), patch(
+        "source.auth.dependencies.user_service",
+        Mock(get_principal=AsyncMock(return_value=principal)),
+    ), patch("source.auth.routes.user_service", routes_user_service), patch(
+        "source.auth.routes.book_service", book_service
+    ), patch("source.auth.routes.review_service", review_service):
+        response = test_client.get(
+            f"{auth_prefix}/me?limit=3", headers={"Authorization": "Bearer token"}
+        )
 
-    # Proper way to assert
-    assert fake_user_service.user_exists.assert_called_once()
\ No newline at end of file
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["book_count"], body["review_count"]) == (12, 40)
+    assert body["books"]["next_cursor"] == "next"
+    assert "password_hash" not in body
+    book_service.get_user_books.assert_awaited_once_with(principal.uid, ANY, limit=3)
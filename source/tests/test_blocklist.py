@@ -0,0 +1,55 @@
+import asyncio
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from source.auth.blocklist import RevokedTokenMirror, is_token_revoked, revoked_tokens
+
+
+def fake_redis(keys, ttls):
+    redis = MagicMock()
+
+    async def scan_iter(match=None, count=None):
+        for key in keys:
+            yield key
+
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=ttls)
+    pipe.__aenter__ = AsyncMock(return_value=pipe)
+    pipe.__aexit__ = AsyncMock(return_value=False)
+    redis.scan_iter = scan_iter
+    redis.pipeline.return_value = pipe
+    return redis
+
+
+def test_resync_mirrors_revoked_keys_and_answers_locally():
+    revoked, expired = str(uuid.uuid4()), str(uuid.uuid4())
+    mirror = RevokedTokenMirror(max_staleness=60)
+    assert not mirror.is_fresh()
+
+    redis = fake_redis([revoked.encode(), expired.encode()], [30_000, -2])
+    with patch("source.auth.blocklist.redis_client", redis):
+        asyncio.run(mirror.resync())
+
+    assert mirror.is_fresh()
+    assert mirror.contains(revoked)
+    assert not mirror.contains(expired)
+    assert not mirror.contains(str(uuid.uuid4()))
+
+
+def test_expired_entries_drop_out_of_the_mirror():
+    mirror = RevokedTokenMirror(max_staleness=60)
+    jti = str(uuid.uuid4())
+    mirror.add(jti, ttl=-1)
+
+    assert not mirror.contains(jti)
+
+
+def test_stale_mirror_falls_back_to_redis():
+    lookup = AsyncMock(return_value=True)
+
+    with patch.object(revoked_tokens, "_synced_at", None), patch(
+        "source.auth.blocklist.token_in_blocklist", lookup
+    ):
+        assert asyncio.run(is_token_revoked("jti"))
+
+    lookup.assert_awaited_once_with("jti")
@@ -0,0 +1,83 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock
+
+from source.books.bulk import iter_csv_records, iter_ndjson_records
+from source.books.services import BookService
+
+USER_UID = "5b0c4a1e-8f5e-4d59-9d0f-6f7a2c1b9e11"
+
+
+async def chunked(data: bytes, size: int = 7):
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+async def collect(records):
+    return [record async for record in records]
+
+
+def test_csv_records_survive_chunk_boundaries_and_quoted_newlines():
+    body = (
+        b"title,author,publisher,published_date,page_count,language\r\n"
+        b'"Dune, Part ""One""",Frank Herbert,Chilton,1965-08-01,412,en\r\n'
+        b'"Multi\nLine",Someone,Press,2001-01-01,10,en\r\n'
+        b"short,row\r\n"
+    )
+
+    records = asyncio.run(collect(iter_csv_records(chunked(body))))
+
+    assert records[0] == (2, {
+        "title": 'Dune, Part "One"',
+        "author": "Frank Herbert",
+        "publisher": "Chilton",
+        "published_date": "1965-08-01",
+        "page_count": "412",
+        "language": "en",
+    })
+    assert records[1][0] == 3
+    assert records[1][1]["title"] == "Multi\nLine"
+    assert records[2][0] == 5
+    assert isinstance(records[2][1], ValueError)
+
+
+def test_ndjson_reports_unparseable_lines():
+    body = b'{"title": "a"}\n\nnot json\n[1, 2]\n'
+
+    records = asyncio.run(collect(iter_ndjson_records(chunked(body, size=3))))
+
+    assert records[0] == (1, {"title": "a"})
+    assert [row for row, record in records[1:]] == [3, 4]
+    assert all(isinstance(record, ValueError) for _, record in records[1:])
+
+
+def test_bulk_create_inserts_in_batches_and_collects_row_errors():
+    book = {
+        "title": "t",
+        "author": "a",
+        "publisher": "p",
+        "published_date": "2020-02-02",
+        "page_count": 1,
+        "language": "en",
+    }
+    lines = [json.dumps(book)] * 5
+    lines.append(json.dumps({"title": "t"}))
+    lines.append(json.dumps({**book, "published_date": "02/02/2020"}))
+    body = "\n".join(lines).encode()
+    session = Mock()
+    session.exec = AsyncMock()
+    session.commit = AsyncMock()
+
+    summary = asyncio.run(
+        BookService().bulk_create_books(
+            iter_ndjson_records(chunked(body)), USER_UID, session, batch_size=2
+        )
+    )
+
+    assert summary["inserted"] == 5
+    assert summary["failed"] == 2
+    assert [error["row"] for error in summary["errors"]] == [6, 7]
+    assert session.exec.await_count == 3
+    inserted_rows = session.exec.await_args_list[0].kwargs["params"]
+    assert inserted_rows[0]["title"] == book["title"]
+    assert str(inserted_rows[0]["user_uid"]) == USER_UID
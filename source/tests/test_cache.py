@@ -0,0 +1,91 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from redis.exceptions import RedisError
+
+from source.db.cache import LocalTTLCache, TwoTierCache
+
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalTTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_local_cache_expires_entries():
+    cache = LocalTTLCache(maxsize=2, ttl=-1)
+    cache.set("a", 1)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_two_tier_cache_promotes_redis_hits_and_invalidates_both_tiers():
+    cache = TwoTierCache("test", maxsize=10, local_ttl=60, remote_ttl=60)
+    redis = AsyncMock()
+    redis.get.return_value = b"body"
+
+    with patch("source.db.cache.redis_client", redis), patch(
+        "source.db.cache.pubsub.publish", AsyncMock()
+    ) as publish:
+        assert asyncio.run(cache.get("k")) == b"body"
+        assert asyncio.run(cache.get("k")) == b"body"
+        assert redis.get.await_count == 1
+
+        asyncio.run(cache.invalidate("k"))
+
+    assert cache.local.get("k") is None
+    keys = redis.eval.await_args.args[2:4]
+    assert keys == ("cache:test:k", "cache:test:gen:k")
+    publish.assert_awaited_once()
+
+
+def test_fill_read_before_an_invalidation_is_not_cached():
+    cache = TwoTierCache("test", maxsize=10, local_ttl=60, remote_ttl=60)
+    redis = AsyncMock()
+    redis.get.return_value = b"3"
+
+    async def run():
+        stale = await cache.generation("k")
+        # a writer commits and invalidates while the reader is in the database
+        await cache.invalidate("k")
+        redis.eval.reset_mock()
+        redis.eval.return_value = 0
+        await cache.set("k", b"old body", stale)
+
+        fresh = await cache.generation("k")
+        redis.eval.return_value = 1
+        await cache.set("k", b"new body", fresh)
+
+    with patch("source.db.cache.redis_client", redis), patch(
+        "source.db.cache.pubsub.publish", AsyncMock()
+    ):
+        asyncio.run(run())
+
+    # the stale fill was checked against the generation it was read at
+    first_set, second_set = redis.eval.await_args_list
+    assert first_set.args[5] == b"3"
+    assert cache.local.get("k") == b"new body"
+
+
+def test_local_fill_is_skipped_after_an_invalidation_without_redis():
+    cache = TwoTierCache("test", maxsize=10, local_ttl=60, remote_ttl=60)
+    redis = AsyncMock()
+    redis.get.side_effect = RedisError()
+    redis.eval.side_effect = RedisError()
+
+    async def run():
+        stale = await cache.generation("k")
+        cache._on_invalidation("test:k")
+        await cache.set("k", b"old body", stale)
+
+    with patch("source.db.cache.redis_client", redis):
+        asyncio.run(run())
+
+    assert cache.local.get("k") is None
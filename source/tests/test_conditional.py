@@ -0,0 +1,31 @@
+from starlette.requests import Request
+
+from source.conditional import etag_matches, make_etag, not_modified
+
+
+def request_with(if_none_match):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "headers": headers})
+
+
+def test_etag_changes_with_version():
+    assert make_etag("book", 1) == make_etag("book", 1)
+    assert make_etag("book", 1) != make_etag("book", 2)
+
+
+def test_if_none_match_uses_weak_comparison():
+    etag = make_etag("book", 1)
+
+    assert not etag_matches(request_with(None), etag)
+    assert etag_matches(request_with(etag), etag)
+    assert etag_matches(request_with(f'"other", W/{etag}'), etag)
+    assert etag_matches(request_with("*"), etag)
+    assert not etag_matches(request_with(make_etag("book", 2)), etag)
+
+
+def test_not_modified_has_no_body():
+    response = not_modified('"abc"')
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == '"abc"'
+    assert response.body == b""
@@ -0,0 +1,36 @@
+import uuid
+from unittest.mock import AsyncMock, Mock, patch
+
+from source.auth.schemas import Principal
+
+TOKEN_DATA = {
+    "user": {"email": "reader@example.com", "user_uid": str(uuid.uuid4())},
+    "jti": str(uuid.uuid4()),
+    "refresh": False,
+}
+
+
+def test_token_is_decoded_and_checked_once_per_request(test_client):
+    principal = Principal(
+        uid=uuid.uuid4(), email="reader@example.com", role="user", isverified=True
+    )
+    decode = Mock(return_value=TOKEN_DATA)
+    blocklist = AsyncMock(return_value=False)
+    user_service = Mock()
+    user_service.get_principal = AsyncMock(return_value=principal)
+    book_service = Mock()
+    book_service.delete_book = AsyncMock()
+
+    with patch("source.auth.dependencies.decode_token", decode), patch(
+        "source.auth.dependencies.is_token_revoked", blocklist
+    ), patch("source.auth.dependencies.user_service", user_service), patch(
+        "source.books.routes.book_service", book_service
+    ):
+        # the route has its own bearer and another one behind RoleChecker
+        response = test_client.delete(
+            f"/book/{uuid.uuid4()}", headers={"Authorization": "Bearer token"}
+        )
+
+    assert response.status_code == 200
+    decode.assert_called_once_with("token")
+    blocklist.assert_awaited_once_with(TOKEN_DATA["jti"])
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock, patch
+
+from fastapi.testclient import TestClient
+
+from source.auth.schemas import Principal
+from source.db.export import stream_ndjson
+from source.main import app
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def mappings(self):
+        for row in self.rows:
+            yield row
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statement = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def stream(self, statement):
+        self.statement = statement
+        if isinstance(self.rows, Exception):
+            raise self.rows
+        return FakeResult(self.rows)
+
+
+class FakeStatement:
+    def execution_options(self, **options):
+        self.options = options
+        return self
+
+
+def test_export_streams_ndjson_in_bounded_chunks():
+    rows = [
+        {"uid": uuid.uuid4(), "title": f"book {i}", "created_at": datetime(2024, 1, 1)}
+        for i in range(50)
+    ]
+    session = FakeSession(rows)
+
+    async def collect():
+        return [chunk async for chunk in stream_ndjson(FakeStatement(), chunk_size=256, yield_per=10)]
+
+    with patch("source.db.export.async_session", lambda: session):
+        chunks = asyncio.run(collect())
+
+    assert session.statement.options == {"yield_per": 10}
+    assert len(chunks) > 1
+    assert all(len(chunk) < 256 + 120 for chunk in chunks)
+    lines = b"".join(chunks).splitlines()
+    assert [json.loads(line)["title"] for line in lines] == [f"book {i}" for i in range(50)]
+    assert json.loads(lines[0])["uid"] == str(rows[0]["uid"])
+
+
+def test_failed_export_query_is_an_error_response_not_a_truncated_download():
+    principal = Principal(
+        uid=uuid.uuid4(), email="reader@example.com", role="user", isverified=True
+    )
+    token = {
+        "user": {"email": principal.email, "user_uid": str(principal.uid)},
+        "jti": "j",
+        "refresh": False,
+    }
+    review_service = Mock(export_reviews_statement=Mock(return_value=FakeStatement()))
+    session = FakeSession(RuntimeError("query failed"))
+    client = TestClient(app, base_url="http://localhost", raise_server_exceptions=False)
+
+    with patch("source.auth.dependencies.decode_token", Mock(return_value=token)), patch(
+        "source.auth.dependencies.is_token_revoked", AsyncMock(return_value=False)
+    ), patch(
+        "source.auth.dependencies.user_service",
+        Mock(get_principal=AsyncMock(return_value=principal)),
+    ), patch("source.reviews.routes.review_service", review_service), patch(
+        "source.db.export.async_session", lambda: session
+    ):
+        response = client.get(
+            "/api/v1/reviews/export",
+            params={"created_after": "2024-03-01T12:00:00+02:00"},
+            headers={"Authorization": "Bearer token"},
+        )
+
+    assert response.status_code == 500
+    # the offset is resolved before the bound reaches the naive column
+    created_after = review_service.export_reviews_statement.call_args.kwargs["created_after"]
+    assert created_after.tzinfo is None
+    assert created_after == datetime.fromisoformat(
+        "2024-03-01T12:00:00+02:00"
+    ).astimezone().replace(tzinfo=None)
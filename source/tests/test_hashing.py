@@ -0,0 +1,48 @@
+import asyncio
+from unittest.mock import patch
+
+from passlib.context import CryptContext
+
+from source.auth.hashing import PasswordHasher
+
+
+def bcrypt_context(rounds: int) -> CryptContext:
+    return CryptContext(
+        schemes=["bcrypt"],
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+
+def test_verify_and_update_rehashes_when_the_cost_changes():
+    old_hash = bcrypt_context(4).hash("secret")
+    hasher = PasswordHasher(concurrency=2)
+
+    with patch("source.auth.hashing.password_context", bcrypt_context(5)):
+        valid, new_hash = asyncio.run(hasher.verify_and_update("secret", old_hash))
+        wrong, no_hash = asyncio.run(hasher.verify_and_update("guess", old_hash))
+
+    assert valid and new_hash.startswith("$2b$05$")
+    assert not wrong and no_hash is None
+
+
+def test_hashing_does_not_block_the_event_loop():
+    hasher = PasswordHasher(concurrency=1)
+    slow_hash = bcrypt_context(10).hash("secret")
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.001)
+
+        task = asyncio.create_task(ticker())
+        assert await hasher.verify("secret", slow_hash)
+        task.cancel()
+        return ticks
+
+    assert asyncio.run(main()) > 5
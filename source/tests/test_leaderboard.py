@@ -0,0 +1,57 @@
+import asyncio
+import uuid
+from unittest.mock import AsyncMock, Mock, patch
+
+import numpy as np
+
+from source.books.leaderboard import (
+    bayesian_scores,
+    decayed_counts,
+    read_leaderboard,
+    top_entries,
+)
+
+
+def test_bayesian_score_discounts_books_with_few_reviews():
+    review_counts = np.array([1.0, 50.0, 50.0])
+    rating_sums = np.array([4.0, 175.0, 100.0])
+
+    scores = bayesian_scores(review_counts, rating_sums, prior_weight=10)
+
+    # one perfect review ranks below fifty good ones
+    assert scores[1] > scores[0] > scores[2]
+
+
+def test_decayed_counts_halve_every_half_life():
+    book_index = np.array([0, 0, 1])
+    ages = np.array([0.0, 3600.0, 7200.0])
+
+    scores = decayed_counts(book_index, ages, half_life=3600, size=3)
+
+    np.testing.assert_allclose(scores, [1.5, 0.25, 0.0])
+
+
+def test_top_entries_keeps_the_highest_scores():
+    uids = np.array(["a", "b", "c", "d"], dtype=object)
+
+    entries = top_entries(uids, np.array([0.1, 0.9, 0.5, 0.7]), size=2)
+
+    assert entries == {"b": 0.9, "d": 0.7}
+
+
+def test_read_leaderboard_keeps_rank_order_and_skips_deleted_books():
+    first, second, gone = (uuid.uuid4() for _ in range(3))
+    books = [Mock(uid=second), Mock(uid=first)]
+    result = Mock()
+    result.all.return_value = books
+    session = Mock()
+    session.exec = AsyncMock(return_value=result)
+    ranked = [(str(first).encode(), 4.5), (str(gone).encode(), 4.0), (str(second).encode(), 3.0)]
+
+    with patch("source.books.leaderboard.redis_client") as redis:
+        redis.zrevrange = AsyncMock(return_value=ranked)
+        entries = asyncio.run(read_leaderboard("leaderboard:trending", 3, session))
+
+    assert [entry["book"].uid for entry in entries] == [first, second]
+    assert [entry["score"] for entry in entries] == [4.5, 3.0]
+    session.exec.assert_awaited_once()
@@ -0,0 +1,107 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import aiosmtplib
+
+from source.mail import DEAD_LETTER_KEY, RETRY_KEY, create_message
+from source.mailer import MailWorker, SMTPPool
+
+
+class FakePool:
+    def __init__(self, fail_for=()):
+        self.fail_for = set(fail_for)
+        self.sent = []
+
+    @asynccontextmanager
+    async def connection(self):
+        client = MagicMock()
+
+        async def send_message(message):
+            if message["To"] in self.fail_for:
+                raise aiosmtplib.SMTPServerDisconnected("gone")
+            self.sent.append(message)
+
+        client.send_message = send_message
+        yield client
+
+
+def job(recipient, attempts=0):
+    return {
+        "recipients": [recipient],
+        "subject": "Verify your email",
+        "template": "verify_email.html",
+        "context": {"link": "http://example.com/verify/abc"},
+        "attempts": attempts,
+    }
+
+
+def test_templates_render_with_escaped_context():
+    message = create_message(
+        ["a@example.com"], "Reset", "password_reset.html", {"link": '"><script>'}
+    )
+
+    body = message.get_content()
+    assert message["To"] == "a@example.com"
+    assert "<script>" not in body
+    assert "&#34;&gt;&lt;script&gt;" in body
+
+
+def test_failed_messages_are_retried_with_backoff_then_dead_lettered():
+    pool = FakePool(fail_for={"bad@example.com", "worse@example.com"})
+    worker = MailWorker(pool, max_attempts=3, retry_delay=10)
+    redis = MagicMock(zadd=AsyncMock(), lpush=AsyncMock())
+
+    with patch("source.mailer.redis_client", redis), patch(
+        "source.mailer.time.time", return_value=1000
+    ), patch("source.mailer.random.uniform", return_value=1):
+        asyncio.run(
+            worker.deliver(
+                [
+                    job("ok@example.com"),
+                    job("bad@example.com", attempts=1),
+                    job("worse@example.com", attempts=2),
+                ]
+            )
+        )
+
+    assert [m["To"] for m in pool.sent] == ["ok@example.com"]
+
+    (key, scheduled), _ = redis.zadd.call_args
+    ((retry, when),) = scheduled.items()
+    assert key == RETRY_KEY
+    assert json.loads(retry)["attempts"] == 2
+    # second attempt failed: base delay doubled
+    assert when == 1000 + 20
+
+    key, dead = redis.lpush.call_args.args
+    assert key == DEAD_LETTER_KEY
+    assert json.loads(dead)["recipients"] == ["worse@example.com"]
+
+
+def test_pool_keeps_connections_through_per_message_errors():
+    pool = SMTPPool(1)
+    client = MagicMock(is_connected=True)
+    client.connect = AsyncMock()
+    pool._open = AsyncMock(return_value=client)
+
+    async def send(error):
+        try:
+            async with pool.connection() as smtp:
+                raise error
+        except type(error):
+            pass
+        return smtp
+
+    async def run():
+        refused = await send(aiosmtplib.SMTPRecipientsRefused([]))
+        rejected = await send(aiosmtplib.SMTPDataError(554, "rejected"))
+        dropped = await send(aiosmtplib.SMTPServerDisconnected("gone"))
+        return refused, rejected, dropped
+
+    assert asyncio.run(run()) == (client, client, client)
+    # one connection served both rejected messages; only the disconnect closed it
+    pool._open.assert_awaited_once()
+    client.close.assert_called_once()
+    assert pool._idle.get_nowait() is None
@@ -0,0 +1,191 @@
+"""Outbox recording and dispatch.
+
+The SKIP LOCKED test needs a real Postgres; like the other database tests it
+runs only when TEST_DATABASE_URL points at a scratch database.
+"""
+
+import asyncio
+import os
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from source.books.cache import evict_book_details
+from source.db.models import OutboxEvent
+from source.db.outbox import (
+    OutboxDispatcher,
+    events_dead,
+    purge_dispatched_events,
+    record_event,
+)
+from source.reviews.services import ReviewService
+
+DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+def claimed(events):
+    result = Mock()
+    result.all.return_value = events
+    return Mock(exec=AsyncMock(return_value=result), commit=AsyncMock())
+
+
+def test_events_are_recorded_in_the_writers_transaction():
+    book_uid, user_uid = uuid.uuid4(), uuid.uuid4()
+    review = Mock(uid=uuid.uuid4(), rating=4)
+    session = Mock(
+        exec=AsyncMock(return_value=Mock(scalar_one=Mock(return_value=review))),
+        commit=AsyncMock(),
+    )
+    # the event must be pending before the commit that publishes the review
+    session.commit.side_effect = lambda: session.add.assert_called_once()
+
+    with patch(
+        "source.reviews.services.book_service",
+        Mock(record_review_rating=AsyncMock()),
+    ), patch("source.reviews.services.book_detail_cache", Mock(invalidate=AsyncMock())):
+        asyncio.run(
+            ReviewService().add_review_to_book(
+                user_uid, book_uid, Mock(model_dump=Mock(return_value={})), session
+            )
+        )
+
+    event = session.add.call_args.args[0]
+    assert event.topic == "review.created"
+    assert event.payload == {
+        "review_uid": str(review.uid),
+        "book_uid": str(book_uid),
+        "user_uid": str(user_uid),
+        "rating": 4,
+    }
+    session.commit.assert_awaited_once()
+
+
+def test_failed_deliveries_back_off_and_the_rest_are_marked():
+    events = [
+        OutboxEvent(id=1, topic="book.updated", payload={"book_uid": "a"}, attempts=0),
+        OutboxEvent(id=2, topic="book.updated", payload={"book_uid": "b"}, attempts=2),
+        OutboxEvent(id=3, topic="book.created", payload={"book_uid": "c"}, attempts=0),
+    ]
+    session = claimed(events)
+
+    async def handler(payload):
+        if payload["book_uid"] == "b":
+            raise ConnectionError("down")
+
+    handlers = defaultdict(list, {"book.updated": [handler]})
+    dispatcher = OutboxDispatcher(batch_size=10, poll_interval=1, max_attempts=5, retry_delay=2)
+    with patch("source.db.outbox._handlers", handlers):
+        count = asyncio.run(dispatcher.dispatch_batch(session))
+
+    assert count == 3
+    statement = str(session.exec.await_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "FOR UPDATE SKIP LOCKED" in statement
+    assert "ORDER BY outbox.id" in statement
+    # an event nobody handles is still delivered
+    assert events[0].dispatched_at is not None and events[2].dispatched_at is not None
+    failed = events[1]
+    assert failed.dispatched_at is None and failed.attempts == 3
+    assert "down" in failed.last_error
+    # third failure: 2s * 2**2
+    assert (failed.available_at - events[0].dispatched_at).total_seconds() == 8
+    session.commit.assert_awaited_once()
+
+
+def test_events_are_parked_once_out_of_attempts():
+    event = OutboxEvent(id=1, topic="book.updated", payload={}, attempts=4)
+    dead = events_dead.labels("book.updated")
+    before = dead._value.get()
+
+    async def handler(payload):
+        raise ConnectionError("down")
+
+    dispatcher = OutboxDispatcher(batch_size=10, poll_interval=1, max_attempts=5, retry_delay=2)
+    with patch("source.db.outbox._handlers", {"book.updated": [handler]}):
+        asyncio.run(dispatcher.dispatch_batch(claimed([event])))
+
+    assert event.attempts == 5 and event.dispatched_at is None
+    assert dead._value.get() == before + 1
+
+    # dead events are purged along with delivered ones
+    session = Mock(exec=AsyncMock(return_value=Mock(rowcount=3)), commit=AsyncMock())
+    assert asyncio.run(purge_dispatched_events(session)) == 3
+    purge = str(session.exec.await_args.args[0])
+    assert "outbox.dispatched_at <" in purge and "outbox.attempts >=" in purge
+
+
+def test_dispatcher_keeps_running_after_unexpected_errors():
+    dispatcher = OutboxDispatcher(batch_size=10, poll_interval=0, max_attempts=5, retry_delay=2)
+    # pool exhaustion is not a DBAPIError; the loop must outlive it
+    dispatcher.dispatch_batch = AsyncMock(
+        side_effect=[PoolTimeout(), RuntimeError(), 0, asyncio.CancelledError()]
+    )
+    session = AsyncMock()
+    session.__aenter__.return_value = session
+
+    with patch("source.db.outbox.async_session", lambda: session), patch(
+        "source.db.outbox.asyncio.sleep", AsyncMock()
+    ):
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(dispatcher.run())
+
+    assert dispatcher.dispatch_batch.await_count == 4
+
+
+def test_book_events_evict_every_affected_book():
+    cache = Mock(invalidate=AsyncMock())
+    with patch("source.books.cache.book_detail_cache", cache):
+        asyncio.run(evict_book_details({"book_uid": "a"}))
+        asyncio.run(evict_book_details({"tag_uid": "t", "book_uids": ["b", "c"]}))
+
+    assert [c.args[0] for c in cache.invalidate.await_args_list] == ["a", "b", "c"]
+
+
+@pytest.mark.skipif(not DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+def test_concurrent_dispatchers_never_claim_the_same_event():
+    events = 50
+    delivered = []
+
+    async def handler(payload):
+        delivered.append(payload["n"])
+        await asyncio.sleep(0.001)
+
+    async def run():
+        engine = create_async_engine(DATABASE_URL, pool_size=4)
+        make_session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(SQLModel.metadata.create_all)
+                await conn.execute(delete(OutboxEvent))
+
+            async with make_session() as session:
+                for n in range(events):
+                    record_event(session, "test.event", n=n, at=datetime.now())
+                await session.commit()
+
+            dispatcher = OutboxDispatcher(
+                batch_size=5, poll_interval=0, max_attempts=3, retry_delay=1
+            )
+
+            async def drain():
+                while True:
+                    async with make_session() as session:
+                        if not await dispatcher.dispatch_batch(session):
+                            return
+
+            with patch("source.db.outbox._handlers", {"test.event": [handler]}):
+                await asyncio.gather(*(drain() for _ in range(4)))
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+    assert sorted(delivered) == list(range(events))
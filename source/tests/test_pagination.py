@@ -0,0 +1,75 @@
+import asyncio
+import uuid
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from sqlmodel import select
+
+from source.books.services import BOOK_ORDER
+from source.db.models import Book
+from source.errors import InvalidCursor
+from source.pagination import NEXT, PREV, decode_cursor, encode_cursor, paginate
+
+
+def make_book(minute: int) -> Book:
+    return Book(
+        uid=uuid.uuid4(),
+        title="title",
+        author="author",
+        publisher="publisher",
+        published_date=datetime(2024, 1, 1).date(),
+        page_count=100,
+        language="en",
+        created_at=datetime(2024, 1, 1, 12, minute),
+        update_at=datetime(2024, 1, 1, 12, minute),
+    )
+
+
+def session_returning(rows):
+    result = Mock()
+    result.all.return_value = rows
+    session = Mock()
+    session.exec = AsyncMock(return_value=result)
+    return session
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 8, 30, 15, 123456)
+    uid = uuid.uuid4()
+
+    cursor = encode_cursor((created_at, uid), PREV)
+
+    assert decode_cursor(cursor, BOOK_ORDER) == ([created_at, uid], PREV)
+
+
+def test_garbage_cursor_is_rejected():
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor", BOOK_ORDER)
+
+
+def test_first_page_has_only_next_cursor():
+    books = [make_book(m) for m in (5, 4, 3)]
+    session = session_returning(books)
+
+    page = asyncio.run(paginate(session, select(Book), BOOK_ORDER, limit=2))
+
+    assert page["items"] == books[:2]
+    assert page["prev_cursor"] is None
+    values, direction = decode_cursor(page["next_cursor"], BOOK_ORDER)
+    assert direction == NEXT
+    assert values == [books[1].created_at, books[1].uid]
+
+
+def test_last_page_has_only_prev_cursor():
+    books = [make_book(m) for m in (2, 1)]
+    session = session_returning(books)
+    cursor = encode_cursor((datetime(2024, 1, 1, 12, 3), uuid.uuid4()), NEXT)
+
+    page = asyncio.run(
+        paginate(session, select(Book), BOOK_ORDER, limit=2, cursor=cursor)
+    )
+
+    assert page["items"] == books
+    assert page["next_cursor"] is None
+    assert page["prev_cursor"] is not None
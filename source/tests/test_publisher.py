@@ -0,0 +1,69 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from redis.exceptions import ConnectionError
+
+from source.db.publisher import QueuePublisher
+from source.errors import PublishQueueFull
+
+
+def fake_redis(failures=0):
+    redis = MagicMock()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(
+        side_effect=[ConnectionError()] * failures + [[1]] * 10
+    )
+    pipe.__aenter__ = AsyncMock(return_value=pipe)
+    pipe.__aexit__ = AsyncMock(return_value=False)
+    redis.pipeline.return_value = pipe
+    return redis, pipe
+
+
+def test_queued_payloads_are_pipelined_in_one_round_trip():
+    publisher = QueuePublisher(maxsize=10, batch_size=3, enqueue_timeout=0.01)
+    redis, pipe = fake_redis()
+
+    async def run():
+        for payload in ("a", "b", "c", "d"):
+            await publisher.push("mail:outbox" if payload != "b" else "other", payload)
+        await publisher._publish(await publisher._next_batch())
+
+    with patch("source.db.publisher.redis_client", redis):
+        asyncio.run(run())
+
+    pipe.execute.assert_awaited_once()
+    assert [c.args for c in pipe.lpush.call_args_list] == [
+        ("mail:outbox", "a", "c"),
+        ("other", "b"),
+    ]
+    # the fourth payload waits for the next batch
+    assert publisher._queue.qsize() == 1
+
+
+def test_push_fails_fast_when_the_queue_stays_full():
+    publisher = QueuePublisher(maxsize=1, batch_size=10, enqueue_timeout=0.01)
+
+    async def run():
+        await publisher.push("mail:outbox", "a")
+        await publisher.push("mail:outbox", "b")
+
+    with pytest.raises(PublishQueueFull):
+        asyncio.run(run())
+
+
+def test_a_failed_publish_is_retried_with_the_same_batch():
+    publisher = QueuePublisher(maxsize=10, batch_size=10, enqueue_timeout=0.01)
+    redis, pipe = fake_redis(failures=2)
+
+    async def run():
+        await publisher.push("mail:outbox", "a")
+        await publisher._publish(await publisher._next_batch())
+
+    with patch("source.db.publisher.redis_client", redis), patch(
+        "source.db.publisher.asyncio.sleep", AsyncMock()
+    ):
+        asyncio.run(run())
+
+    assert pipe.execute.await_count == 3
+    assert all(c.args == ("mail:outbox", "a") for c in pipe.lpush.call_args_list)
@@ -0,0 +1,94 @@
+import asyncio
+import uuid
+from unittest.mock import AsyncMock, Mock, patch
+
+from starlette.requests import Request
+
+from source.auth.schemas import Principal
+from source.config import Config
+from source.ratelimit import READS, TokenBuckets, buckets, client_identity
+
+
+def test_leased_tokens_are_spent_locally():
+    limiter = TokenBuckets(maxsize=10, lease_ttl=60)
+    limiter._script = AsyncMock(return_value=[READS.lease, 0])
+
+    async def take(times):
+        return [await limiter.take(READS, "user:1") for _ in range(times)]
+
+    assert asyncio.run(take(READS.lease + 1)) == [0] * (READS.lease + 1)
+    assert limiter._script.await_count == 2
+
+
+def test_rejected_login_gets_429_with_retry_after(test_client):
+    script = AsyncMock(return_value=[0, 2500])
+    login = {"email": "reader@example.com", "password": "secret"}
+
+    with patch.object(Config, "RATE_LIMIT_ENABLED", True), patch.object(
+        buckets, "_script", script
+    ), patch.object(buckets, "_local", TokenBuckets(10, 60)._local):
+        first = test_client.post("/api/v1/auth/login", json=login)
+        second = test_client.post("/api/v1/auth/login", json=login)
+
+    assert first.status_code == second.status_code == 429
+    assert first.headers["Retry-After"] == "3"
+    # the rejection is remembered, so Redis is asked only once
+    script.assert_awaited_once()
+
+
+def request(client, headers=()):
+    raw = [(name.encode(), value.encode()) for name, value in headers]
+    return Request({"type": "http", "client": client, "headers": raw})
+
+
+def test_clients_without_an_address_are_limited_not_failed():
+    assert client_identity(request(("10.0.0.1", 5000))) == "ip:10.0.0.1"
+    # unix socket servers pass no client at all
+    assert client_identity(request(None)) == "ip:unknown"
+
+
+def test_client_supplied_forwarded_hops_do_not_change_the_bucket():
+    # the trusted proxy appends the real peer after whatever the client sent
+    honest = request(None, [("x-forwarded-for", "203.0.113.7")])
+    spoofed = request(None, [("x-forwarded-for", "198.51.100.1, 203.0.113.7")])
+    respoofed = request(None, [("x-forwarded-for", "192.0.2.99, 203.0.113.7")])
+
+    assert client_identity(honest) == "ip:203.0.113.7"
+    assert client_identity(spoofed) == client_identity(respoofed) == "ip:203.0.113.7"
+
+    with patch.object(Config, "TRUSTED_PROXY_HOPS", 0):
+        assert client_identity(spoofed) == "ip:unknown"
+    with patch.object(Config, "TRUSTED_PROXY_HOPS", 2):
+        assert client_identity(honest) == "ip:unknown"
+
+
+def test_read_routes_have_separate_buckets(test_client):
+    principal = Principal(
+        uid=uuid.uuid4(), email="reader@example.com", role="user", isverified=True
+    )
+    token = {
+        "user": {"email": principal.email, "user_uid": str(principal.uid)},
+        "jti": "j",
+        "refresh": False,
+    }
+    take = AsyncMock(return_value=5)
+
+    with patch.object(Config, "RATE_LIMIT_ENABLED", True), patch.object(
+        buckets, "take", take
+    ), patch("source.auth.dependencies.decode_token", Mock(return_value=token)), patch(
+        "source.auth.dependencies.is_token_revoked", AsyncMock(return_value=False)
+    ), patch(
+        "source.auth.dependencies.user_service",
+        Mock(get_principal=AsyncMock(return_value=principal)),
+    ):
+        headers = {"Authorization": "Bearer token"}
+        test_client.get("/api/v1/tags/", headers=headers)
+        test_client.get(f"/book/{uuid.uuid4()}", headers=headers)
+        test_client.get(f"/book/{uuid.uuid4()}", headers=headers)
+
+    identities = [call.args[1] for call in take.await_args_list]
+    assert identities == [
+        f"user:{principal.uid}:/api/v1/tags/",
+        f"user:{principal.uid}:/book/{{book_uid}}",
+        f"user:{principal.uid}:/book/{{book_uid}}",
+    ]
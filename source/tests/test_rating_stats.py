@@ -0,0 +1,127 @@
+"""Rating stats maintenance.
+
+The concurrency test needs a real Postgres; like the other database tests it
+runs only when TEST_DATABASE_URL points at a scratch database.
+"""
+
+import asyncio
+import os
+import uuid
+from datetime import date
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from source.books.services import BookService
+from source.db import models
+from source.reviews.schemas import ReviewCreateModel
+from source.reviews.services import ReviewService
+
+DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+def result_of(rows):
+    result = Mock()
+    result.all.return_value = rows
+    return result
+
+
+def test_reconcile_walks_books_in_batches_and_invalidates_repaired_ones():
+    uids = sorted(uuid.uuid4() for _ in range(3))
+    session = Mock()
+    session.exec = AsyncMock(
+        side_effect=[result_of(uids[:2]), result_of(uids[2:]), result_of([])]
+    )
+    session.commit = AsyncMock()
+    service = BookService()
+    service.rebuild_rating_stats = AsyncMock(side_effect=[[uids[1]], []])
+
+    with patch("source.books.services.book_detail_cache") as cache:
+        cache.invalidate = AsyncMock()
+        repaired = asyncio.run(service.reconcile_rating_stats(session, batch_size=2))
+
+    assert repaired == 1
+    assert [call.args[1] for call in service.rebuild_rating_stats.await_args_list] == [
+        uids[:2],
+        uids[2:],
+    ]
+    assert session.commit.await_count == 2
+    cache.invalidate.assert_awaited_once_with(str(uids[1]))
+    # the second batch starts after the last uid of the first
+    second_page = session.exec.await_args_list[1].args[0]
+    assert uids[1] in second_page.compile().params.values()
+    # the batch is locked before its stats are recomputed
+    assert "FOR NO KEY UPDATE" in str(second_page.compile(dialect=postgresql.dialect()))
+
+
+@pytest.mark.skipif(not DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+def test_reconcile_never_overwrites_concurrent_review_writes():
+    writers = 20
+
+    async def run():
+        engine = create_async_engine(DATABASE_URL, pool_size=writers + 1)
+        make_session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(SQLModel.metadata.create_all)
+
+            async with make_session() as session:
+                owner = models.User(
+                    uid=uuid.uuid4(),
+                    username="stats",
+                    email=f"stats-{uuid.uuid4()}@example.com",
+                    firstname="s",
+                    lastname="s",
+                    password_hash="x",
+                )
+                book = models.Book(
+                    uid=uuid.uuid4(),
+                    title="contended",
+                    author="a",
+                    publisher="p",
+                    published_date=date(2000, 1, 1),
+                    page_count=1,
+                    language="en",
+                    user_uid=owner.uid,
+                )
+                session.add_all([owner, book])
+                await session.commit()
+
+            async def review(i):
+                async with make_session() as session:
+                    await ReviewService().add_review_to_book(
+                        owner.uid,
+                        book.uid,
+                        ReviewCreateModel(rating=i % 5, review_text="r"),
+                        session,
+                    )
+
+            async def reconcile():
+                for _ in range(5):
+                    async with make_session() as session:
+                        await BookService().reconcile_rating_stats(session)
+
+            await asyncio.gather(reconcile(), *(review(i) for i in range(writers)))
+
+            async with make_session() as session:
+                stored = await session.get(models.Book, book.uid)
+                actual = await session.exec(
+                    select(func.count(), func.coalesce(func.sum(models.Review.rating), 0))
+                    .where(models.Review.book_uid == book.uid)
+                )
+                return (stored.review_count, stored.rating_sum), tuple(actual.one())
+        finally:
+            await engine.dispose()
+
+    cache = Mock(invalidate=AsyncMock())
+    with patch("source.books.services.book_detail_cache", cache), patch(
+        "source.reviews.services.book_detail_cache", cache
+    ):
+        stored, actual = asyncio.run(run())
+
+    assert stored == actual == (writers, sum(i % 5 for i in range(writers)))
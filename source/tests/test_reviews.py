@@ -0,0 +1,153 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from source.auth.schemas import Principal
+from source.books.services import BOOK_DETAIL_REVIEWS, BookService
+from source.db.models import Book
+from source.errors import BookNotFound
+from source.reviews.schemas import ReviewCreateModel, ReviewImportModel
+from source.reviews.services import ReviewService
+
+review_prefix = "/api/v1/reviews"
+
+
+def test_book_reviews_are_paged_with_sort_and_min_rating(test_client):
+    book_uid = uuid.uuid4()
+    review_service = Mock()
+    review_service.get_book_reviews = AsyncMock(
+        return_value={"items": [], "next_cursor": None, "prev_cursor": None}
+    )
+    principal = Principal(
+        uid=uuid.uuid4(), email="reader@example.com", role="user", isverified=True
+    )
+    token = {
+        "user": {"email": principal.email, "user_uid": str(principal.uid)},
+        "jti": "j",
+        "refresh": False,
+    }
+    headers = {"Authorization": "Bearer token"}
+
+    with patch("source.auth.dependencies.decode_token", Mock(return_value=token)), patch(
+        "source.auth.dependencies.is_token_revoked", AsyncMock(return_value=False)
+    ), patch(
+        "source.auth.dependencies.user_service",
+        Mock(get_principal=AsyncMock(return_value=principal)),
+    ), patch("source.reviews.routes.review_service", review_service):
+        response = test_client.get(
+            f"{review_prefix}/book/{book_uid}",
+            params={"sort": "rating", "min_rating": 3, "limit": 5},
+            headers=headers,
+        )
+        rejected = test_client.get(
+            f"{review_prefix}/book/{book_uid}",
+            params={"min_rating": 7},
+            headers=headers,
+        )
+
+    assert response.status_code == 200
+    assert response.json()["items"] == []
+    review_service.get_book_reviews.assert_awaited_once()
+    kwargs = review_service.get_book_reviews.await_args.kwargs
+    assert (kwargs["sort"], kwargs["min_rating"], kwargs["limit"]) == ("rating", 3, 5)
+    assert rejected.status_code == 422
+
+
+def test_book_detail_embeds_only_the_newest_reviews():
+    book = Book(
+        uid=uuid.uuid4(),
+        title="title",
+        author="author",
+        publisher="publisher",
+        published_date="2024-01-01",
+        page_count=1,
+        language="en",
+    )
+    statements = []
+
+    async def exec(statement):
+        statements.append(statement)
+        result = Mock()
+        result.first.return_value = book
+        result.all.return_value = []
+        return result
+
+    session = Mock(exec=exec)
+    detail = asyncio.run(BookService().get_book_detail(book.uid, session))
+
+    assert detail.reviews == []
+    reviews_query = statements[1]
+    assert reviews_query._limit == BOOK_DETAIL_REVIEWS
+
+
+def test_missing_book_on_review_insert_is_a_404_not_a_500():
+    violation = IntegrityError(
+        "INSERT INTO reviews ...",
+        {},
+        Exception('violates foreign key constraint "reviews_book_uid_fkey"'),
+    )
+    session = Mock(exec=AsyncMock(side_effect=violation), rollback=AsyncMock())
+
+    with pytest.raises(BookNotFound):
+        asyncio.run(
+            ReviewService().add_review_to_book(
+                uuid.uuid4(),
+                uuid.uuid4(),
+                ReviewCreateModel(rating=4, review_text="good"),
+                session,
+            )
+        )
+    session.rollback.assert_awaited_once()
+
+
+def test_bulk_import_inserts_known_rows_and_reports_the_rest():
+    book, user, inserted_uid = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    reviews = [
+        ReviewImportModel(rating=3, review_text="a", book_uid=book, user_uid=user),
+        ReviewImportModel(rating=3, review_text="b", book_uid=uuid.uuid4(), user_uid=user),
+        ReviewImportModel(rating=3, review_text="c", book_uid=book, user_uid=uuid.uuid4()),
+    ]
+    books, users, inserted = Mock(), Mock(), Mock()
+    books.all.return_value = [book]
+    users.all.return_value = [user]
+    inserted.scalars.return_value.all.return_value = [inserted_uid]
+    session = Mock(
+        exec=AsyncMock(side_effect=[books, users, inserted]), commit=AsyncMock()
+    )
+    book_service = Mock(rebuild_rating_stats=AsyncMock(return_value=[book]))
+
+    with patch("source.reviews.services.book_service", book_service), patch(
+        "source.reviews.services.book_detail_cache", Mock(invalidate=AsyncMock())
+    ):
+        result = asyncio.run(ReviewService().bulk_add_reviews(reviews, session))
+
+    assert (result["inserted"], result["failed"]) == (1, 2)
+    assert result["results"] == [
+        {"row": 0, "uid": inserted_uid},
+        {"row": 1, "error": "book not found"},
+        {"row": 2, "error": "user not found"},
+    ]
+    # one multi-row insert, then the touched books' stats are rebuilt
+    params = session.exec.await_args_list[2].kwargs["params"]
+    assert [row["review_text"] for row in params] == ["a"]
+    book_service.rebuild_rating_stats.assert_awaited_once_with(session, [book])
+
+
+def test_imported_timestamps_with_offsets_are_stored_naive():
+    review = ReviewImportModel(
+        rating=3,
+        review_text="a",
+        book_uid=uuid.uuid4(),
+        user_uid=uuid.uuid4(),
+        created_at="2024-03-01T12:00:00Z",
+    )
+
+    # the same instant, comparable with the naive TIMESTAMP column
+    assert review.created_at.tzinfo is None
+    assert review.created_at == (
+        datetime(2024, 3, 1, 12, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    )
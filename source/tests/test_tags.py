@@ -0,0 +1,244 @@
+"""Tag resolution and attachment.
+
+The stress test needs a real Postgres to prove uq_tags_name holds under
+concurrent writers; like the query plan tests it runs only when
+TEST_DATABASE_URL points at a scratch database.
+"""
+
+import asyncio
+import json
+import os
+import uuid
+from datetime import date, datetime
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from redis.exceptions import RedisError
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from source.books.services import FACET_SAMPLE_SIZE, BookService
+from source.db import models  # noqa: F401  registers the tables
+from source.tags.cache import TagDictionary
+from source.tags.schemas import TagAddModel
+from source.tags.services import TagService
+
+DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+def result_of(rows):
+    result = Mock()
+    result.all.return_value = rows
+    return result
+
+
+def test_resolve_tags_reads_known_names_from_the_dictionary():
+    known, created, raced = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    session = Mock()
+    session.exec = AsyncMock(
+        side_effect=[
+            # "sci-fi" is created; "horror" lost the race to another request
+            result_of([("sci-fi", created)]),
+            result_of([("horror", raced)]),
+        ]
+    )
+    dictionary = Mock(lookup=AsyncMock(return_value={"fantasy": known}))
+    names = ["sci-fi", "fantasy", "horror", "fantasy"]
+
+    with patch("source.tags.services.tag_dictionary", dictionary):
+        tags, created_any = asyncio.run(TagService().resolve_tags(names, session))
+
+    assert tags == {"fantasy": known, "sci-fi": created, "horror": raced}
+    assert created_any
+    assert session.exec.await_count == 2
+    insert = session.exec.await_args_list[0].args[0].compile()
+    assert "ON CONFLICT (name) DO NOTHING" in str(insert)
+    # inserted in sorted order so overlapping requests lock rows alike
+    assert [v for k, v in insert.params.items() if k.startswith("name")] == [
+        "horror",
+        "sci-fi",
+    ]
+
+
+def test_tag_dictionary_reloads_only_when_the_version_moves():
+    tag = Mock(uid=uuid.uuid4(), created_at=datetime(2024, 1, 1))
+    tag.name = "fiction"
+    session = Mock(exec=AsyncMock(return_value=result_of([tag])))
+    redis = Mock(get=AsyncMock(return_value=b"3"))
+    dictionary = TagDictionary(recheck_interval=0, max_age=300)
+
+    async def run():
+        first = await dictionary.snapshot(session)
+        again = await dictionary.snapshot(session)
+        redis.get.return_value = b"4"
+        moved = await dictionary.snapshot(session)
+        redis.get.side_effect = RedisError()
+        dictionary.clear()
+        await dictionary.snapshot(session)
+        await dictionary.snapshot(session)
+        return first, again, moved
+
+    with patch("source.tags.cache.redis_client", redis):
+        first, again, moved = asyncio.run(run())
+
+    assert again is first
+    assert moved is not first and moved.version == 4
+    assert json.loads(first.body)[0]["name"] == "fiction"
+    assert first.uids == {"fiction": tag.uid}
+    # two loads, then every call while Redis is unavailable
+    assert session.exec.await_count == 4
+
+
+def test_attaching_a_tag_reports_new_existing_and_missing_books():
+    tag_uid = uuid.uuid4()
+    new, linked, missing = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    attached = Mock()
+    attached.scalars.return_value.all.return_value = [new]
+    session = Mock(
+        exec=AsyncMock(
+            side_effect=[
+                Mock(first=Mock(return_value=tag_uid)),
+                result_of([new, linked]),
+                attached,
+                Mock(),
+            ]
+        ),
+        commit=AsyncMock(),
+    )
+    book_service = Mock(touch_books=AsyncMock(return_value=[new]))
+
+    with patch("source.tags.services.book_service", book_service), patch(
+        "source.tags.services.book_detail_cache", Mock(invalidate=AsyncMock())
+    ):
+        result = asyncio.run(
+            TagService().attach_tag_to_books(tag_uid, [new, linked, missing], session)
+        )
+
+    assert result == {
+        "attached": [new],
+        "already_attached": [linked],
+        "missing": [missing],
+    }
+    book_service.touch_books.assert_awaited_once()
+    # one more book carries the tag now
+    count_upsert = session.exec.await_args_list[3].args[0].compile()
+    assert list(count_upsert.params.values())[-1] == 1
+
+
+def test_facets_come_from_the_count_table_unless_filtered():
+    uid = uuid.uuid4()
+    session = Mock(
+        exec=AsyncMock(return_value=result_of([Mock(uid=uid, count=7)]))
+    )
+    session.exec.return_value.all.return_value[0].name = "fiction"
+
+    facets = asyncio.run(BookService().get_tag_facets(session))
+    unfiltered = str(session.exec.await_args.args[0])
+
+    assert facets == {
+        "facets": [{"tag_uid": uid, "name": "fiction", "count": 7}],
+        "facets_estimated": False,
+    }
+    assert "tag_book_counts" in unfiltered and "booktag" not in unfiltered
+
+
+def test_filtered_facets_are_scaled_from_a_bounded_sample():
+    rare, common, uid = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    facet = Mock(uid=uid, count=100)
+    facet.name = "fiction"
+    session = Mock(
+        exec=AsyncMock(
+            side_effect=[
+                result_of([(rare, FACET_SAMPLE_SIZE * 3), (common, FACET_SAMPLE_SIZE * 50)]),
+                result_of([facet]),
+            ]
+        )
+    )
+
+    facets = asyncio.run(BookService().get_tag_facets(session, ["a", "b"], "all"))
+    counted = session.exec.await_args.args[0].compile(compile_kwargs={"literal_binds": True})
+
+    # driven by the rarest tag, checked against the other, never grouped in full
+    assert f"booktag.tag_uid = '{rare.hex}'" in str(counted)
+    assert f"LIMIT {FACET_SAMPLE_SIZE}" in str(counted) and "EXISTS" in str(counted)
+    assert "HAVING" not in str(counted)
+    assert facets == {
+        "facets": [{"tag_uid": uid, "name": "fiction", "count": 300}],
+        "facets_estimated": True,
+    }
+
+
+@pytest.mark.skipif(not DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+def test_concurrent_tagging_never_duplicates_tag_names():
+    writers = 20
+    names = [f"stress-{uuid.uuid4().hex[:8]}-{i}" for i in range(10)]
+
+    async def run():
+        engine = create_async_engine(DATABASE_URL, pool_size=writers)
+        make_session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(SQLModel.metadata.create_all)
+
+            async with make_session() as session:
+                owner = models.User(
+                    uid=uuid.uuid4(),
+                    username="stress",
+                    email=f"stress-{uuid.uuid4()}@example.com",
+                    firstname="s",
+                    lastname="s",
+                    password_hash="x",
+                )
+                books = [
+                    models.Book(
+                        title=f"book {i}",
+                        author="a",
+                        publisher="p",
+                        published_date=date(2000, 1, 1),
+                        page_count=1,
+                        language="en",
+                        user_uid=owner.uid,
+                    )
+                    for i in range(writers)
+                ]
+                session.add_all([owner, *books])
+                await session.commit()
+                book_uids = [book.uid for book in books]
+
+            async def tag(book_uid, offset):
+                # every writer asks for all names, each in its own order
+                rotated = names[offset:] + names[:offset]
+                tag_data = TagAddModel(tags=[{"name": name} for name in rotated])
+                async with make_session() as session:
+                    await TagService().add_tag_to_book(book_uid, tag_data, session)
+
+            with patch("source.tags.services.book_detail_cache", Mock(invalidate=AsyncMock())), patch(
+                "source.tags.services.tag_dictionary.bump", AsyncMock()
+            ):
+                await asyncio.gather(
+                    *(tag(book_uid, i % len(names)) for i, book_uid in enumerate(book_uids))
+                )
+
+            async with engine.connect() as conn:
+                counts = await conn.execute(
+                    text("SELECT name, count(*) FROM tags WHERE name = ANY(:names) GROUP BY name"),
+                    {"names": names},
+                )
+                links = await conn.execute(
+                    text(
+                        "SELECT count(*) FROM booktag JOIN tags ON tags.uid = booktag.tag_uid"
+                        " WHERE tags.name = ANY(:names)"
+                    ),
+                    {"names": names},
+                )
+                return dict(counts.all()), links.scalar()
+        finally:
+            await engine.dispose()
+
+    counts, links = asyncio.run(run())
+
+    assert counts == {name: 1 for name in names}
+    assert links == writers * len(names)